@@ -0,0 +1,71 @@
+"""Look up one arc's torrents in transmission-daemon.
+
+The arc journal records the hashes of the torrents it added, so the daemon
+can be asked for exactly those; without a journal every torrent is fetched
+and filtered by download folder.
+
+Usage:
+    with TransmissionClient.from_env() as client:
+        torrents = arc_torrents(client, Path("arc15-jaya"), ["id", "name", "files"])
+"""
+
+from pathlib import Path
+
+from episode_matcher import VIDEO_SUFFIX
+from journal import PipelineJournal
+from transmission_rpc import TransmissionClient
+
+
+def journal_hashes(folder: Path) -> list[str]:
+    """Torrent hashes the arc's journal recorded, if any."""
+    step = PipelineJournal(folder).steps.get("episodes")
+    if not step:
+        return []
+    return [t["hash"] for t in step["output"]["torrents"] if t.get("hash")]
+
+
+def arc_torrents(client: TransmissionClient, folder: Path, fields: list[str]) -> list[dict]:
+    """One torrent-get for the arc's torrents (by journal hash or folder)."""
+    hashes = journal_hashes(folder)
+    if hashes:
+        return client.get_torrents(fields, ids=hashes)
+
+    root = Path(folder).resolve()
+    fields = fields if "downloadDir" in fields else [*fields, "downloadDir"]
+    return [
+        t
+        for t in client.get_torrents(fields)
+        if (d := Path(t["downloadDir"]).resolve()) == root or root in d.parents
+    ]
+
+
+def is_single_file(torrent: dict) -> bool:
+    """True for a torrent made of one file with no folder of its own."""
+    files = torrent.get("files") or []
+    return len(files) == 1 and "/" not in files[0]["name"]
+
+
+def expected_videos(torrents: list[dict], folder: Path) -> list[Path]:
+    """Where each torrent video will sit once downloaded and flattened.
+
+    Known as soon as a torrent's metadata arrives, long before the data:
+    flattening puts a single-file torrent directly in the arc folder, while
+    a torrent with a folder of its own keeps its videos in that folder.
+    Needs the torrents' "files" and "downloadDir" fields.
+    """
+    folder = Path(folder)
+    videos = []
+    for torrent in torrents:
+        for f in torrent.get("files") or []:
+            if not f["name"].endswith(VIDEO_SUFFIX):
+                continue
+            if is_single_file(torrent):
+                videos.append(folder / f["name"])
+                continue
+            base = Path(torrent["downloadDir"])
+            try:
+                base = folder / base.resolve().relative_to(folder.resolve())
+            except ValueError:
+                pass
+            videos.append(base / f["name"])
+    return videos
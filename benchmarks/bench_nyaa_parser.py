@@ -0,0 +1,108 @@
+"""Benchmark the nyaa result parser on synthetic multi-MB pages.
+
+Usage:
+    uv run benchmarks/bench_nyaa_parser.py [--max-ratio 1.5] [--legacy]
+
+Builds result pages of growing size, times nyaa_parser.parse_rows on each
+and reports throughput. Exits non-zero if the time per MB on the largest
+page exceeds the smallest page's by more than --max-ratio (i.e. parsing is
+not linear). --legacy also times the old DOTALL regex for comparison.
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import nyaa_parser  # noqa: E402
+
+ROW = """<tr class="default">
+  <td><a href="/?c=1_2" title="Anime - English-translated"><img src="/static/img/icons/nyaa/1_2.png" alt="Anime"></a></td>
+  <td colspan="2">
+    <a href="/view/{id}#comments" class="comments" title="2 comments"><i class="fa fa-comments-o"></i>2</a>
+    <a href="/view/{id}" title="[One Pace][{a}-{b}] Jaya {ep:02d} [1080p][{hash}]">[One Pace][{a}-{b}] Jaya {ep:02d} [1080p][{hash}]</a>
+  </td>
+  <td class="text-center">
+    <a href="/download/{id}.torrent"><i class="fa fa-fw fa-download"></i></a>
+    <a href="magnet:?xt=urn:btih:{infohash}&amp;dn=%5BOne%20Pace%5D%20Jaya%20{ep:02d}&amp;tr=http%3A%2F%2Fnyaa.tracker.wf%3A7777%2Fannounce"><i class="fa fa-fw fa-magnet"></i></a>
+  </td>
+  <td class="text-center">1.2 GiB</td>
+  <td class="text-center" data-timestamp="1600000000">2020-09-13 12:26</td>
+  <td class="text-center">{seeders}</td>
+  <td class="text-center">0</td>
+  <td class="text-center">345</td>
+</tr>
+"""
+
+LEGACY_PATTERN = (
+    r'<tr[^>]*>.*?(<a[^>]*href=["\']magnet:[^"\']*["\'][^>]*>.*?</a>).*?</tr>'
+)
+
+
+def build_page(target_bytes: int) -> tuple[str, int]:
+    """Return a synthetic result page of roughly target_bytes and its row count."""
+    rows = []
+    size = 0
+    i = 0
+    while size < target_bytes:
+        row = ROW.format(
+            id=600000 + i,
+            a=218 + i,
+            b=220 + i,
+            ep=i % 100,
+            hash=f"{i:08X}",
+            infohash=f"{i:040x}",
+            seeders=i % 50,
+        )
+        rows.append(row)
+        size += len(row)
+        i += 1
+    html = (
+        '<html><body><table class="table torrent-list"><tbody>'
+        + "".join(rows)
+        + "</tbody></table></body></html>"
+    )
+    return html, i
+
+
+def time_it(func, html: str) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    max_ratio = 1.5
+    if "--max-ratio" in sys.argv:
+        max_ratio = float(sys.argv[sys.argv.index("--max-ratio") + 1])
+    legacy = "--legacy" in sys.argv
+
+    print(f"{'size':>8} {'rows':>7} {'time':>9} {'MB/s':>8}" + ("  legacy" if legacy else ""))
+    per_mb = []
+    for mb in (1, 2, 4, 8):
+        html, count = build_page(mb * 1024 * 1024)
+        elapsed = time_it(lambda h: sum(1 for _ in nyaa_parser.parse_rows(h)), html)
+        parsed = sum(1 for _ in nyaa_parser.parse_rows(html))
+        assert parsed == count, f"parsed {parsed} rows, expected {count}"
+        per_mb.append(elapsed / mb)
+        line = f"{mb:>6}MB {count:>7} {elapsed:>8.3f}s {mb / elapsed:>8.2f}"
+        if legacy:
+            regex_time = time_it(lambda h: re.findall(LEGACY_PATTERN, h, re.DOTALL), html)
+            line += f"  {regex_time:.3f}s"
+        print(line)
+
+    ratio = per_mb[-1] / per_mb[0]
+    print(f"\nTime per MB, largest vs smallest page: {ratio:.2f}x (limit {max_ratio}x)")
+    if ratio > max_ratio:
+        print("✗ Parser is not scaling linearly")
+        sys.exit(1)
+    print("✓ Linear")
+
+
+if __name__ == "__main__":
+    main()
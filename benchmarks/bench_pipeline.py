@@ -0,0 +1,91 @@
+"""Benchmark a whole recorded pipeline run, replayed offline.
+
+Usage:
+    uv run main.py "<nyaa url>" "<drive url>" arc15-jaya --record cassettes/jaya
+    uv run benchmarks/bench_pipeline.py cassettes/jaya [--repeats 3]
+                                        [--latency 0] [--show]
+
+The command recorded in <cassette>/command.json is run again with
+`--replay <cassette>` in a fresh temporary folder for every repeat, so
+each run starts with no videos, subtitles or journal. No network, Drive or
+transmission-daemon is touched: every answer comes from the cassette.
+--latency scales the recorded response times (0 = instant, 1 = as recorded)
+to separate the pipeline's own cost from waiting on the network. Exits
+non-zero when a replayed run fails.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from cassette import COMMAND_NAME  # noqa: E402
+
+
+def replay(cassette: Path, command: dict, latency: float) -> tuple[float, subprocess.CompletedProcess]:
+    """Run the recorded command once against the cassette; return (seconds, result)."""
+    script, *subcommand = command["script"].split()
+    env = {
+        **os.environ,
+        **command["env"],
+        "ONEPACE_REPLAY_LATENCY": str(latency),
+    }
+    with tempfile.TemporaryDirectory(prefix="onepace-replay-") as workdir:
+        start = time.perf_counter()
+        result = subprocess.run(
+            [
+                sys.executable,
+                str(ROOT / script),
+                *subcommand,
+                *command["args"],
+                "--replay",
+                str(cassette),
+            ],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cassette", type=Path)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--show", action="store_true", help="print the last run's output")
+    args = parser.parse_args()
+
+    cassette = args.cassette.resolve()
+    try:
+        command = json.loads((cassette / COMMAND_NAME).read_text())
+    except (OSError, ValueError) as e:
+        print(f"✗ {cassette} is not a recorded run: {e}")
+        sys.exit(1)
+
+    print(f"Replaying: {command['script']} {' '.join(command['args'])}")
+    times = []
+    for _ in range(args.repeats):
+        elapsed, result = replay(cassette, command, args.latency)
+        if result.returncode != 0:
+            print(result.stdout + result.stderr)
+            print(f"✗ Replay failed (exit code {result.returncode})")
+            sys.exit(1)
+        times.append(elapsed)
+        print(f"   {elapsed:.2f}s")
+
+    if args.show:
+        print(result.stdout + result.stderr)
+    print(f"\n✓ best {min(times):.2f}s, worst {max(times):.2f}s over {len(times)} run(s)")
+
+
+if __name__ == "__main__":
+    main()
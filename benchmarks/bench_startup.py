@@ -0,0 +1,104 @@
+"""Benchmark how long each onepace.py command takes to import.
+
+Usage:
+    uv run benchmarks/bench_startup.py [--budget-ms 80] [--repeats 5]
+                                       [--filter NAME] [--show 8]
+
+For every command, a fresh interpreter runs `python -X importtime` on
+`import onepace; onepace.load(<command>)` and the import time spent after
+interpreter startup is added up (best of --repeats). Exits non-zero when a
+command goes over --budget-ms, or when it imports a module that should only
+load on demand (requests, pyfzf, gdown, cProfile). --show lists the
+slowest imports of each command to see where the time goes.
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from onepace import COMMANDS  # noqa: E402
+
+# Only imported when actually used (first download, fzf prompt, --profile)
+LAZY_MODULES = ("requests", "pyfzf", "gdown", "cProfile")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Return (module, depth, self µs, cumulative µs) for every import line."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative, name = line.split("|")
+        name = name.rstrip()[1:]  # one separator space, then two per level
+        depth = (len(name) - len(name.lstrip())) // 2
+        self_us = int(head.split(":")[1])
+        imports.append((name.strip(), depth, self_us, int(cumulative)))
+    return imports
+
+
+def measure(command: str | None) -> list[tuple[str, int, int, int]]:
+    """Imports made by onepace (and command) after interpreter startup."""
+    code = "import onepace" + (f"; onepace.load({command!r})" if command else "")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = parse_importtime(result.stderr)
+    # Everything up to and including `site` is interpreter startup
+    start = max(
+        i for i, (name, depth, _, _) in enumerate(imports) if name == "site" and depth == 0
+    )
+    return imports[start + 1 :]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=80)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--filter", default="")
+    parser.add_argument("--show", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'command':<12} {'import time':>12} {'modules':>8}")
+    for command in [None, *COMMANDS]:
+        label = command or "(help)"
+        if args.filter not in label:
+            continue
+
+        best = None
+        for _ in range(args.repeats):
+            imports = measure(command)
+            total = sum(cumulative for _, depth, _, cumulative in imports if depth == 0)
+            if best is None or total < best[0]:
+                best = (total, imports)
+        total, imports = best
+
+        print(f"{label:<12} {total / 1000:>10.1f}ms {len(imports):>8}")
+        for name, _, self_us, _ in sorted(imports, key=lambda i: -i[2])[: args.show]:
+            print(f"    {self_us / 1000:>7.2f}ms  {name}")
+
+        if total / 1000 > args.budget_ms:
+            failures.append(f"{label}: {total / 1000:.1f}ms > {args.budget_ms:g}ms")
+        loaded = {name for name, _, _, _ in imports}
+        for module in LAZY_MODULES:
+            if module in loaded:
+                failures.append(f"{label}: imports {module} at startup")
+
+    if failures:
+        print("\n✗ Over budget:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print(f"\n✓ Every command starts within {args.budget_ms:g}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Benchmark suite for the scrapers, parsers and matchers.
+
+Usage:
+    uv run benchmarks/run.py [--scales 1,10,100] [--filter NAME]
+                             [--save-baseline] [--max-regression 0.25]
+                             [--max-memory-regression 0.25] [--json FILE]
+
+Every case runs offline against the HTML fixtures in benchmarks/fixtures/,
+scaled up by repeating the block between `<!-- repeat -->` markers, or
+against synthetic filename lists. For each case and scale it reports the
+best-of-N time, throughput and peak traced memory.
+
+--save-baseline stores the results in benchmarks/baseline.json. Later runs
+compare against it and exit non-zero when a case is slower (or uses more
+memory) than the baseline by more than the allowed fraction.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT.parent))
+
+import http_cache  # noqa: E402
+from download_subtitles import SubtitleDownloader  # noqa: E402
+from episode_matcher import EpisodeMatcher  # noqa: E402
+from magnet_downloader import MagnetDownloader  # noqa: E402
+from match_onepace_subtitles import extract_episode_number  # noqa: E402
+import mkv_verify  # noqa: E402
+from onepace_site import generate_folder_name, parse_arcs, parse_sagas  # noqa: E402
+
+FIXTURES = ROOT / "fixtures"
+BASELINE = ROOT / "baseline.json"
+REPEATS = 5
+MIN_REPEAT_TIME = 0.05
+
+
+def scaled_fixture(name: str, scale: int) -> str:
+    """Return a fixture with its repeat block duplicated `scale` times."""
+    html = (FIXTURES / name).read_text()
+    head, rest = html.split("<!-- repeat -->", 1)
+    block, tail = rest.split("<!-- /repeat -->", 1)
+    return head + block * scale + tail
+
+
+class FixtureCache:
+    """Stands in for the HTTP cache, serving one body for every URL."""
+
+    def __init__(self, body: str) -> None:
+        self.body = body
+
+    def fetch_text(self, url: str, ttl: float | None = None) -> str:
+        return self.body
+
+
+@contextlib.contextmanager
+def serving(body: str):
+    """Route http_cache fetches to `body` for the duration of a case."""
+    previous = http_cache._default_cache
+    http_cache._default_cache = FixtureCache(body)
+    try:
+        yield
+    finally:
+        http_cache._default_cache = previous
+
+
+def synthetic_videos(count: int) -> list[Path]:
+    return [
+        Path(f"[One Pace][{i * 3}-{i * 3 + 2}] Jaya {i:02d} [1080p][{i:08X}].mkv")
+        for i in range(1, count + 1)
+    ]
+
+
+def synthetic_subtitles(count: int) -> list[Path]:
+    return [Path(f"Jaya {i:02d}.ass") for i in range(1, count + 1)]
+
+
+def _ebml(element_id: int, payload: bytes) -> bytes:
+    """One EBML element, always with an 8-byte size."""
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + (len(payload) | 1 << 56).to_bytes(8, "big") + payload
+
+
+def synthetic_mkv(path: Path, clusters: int = 25, cluster_size: int = 1 << 20) -> None:
+    """Write a structurally valid .mkv whose cluster payloads are sparse holes."""
+    m = mkv_verify
+
+    def seekhead(positions: dict[int, int]) -> bytes:
+        return _ebml(
+            m.SEEKHEAD_ID,
+            b"".join(
+                _ebml(
+                    m.SEEK_ID,
+                    _ebml(m.SEEK_ID_ID, element_id.to_bytes(4, "big"))
+                    + _ebml(m.SEEK_POSITION_ID, position.to_bytes(8, "big")),
+                )
+                for element_id, position in positions.items()
+            ),
+        )
+
+    info = _ebml(m.INFO_ID, _ebml(0x2AD7B1, (1_000_000).to_bytes(4, "big")))
+    tracks = _ebml(m.TRACKS_ID, _ebml(0xAE, _ebml(0xD7, b"\x01")))
+    head_size = len(seekhead({m.INFO_ID: 0, m.TRACKS_ID: 0, m.CUES_ID: 0}))
+    cluster_at = [
+        head_size + len(info) + len(tracks) + i * (12 + cluster_size) for i in range(clusters)
+    ]
+    cues = _ebml(
+        m.CUES_ID,
+        b"".join(
+            _ebml(
+                m.CUE_POINT_ID,
+                _ebml(
+                    m.CUE_TRACK_POSITIONS_ID,
+                    _ebml(m.CUE_CLUSTER_POSITION_ID, position.to_bytes(8, "big")),
+                ),
+            )
+            for position in cluster_at
+        ),
+    )
+    cues_at = head_size + len(info) + len(tracks) + clusters * (12 + cluster_size)
+    head = seekhead({m.INFO_ID: head_size, m.TRACKS_ID: head_size + len(info), m.CUES_ID: cues_at})
+
+    with open(path, "wb") as f:
+        f.write(_ebml(m.EBML_ID, _ebml(m.DOCTYPE_ID, b"matroska")))
+        segment_size = cues_at + len(cues)
+        f.write(m.SEGMENT_ID.to_bytes(4, "big") + (segment_size | 1 << 56).to_bytes(8, "big"))
+        f.write(head + info + tracks)
+        for _ in range(clusters):
+            f.write(m.CLUSTER_ID.to_bytes(4, "big") + (cluster_size | 1 << 56).to_bytes(8, "big"))
+            f.seek(cluster_size, 1)
+        f.write(cues)
+
+
+# Each case maps a scale to (setup -> (func, units, unit_name))
+def case_parse_sagas(scale: int):
+    html = scaled_fixture("onepace_home.html", scale)
+    return lambda: parse_sagas(html), len(html), "B"
+
+
+def case_parse_arcs(scale: int):
+    html = scaled_fixture("onepace_saga.html", scale)
+    return lambda: parse_arcs(html), len(html), "B"
+
+
+def case_extract_magnets(scale: int):
+    html = scaled_fixture("nyaa_search.html", scale)
+    downloader = MagnetDownloader("https://nyaa.si/?q=one+pace+jaya", "bench")
+
+    def run():
+        with serving(html):
+            return downloader._extract_magnets(downloader.torrent_url)
+
+    # Page 1 links to page 2, which the stand-in serves with the same body
+    return run, 2 * len(html), "B"
+
+
+def case_list_drive_folder(scale: int):
+    html = scaled_fixture("gdrive_folder.html", scale)
+    downloader = SubtitleDownloader("https://drive.google.com/drive/folders/x", "bench")
+
+    def run():
+        with serving(html), contextlib.redirect_stdout(io.StringIO()):
+            return list(downloader._list_folder(downloader.gdrive_url))
+
+    # The root lists one subfolder, which the stand-in serves with the same body
+    return run, 2 * len(html), "B"
+
+
+def case_extract_episode_number(scale: int):
+    names = [p.name for p in synthetic_videos(100 * scale)]
+    names += [p.name for p in synthetic_subtitles(100 * scale)]
+    return (
+        lambda: [extract_episode_number(n, "Jaya") for n in names],
+        len(names),
+        "files",
+    )
+
+
+def case_match_plan(scale: int):
+    videos = synthetic_videos(100 * scale)
+    subtitles = synthetic_subtitles(100 * scale)
+    matcher = EpisodeMatcher("Jaya")
+    return lambda: matcher.plan(videos, subtitles), len(videos) + len(subtitles), "files"
+
+
+def case_generate_folder_name(scale: int):
+    arcs = parse_arcs(scaled_fixture("onepace_saga.html", scale * 10))
+    names = [arc["name"] for arc in arcs]
+    return lambda: [generate_folder_name(n) for n in names], len(names), "names"
+
+
+def case_verify_mkv(scale: int):
+    # An arc's worth of videos per scale step; kept alive by the closure
+    folder = tempfile.TemporaryDirectory(prefix="onepace-bench-")
+    paths = [Path(folder.name, f"Jaya {i:02d}.mkv") for i in range(1, 20 * scale + 1)]
+    for path in paths:
+        synthetic_mkv(path)
+
+    def run():
+        results = mkv_verify.verify_videos(paths)
+        assert folder and all(r["ok"] for r in results)
+        return results
+
+    return run, len(paths), "files"
+
+
+CASES: dict[str, Callable] = {
+    "parse_sagas": case_parse_sagas,
+    "parse_arcs": case_parse_arcs,
+    "extract_magnets": case_extract_magnets,
+    "list_drive_folder": case_list_drive_folder,
+    "extract_episode_number": case_extract_episode_number,
+    "match_plan": case_match_plan,
+    "generate_folder_name": case_generate_folder_name,
+    "verify_mkv": case_verify_mkv,
+}
+
+
+def measure(func: Callable, repeats: int) -> tuple[float, int]:
+    """Return (best time per call, peak traced bytes) for func.
+
+    Like timeit's autorange, fast calls are looped until one repeat takes
+    at least MIN_REPEAT_TIME so sub-millisecond cases are not just noise.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= MIN_REPEAT_TIME:
+            break
+        loops *= 2
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def format_rate(units: float, unit: str) -> str:
+    if unit == "B":
+        return f"{units / 1024 / 1024:8.2f} MB/s"
+    return f"{units:8.0f} {unit}/s"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--filter", default="")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    parser.add_argument("--max-memory-regression", type=float, default=0.25)
+    parser.add_argument("--json", type=Path)
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",")]
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+
+    results = {}
+    failures = []
+    print(f"{'case':<32} {'scale':>5} {'time':>10} {'throughput':>16} {'peak mem':>10}")
+    for name, case in CASES.items():
+        if args.filter not in name:
+            continue
+        for scale in scales:
+            func, units, unit = case(scale)
+            elapsed, peak = measure(func, args.repeats)
+            key = f"{name}@{scale}"
+            results[key] = {"time": elapsed, "peak": peak}
+
+            line = (
+                f"{name:<32} {scale:>4}x {elapsed * 1000:>8.2f}ms "
+                f"{format_rate(units / elapsed, unit):>16} {peak / 1024:>8.0f}KB"
+            )
+            previous = baseline.get(key)
+            if previous:
+                slower = elapsed / previous["time"] - 1
+                bigger = peak / max(previous["peak"], 1) - 1
+                line += f"  {slower:+.0%} time, {bigger:+.0%} mem"
+                if slower > args.max_regression:
+                    failures.append(f"{key}: {slower:+.0%} time")
+                if bigger > args.max_memory_regression:
+                    failures.append(f"{key}: {bigger:+.0%} memory")
+            print(line)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"\n✓ Baseline saved to {args.baseline}")
+        return
+
+    if failures:
+        print("\n✗ Regressions:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    if baseline:
+        print("\n✓ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Bencode encoding and decoding (the .torrent metainfo format).
+
+Strings decode to bytes, so binary fields such as `pieces` survive
+untouched; dictionary keys are bytes too.
+
+Usage:
+    meta = decode(Path("file.torrent").read_bytes())
+    name = meta[b"info"][b"name"].decode()
+"""
+
+
+class BencodeError(ValueError):
+    """Raised for malformed bencoded data."""
+
+
+def _decode(data: bytes, i: int):
+    try:
+        token = data[i : i + 1]
+        if token == b"i":
+            end = data.index(b"e", i)
+            return int(data[i + 1 : end]), end + 1
+        if token == b"l":
+            items, i = [], i + 1
+            while data[i : i + 1] != b"e":
+                item, i = _decode(data, i)
+                items.append(item)
+            return items, i + 1
+        if token == b"d":
+            result, i = {}, i + 1
+            while data[i : i + 1] != b"e":
+                key, i = _decode(data, i)
+                if not isinstance(key, bytes):
+                    raise BencodeError(f"dictionary key at offset {i} is not a string")
+                result[key], i = _decode(data, i)
+            return result, i + 1
+        if token.isdigit():
+            colon = data.index(b":", i)
+            length = int(data[i:colon])
+            start = colon + 1
+            if start + length > len(data):
+                raise BencodeError(f"string at offset {i} runs past the end")
+            return data[start : start + length], start + length
+    except ValueError as e:
+        if isinstance(e, BencodeError):
+            raise
+        raise BencodeError(f"malformed value at offset {i}") from e
+    raise BencodeError(f"unexpected {token!r} at offset {i}")
+
+
+def decode(data: bytes):
+    """Decode one bencoded value.
+
+    Raises:
+        BencodeError: if data is malformed or has trailing bytes
+    """
+    value, end = _decode(data, 0)
+    if end != len(data):
+        raise BencodeError(f"trailing data at offset {end}")
+    return value
+
+
+def encode(value) -> bytes:
+    """Encode ints, bytes/str, lists and dicts (keys sorted, as required)."""
+    if isinstance(value, bool):
+        raise TypeError("cannot bencode a bool")
+    if isinstance(value, int):
+        return b"i%de" % value
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    if isinstance(value, bytes):
+        return b"%d:%s" % (len(value), value)
+    if isinstance(value, list | tuple):
+        return b"l" + b"".join(encode(v) for v in value) + b"e"
+    if isinstance(value, dict):
+        items = sorted(
+            (k.encode("utf-8") if isinstance(k, str) else k, v) for k, v in value.items()
+        )
+        return b"d" + b"".join(encode(k) + encode(v) for k, v in items) + b"e"
+    raise TypeError(f"cannot bencode {type(value).__name__}")
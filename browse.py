@@ -4,159 +4,49 @@ One Pace Interactive Browser with Scraping & fzf Selection
 Scrapes https://onepaceptbr.github.io/ to list sagas and arcos, then offers
 interactive selection via fzf to automatically execute the complete download pipeline.
 
+Several sagas or arcs can be marked with TAB; they are queued and run
+concurrently with per-stage limits (see scheduler.py).
+
 Usage:
-    uv run browse.py
+    uv run browse.py [--refresh] [--fresh] [--trace FILE] [--profile[=FILE]]
+                     [--record DIR | --replay DIR]
+
+Sagas and arcs come from a local catalog (see catalog.py) that is refreshed
+in the background on each launch; --refresh re-crawls the site first and
+searches nyaa and Drive again for new releases of the selected arcs.
+Each arc folder keeps a journal of finished steps (see journal.py), so
+re-running an arc only repeats what is missing; --fresh ignores it.
+--trace and --profile record step timings and a cProfile of the pipeline
+run, worker threads included (see telemetry.py). --record/--replay save the run's
+network traffic to a cassette or run offline from one (see cassette.py).
 
 Requires system packages:
     - fzf (install: sudo pacman -S fzf / apt install fzf / brew install fzf)
-    - curl (usually pre-installed)
     - transmission-cli (for episode downloads)
 """
 
-import re
 import sys
-import time
-import shutil
-import subprocess
-from pyfzf.pyfzf import FzfPrompt
+from functools import partial
 
 from pathlib import Path
 from main import (
-    MagnetDownloader,
-    SubtitleDownloader,
     flatten_video_folders,
     get_summary,
+    open_journal,
     print_step,
     print_separator,
+    run_download_stages,
 )
-from match_onepace_subtitles import extract_episode_number, guess_arc_name
-
-SITE_BASE = "https://onepaceptbr.github.io"
-
-
-def fetch_html(url: str) -> str:
-    """Fetch HTML from URL using curl."""
-    try:
-        result = subprocess.run(
-            ["curl", "-s", "--compressed", url],
-            capture_output=True,
-            text=True,
-            timeout=30,
-        )
-        if result.returncode != 0:
-            raise RuntimeError(f"curl failed with code {result.returncode}")
-        if not result.stdout:
-            raise RuntimeError(f"Empty response from {url}")
-        return result.stdout
-    except FileNotFoundError:
-        print("✗ curl não encontrado. Instale com: sudo pacman -S curl")
-        sys.exit(1)
-    except subprocess.TimeoutExpired:
-        print(f"✗ Timeout ao baixar {url}")
-        sys.exit(1)
-
-
-def parse_sagas(html: str) -> list[dict]:
-    """Extract sagas from main page."""
-    pattern = r'href="(https://onepaceptbr\.github\.io/[^"]+)"[^>]*>.*?<h[23][^>]*>([^<]+)</h[23]>'
-    matches = re.findall(pattern, html, re.DOTALL)
-
-    sagas = []
-    for url, name in matches:
-        name = name.strip()
-        if "saga" in name.lower() or "especiais" in name.lower():
-            sagas.append({"name": name, "url": url})
-
-    return sagas
-
-
-def extract_arc_number(arc_name: str) -> float:
-    """Extract arc number for sorting. Returns 999 if no number found."""
-    match = re.search(r"Arco\s+([\d.]+)", arc_name)
-    if match:
-        return float(match.group(1))
-    return 999.0
-
-
-def extract_password(html: str) -> str | None:
-    """Extract ZIP password from page if available."""
-    match = re.search(r"<strong>Senha[^:]*:</strong>\s*([^<]+)", html, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    return None
-
-
-def parse_arcs(html: str) -> list[dict]:
-    """Extract arcs from saga page. Handles two formats: popup and direct link."""
-    arcs = []
-
-    # Format 1: Popup with both nyaa and gdrive links
-    popup_pattern = r'onclick="abrirPopup\(this,\s*\'([^\']+)\',\s*\'([^\']+)\'\)".*?<h3>([^<]+)</h3>'
-    popup_matches = re.findall(popup_pattern, html, re.DOTALL)
-    for nyaa_url, gdrive_url, name in popup_matches:
-        arcs.append(
-            {
-                "name": name.strip(),
-                "nyaa_url": nyaa_url.strip(),
-                "gdrive_url": gdrive_url.strip(),
-            }
-        )
-
-    # Format 2: Direct link (nyaa or gdrive, no popup)
-    direct_pattern = r'<a\s+href="([^"]+)"\s+class="arc"[^>]*>.*?<h3>([^<]+)</h3>'
-    direct_matches = re.findall(direct_pattern, html, re.DOTALL)
-    for url, name in direct_matches:
-        # Classify the URL
-        if "nyaa.si" in url:
-            arcs.append(
-                {
-                    "name": name.strip(),
-                    "nyaa_url": url.strip(),
-                    "gdrive_url": None,
-                }
-            )
-        elif "drive.google.com" in url:
-            arcs.append(
-                {
-                    "name": name.strip(),
-                    "nyaa_url": None,
-                    "gdrive_url": url.strip(),
-                }
-            )
-
-    # Filter out arcs without any link
-    arcs = [arc for arc in arcs if arc["nyaa_url"] or arc["gdrive_url"]]
-
-    # Sort arcs by number
-    arcs.sort(key=lambda arc: extract_arc_number(arc["name"]))
+from catalog import get_catalog, load_catalog, refresh_in_background
+from http_cache import FetchError
+from mkv_verify import print_problems, verify_videos
+from onepace_site import SITE_BASE
+from scheduler import PipelineScheduler
+from torrent_verify import resume_incomplete
+import cassette
+import telemetry
 
-    return arcs
-
-
-def generate_folder_name(arc_name: str) -> str:
-    """Convert arc name to folder name: 'Arco 8 - Reverse Mountain' → 'arc08-reverse-mountain'."""
-    match = re.match(r"Arco\s+([\d.]+)\s*-\s*(.+)", arc_name.strip())
-    if not match:
-        # Fallback for names without standard pattern
-        slug = arc_name.lower().replace(" ", "-")
-        slug = re.sub(r"[^a-z0-9-]", "", slug)
-        slug = re.sub(r"-+", "-", slug).strip("-")
-        return slug
-
-    num_str, name = match.group(1), match.group(2).strip()
-
-    # Zero-pad only integers < 10
-    if "." not in num_str and int(num_str) < 10:
-        num_padded = num_str.zfill(2)
-    else:
-        num_padded = num_str
-
-    # Normalize name: lowercase, spaces→hyphens, remove special chars
-    name = name.lower().replace(" ", "-").replace("'", "")
-    name = re.sub(r"[^a-z0-9-]", "", name)
-    name = re.sub(r"-+", "-", name).strip("-")
-
-    return f"arc{num_padded}-{name}"
+ALL_ARCS = "★ Todos os arcos desta saga"
 
 
 def get_arc_status(arc: dict) -> str:
@@ -172,14 +62,13 @@ def get_arc_status(arc: dict) -> str:
         return "[apenas gdrive]"
 
 
-def run_fzf(items: list[str], prompt: str = "Select: ") -> str | None:
-    """Run fzf with given items and return selected item, or None if cancelled."""
+def _fzf(items: list[str], options: str) -> list[str]:
+    # Imported here so the module loads without pyfzf until a prompt is needed
+    from pyfzf.pyfzf import FzfPrompt
+
     try:
         fzf = FzfPrompt()
-        result = fzf.prompt(items, fzf_options=f"--prompt '{prompt}' --height 40% --reverse")
-        if result:
-            return result[0]
-        return None
+        return fzf.prompt(items, fzf_options=options)
     except FileNotFoundError:
         print("✗ fzf não encontrado. Instale com: sudo pacman -S fzf")
         sys.exit(1)
@@ -188,79 +77,46 @@ def run_fzf(items: list[str], prompt: str = "Select: ") -> str | None:
         sys.exit(0)
 
 
-def wait_for_videos(folder_name: str, timeout: int = 30) -> bool:
-    """Wait for video files to appear in folder (with metadata).
-
-    Sometimes videos take a moment to fully appear in the filesystem.
-    Returns True if videos found, False if timeout.
-    """
-    folder_path = Path(folder_name)
-    start_time = time.time()
+def run_fzf(items: list[str], prompt: str = "Select: ") -> str | None:
+    """Run fzf with given items and return selected item, or None if cancelled."""
+    result = _fzf(items, f"--prompt '{prompt}' --height 40% --reverse")
+    if result:
+        return result[0]
+    return None
 
-    while time.time() - start_time < timeout:
-        videos = list(folder_path.rglob("*.mkv"))
-        if videos:
-            # Found videos, wait a bit more for metadata to settle
-            time.sleep(1)
-            return True
-        time.sleep(0.5)
 
-    return False
+def run_fzf_multi(items: list[str], prompt: str = "Select: ") -> list[str]:
+    """Run fzf allowing several items (TAB to mark); empty list if cancelled."""
+    return _fzf(items, f"--multi --prompt '{prompt}' --height 40% --reverse")
 
 
-def match_subtitles(folder_name: str) -> int:
-    """Match and rename subtitles to video filenames.
+def run_pipeline(
+    arc: dict,
+    folder_name: str,
+    zip_password: str | None = None,
+    scheduler: PipelineScheduler | None = None,
+    fresh: bool = False,
+    refresh: bool = False,
+) -> None:
+    """Execute the download pipeline with selected arc data.
 
-    Returns number of successfully matched subtitles.
+    In batch mode `scheduler` limits how many pipelines run each stage at once.
+    Steps recorded in the arc's journal are skipped unless `fresh` is set;
+    `refresh` only repeats the nyaa and Drive searches.
     """
-    folder_path = Path(folder_name)
-    subtitle_dir = folder_path / "subtitles"
-
-    if not subtitle_dir.exists():
-        return 0
-
-    # Wait for videos to appear
-    if not wait_for_videos(folder_name, timeout=30):
-        return 0
-
-    # Get all video files (recursively, in case they're in subfolders)
-    videos = sorted([f for f in folder_path.rglob("*.mkv")])
-    subtitles = sorted([f for f in subtitle_dir.glob("*.ass")])
-
-    if not videos or not subtitles:
-        return 0
-
-    # Guess arc name from videos
-    arc_name = guess_arc_name(videos)
-
-    # Build subtitle map by episode number
-    subtitle_map: dict[str, Path] = {}
-    for sub in subtitles:
-        ep_num = extract_episode_number(sub.name, arc_name or "")
-        if ep_num:
-            subtitle_map[ep_num] = sub
-
-    # Match and rename
-    matched_count = 0
-    for video in videos:
-        ep_num = extract_episode_number(video.name, arc_name or "")
-        if ep_num and ep_num in subtitle_map:
-            old_sub = subtitle_map[ep_num]
-            new_sub_name = video.name.replace(".mkv", ".ass")
-            # Put subtitle in the same directory as the video
-            new_sub_path = video.parent / new_sub_name
-
-            try:
-                old_sub.rename(new_sub_path)
-                matched_count += 1
-            except Exception:
-                pass  # Silent fail, continue
-
-    return matched_count
-
-
-def run_pipeline(arc: dict, folder_name: str, zip_password: str | None = None) -> None:
-    """Execute the download pipeline with selected arc data."""
+    with telemetry.span("pipeline", arc=arc["name"], folder=folder_name):
+        _run_pipeline(arc, folder_name, zip_password, scheduler, fresh, refresh)
+
+
+def _run_pipeline(
+    arc: dict,
+    folder_name: str,
+    zip_password: str | None,
+    scheduler: PipelineScheduler | None,
+    fresh: bool,
+    refresh: bool,
+) -> None:
+    journal = open_journal(folder_name, fresh=fresh, refresh=refresh)
     nyaa_url = arc["nyaa_url"]
     gdrive_url = arc["gdrive_url"]
 
@@ -269,76 +125,55 @@ def run_pipeline(arc: dict, folder_name: str, zip_password: str | None = None) -
     print(f"   Folder: {folder_name}")
     print_separator()
 
-    # Pre-flight: Clean up any corrupted partial downloads
-    folder_path = Path(folder_name)
-    if folder_path.exists():
-        # Remove subdirectories that might contain corrupted torrent files
-        for subdir in folder_path.iterdir():
-            if subdir.is_dir() and subdir.name not in ("subtitles",):
-                # Check if this looks like a corrupted torrent folder (has incomplete .mkv files)
-                mkv_files = list(subdir.glob("*.mkv"))
-                if mkv_files:
-                    # Check file sizes - if very small or incomplete, it's likely corrupted
-                    total_size = sum(f.stat().st_size for f in mkv_files)
-                    if total_size < 100_000_000:  # Less than 100MB = incomplete
-                        try:
-                            shutil.rmtree(subdir)
-                            print(f"🧹 Cleaned up incomplete download folder: {subdir.name}")
-                        except Exception as e:
-                            print(f"⚠ Could not clean: {e}")
-
-    # Step 1: Download episodes (if nyaa available)
-    if nyaa_url:
-        print_step(1, "Downloading episodes from nyaa.si")
-        count_episodes = MagnetDownloader(nyaa_url, folder_name).download()
-        if count_episodes > 0:
-            print(f"✓ {count_episodes} episodes downloaded!")
-        else:
-            print("ℹ No episodes found in search results")
-    else:
-        print_step(1, "Skipping nyaa (not available for this arc)")
-
-    # Step 2: Download subtitles (if gdrive available)
-    if gdrive_url:
-        print_step(2, "Downloading subtitles from Google Drive")
-        downloader = SubtitleDownloader(gdrive_url, folder_name)
-        # Pass password if available (for encrypted ZIPs)
-        if zip_password:
-            downloader.set_password(zip_password)
-        count_subtitles = downloader.download()
-        if count_subtitles > 0:
-            print(f"✓ {count_subtitles} subtitles downloaded!")
-        else:
-            print("ℹ No subtitles found in drive")
-    else:
-        print_step(2, "Skipping gdrive (not available for this arc)")
+    # Pre-flight: pick interrupted downloads back up instead of restarting them
+    with telemetry.span("preflight"):
+        resume_partial_downloads(Path(folder_name))
+
+    # Episodes from nyaa.si, subtitles from Drive and matching run side by side
+    print_step(1, "Downloading episodes and subtitles, matching as they land")
+    if not nyaa_url:
+        print("ℹ Skipping nyaa (not available for this arc)")
+    if not gdrive_url:
+        print("ℹ Skipping gdrive (not available for this arc)")
+    # Password (if any) is for the encrypted subtitle ZIPs
+    count_episodes, count_subtitles, matched_count = run_download_stages(
+        journal, folder_name, nyaa_url, gdrive_url, zip_password, scheduler, refresh
+    )
+
+    print_step(2, "Download results")
+    if count_episodes:
+        print(f"✓ {count_episodes} episodes downloaded!")
+    elif nyaa_url:
+        print("ℹ No episodes found in search results")
+    if count_subtitles:
+        print(f"✓ {count_subtitles} subtitles downloaded!")
+    elif gdrive_url:
+        print("ℹ No subtitles found in drive")
+    if matched_count:
+        print(f"✓ Matched {matched_count} subtitle(s) to video(s)")
+    elif gdrive_url:
+        print("ℹ Could not match subtitles automatically")
 
     # Step 2.5: Flatten video folders
     print_separator()
     print("🔍 Checking for videos in subdirectories...")
     print_separator()
-    moved_count = flatten_video_folders(folder_name)
+    with telemetry.span("flatten"):
+        moved_count = flatten_video_folders(folder_name)
+        telemetry.add("files", moved_count)
     if moved_count > 0:
         print(f"\n✓ Moved {moved_count} video(s) to main folder")
     else:
         print("\n✓ All videos are already in the main folder")
 
-    # Step 2.75: Match subtitles to videos
-    if gdrive_url:
-        print_separator()
-        print("🎬 Matching subtitles to videos...")
-        print_separator()
-        matched_count = match_subtitles(folder_name)
-        if matched_count > 0:
-            print(f"✓ Matched {matched_count} subtitle(s) to video(s)")
-        else:
-            print("ℹ Could not match subtitles automatically")
-
     # Step 3: Show summary
     print_step(3, "Download Summary")
-    ass_files, mkv_files = get_summary(folder_name)
+    with telemetry.span("summary"):
+        ass_files, mkv_files = get_summary(folder_name)
     print(f"✓ Videos downloaded: {len(mkv_files)}")
     print(f"✓ Subtitles downloaded: {len(ass_files)}")
+    with telemetry.span("verify"):
+        print_problems(verify_videos(mkv_files))
 
     print_separator()
     print("✓ PIPELINE COMPLETED SUCCESSFULLY!")
@@ -349,65 +184,136 @@ def run_pipeline(arc: dict, folder_name: str, zip_password: str | None = None) -
         print("   You can now watch with: mpv " + folder_name + "/")
 
 
+def resume_partial_downloads(folder_path: Path) -> None:
+    """Let interrupted torrents of this arc resume (see torrent_verify)."""
+    if not folder_path.exists():
+        return
+    for result in resume_incomplete(folder_path):
+        if not result["metadata"]:
+            print(f"▶ Resuming (waiting for metadata): {result['name']}")
+        elif result["pieces"] is None:
+            print(f"▶ Resuming {result['name']}: {result['percent_done']:.0%} done")
+        else:
+            note = ", re-verifying in transmission" if result["reverified"] else ""
+            print(
+                f"▶ Resuming {result['name']}: "
+                f"{result['valid']}/{result['pieces']} pieces on disk{note}"
+            )
+
+
+def run_batch(
+    jobs: list[tuple[dict, str, str | None]], fresh: bool = False, refresh: bool = False
+) -> None:
+    """Run several arc pipelines concurrently under one scheduler."""
+    scheduler = PipelineScheduler()
+    print(
+        f"🚀 Running {len(jobs)} pipelines "
+        f"(scrape={scheduler.limits['scrape']}, "
+        f"torrent={scheduler.limits['torrent']}, "
+        f"drive={scheduler.limits['drive']})"
+    )
+    results = scheduler.run(
+        [
+            (arc["name"], partial(run_pipeline, arc, folder, password, scheduler, fresh, refresh))
+            for arc, folder, password in jobs
+        ]
+    )
+
+    print_step(4, "Batch Summary")
+    for result in results:
+        if result["ok"]:
+            print(f"✓ {result['name']}")
+        else:
+            print(f"✗ {result['name']}: {result['error']}")
+    failed = sum(1 for result in results if not result["ok"])
+    print_separator()
+    print(f"✓ {len(results) - failed}/{len(results)} arcs completed")
+    print_separator()
+
+
 def main() -> None:
-    """Main interactive flow: fetch sagas → select saga → fetch arcs → select arc → run pipeline."""
+    """Main interactive flow: fetch sagas → select saga(s) → select arc(s) → run pipelines."""
     print("\n📚 One Pace Interactive Browser\n")
 
-    # Step 1: Fetch and display sagas
-    print("🔄 Loading sagas...")
-    html = fetch_html(SITE_BASE)
-    sagas = parse_sagas(html)
+    profile_path = telemetry.consume_flags(sys.argv)
+    cassette.consume_flags(sys.argv)
+
+    # Step 1: Load sagas from the local catalog (crawled on first launch)
+    refresh = "--refresh" in sys.argv[1:]
+    fresh = "--fresh" in sys.argv[1:]
+    try:
+        stored = None if refresh else load_catalog()
+        if stored is None:
+            print("🔄 Loading sagas...")
+            stored = get_catalog(force=refresh)
+        else:
+            # Show the stored catalog now, pick up site changes for next launch
+            refresh_in_background()
+    except FetchError as e:
+        print(f"✗ Erro ao baixar {SITE_BASE}: {e}")
+        sys.exit(1)
+    sagas = stored["sagas"]
 
     if not sagas:
         print("✗ No sagas found on the website")
         sys.exit(1)
 
     saga_names = [saga["name"] for saga in sagas]
-    selected_saga_name = run_fzf(saga_names, "Select saga: ")
-    if not selected_saga_name:
+    selected_saga_names = run_fzf_multi(saga_names, "Select saga (TAB = várias): ")
+    if not selected_saga_names:
         print("✗ No saga selected")
         sys.exit(1)
 
-    selected_saga = next(s for s in sagas if s["name"] == selected_saga_name)
-    print(f"\n✓ Selected: {selected_saga_name}\n")
+    selected_sagas = [s for s in sagas if s["name"] in selected_saga_names]
+    print(f"\n✓ Selected: {', '.join(selected_saga_names)}\n")
 
-    # Step 2: Fetch and display arcs
-    print("🔄 Loading arcs...")
-    html = fetch_html(selected_saga["url"])
-    arcs = parse_arcs(html)
-    zip_password = extract_password(html)  # Extract ZIP password if available
+    # Step 2: Display arcs
+    # (arc, zip_password) for every selected arc
+    selected: list[tuple[dict, str | None]] = []
 
-    if not arcs:
-        print("✗ No arcs found in this saga")
-        sys.exit(1)
-
-    # Build display strings with status
-    arc_displays = [
-        f"{arc['name']:<40} {get_arc_status(arc)}" for arc in arcs
-    ]
+    if len(selected_sagas) > 1:
+        # Several sagas: queue every arc of each one
+        for saga in selected_sagas:
+            selected.extend((arc, saga["password"]) for arc in saga["arcs"])
+    else:
+        arcs, zip_password = selected_sagas[0]["arcs"], selected_sagas[0]["password"]
+        if not arcs:
+            print("✗ No arcs found in this saga")
+            sys.exit(1)
+
+        # Build display strings with status
+        arc_by_display = {
+            f"{arc['name']:<40} {get_arc_status(arc)}": arc for arc in arcs
+        }
+        choices = run_fzf_multi(
+            [ALL_ARCS, *arc_by_display], "Select arc (TAB = vários): "
+        )
+        if ALL_ARCS in choices:
+            selected = [(arc, zip_password) for arc in arcs]
+        else:
+            selected = [(arc_by_display[c], zip_password) for c in choices]
 
-    selected_display = run_fzf(arc_displays, "Select arc: ")
-    if not selected_display:
+    if not selected:
         print("✗ No arc selected")
         sys.exit(1)
 
-    # Extract original arc name from display string
-    arc_name = selected_display.split("[")[0].strip()
-    selected_arc = next(arc for arc in arcs if arc["name"] == arc_name)
-    folder_name = generate_folder_name(arc_name)
-
-    print(f"\n✓ Selected: {arc_name}")
-    print(f"   Folder: {folder_name}\n")
+    jobs = [(arc, arc["folder"], zip_password) for arc, zip_password in selected]
 
     # Step 3: Confirm before running
     print_separator()
     print("Confirming download details:")
-    print(f"  Arc: {selected_arc['name']}")
-    print(f"  Folder: {folder_name}")
-    if selected_arc["nyaa_url"]:
-        print(f"  Nyaa: {selected_arc['nyaa_url'][:60]}...")
-    if selected_arc["gdrive_url"]:
-        print(f"  Drive: {selected_arc['gdrive_url'][:60]}...")
+    if len(jobs) == 1:
+        selected_arc, folder_name, _ = jobs[0]
+        print(f"  Arc: {selected_arc['name']}")
+        print(f"  Folder: {folder_name}")
+        if selected_arc["nyaa_url"]:
+            print(f"  Nyaa: {selected_arc['nyaa_url'][:60]}...")
+        if selected_arc["gdrive_url"]:
+            print(f"  Drive: {selected_arc['gdrive_url'][:60]}...")
+    else:
+        print(f"  {len(jobs)} arcs:")
+        for arc, folder_name, _ in jobs:
+            print(f"  - {arc['name']:<40} → {folder_name} {get_arc_status(arc)}")
     print_separator()
 
     confirm = input("Continue with download? (Y/n): ").strip().lower()
@@ -415,9 +321,13 @@ def main() -> None:
         print("✗ Cancelled")
         sys.exit(0)
 
-    # Step 4: Run pipeline
+    # Step 4: Run pipeline(s)
     print()
-    run_pipeline(selected_arc, folder_name, zip_password)
+    with telemetry.profile(profile_path):
+        if len(jobs) == 1:
+            run_pipeline(*jobs[0], fresh=fresh, refresh=refresh)
+        else:
+            run_batch(jobs, fresh=fresh, refresh=refresh)
 
 
 if __name__ == "__main__":
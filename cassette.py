@@ -0,0 +1,252 @@
+"""Record a run's network traffic and replay it offline.
+
+Every exchange with the outside world goes through `exchange()`: HTTP GETs
+(http_cache.py), transmission RPC calls (transmission_rpc.py) and Drive
+file downloads (download_subtitles.py). In record mode each exchange is
+performed and written to a cassette directory; in replay mode nothing
+touches the network, the daemon or Drive, and recorded answers (errors
+included) are served instead, so a whole pipeline run can be repeated
+deterministically on a machine without network:
+
+    <cassette>/exchanges.jsonl   one line per exchange, in call order:
+        {"kind": "http", "request": {"url": ...}, "seq": 0,
+         "elapsed": 0.31, "response": [200, {...}, {"$body": "9f86..."}]}
+        (a failed exchange has "error": {"type", "bases", "message"} instead)
+    <cassette>/bodies/<sha256>   response payloads (pages, subtitle files)
+    <cassette>/command.json      the recorded command line and ONEPACE_* settings
+
+An exchange is looked up by kind and request; the n-th identical request of
+a run gets the n-th recorded answer (the last one once they run out), so
+polling replays as it happened. Paths under the working directory are
+stored relative to it, so a cassette replays from any folder. With
+ONEPACE_REPLAY_LATENCY=1 each answer takes as long as it did when recorded
+(a multiplier; default 0, answer immediately); rate-limit and retry waits
+are not replayed.
+
+The gdown subprocess fallbacks are not recorded; replay skips them.
+
+Command-line switches (understood by main.py, browse.py, magnet_downloader.py
+and download_subtitles.py):
+    --record DIR    record into DIR (or set ONEPACE_RECORD=DIR)
+    --replay DIR    replay from DIR (or set ONEPACE_REPLAY=DIR)
+"""
+
+import builtins
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+EXCHANGES_NAME = "exchanges.jsonl"
+COMMAND_NAME = "command.json"
+CWD_MARK = "$CWD"
+
+_lock = threading.Lock()
+_mode: str | None = None
+_directory: Path | None = None
+_recorded: dict[str, list[dict]] = {}
+_counts: dict[str, int] = {}
+
+
+class CassetteMiss(OSError):
+    """Replay was asked for an exchange the cassette does not contain."""
+
+
+def configure(record: str | Path | None = None, replay: str | Path | None = None) -> None:
+    """Start recording into `record` or replaying from `replay` (or neither)."""
+    global _mode, _directory, _recorded
+    with _lock:
+        _counts.clear()
+        _recorded = {}
+        if record:
+            _mode, _directory = "record", Path(record)
+            (_directory / "bodies").mkdir(parents=True, exist_ok=True)
+            # A new recording replaces the previous one
+            (_directory / EXCHANGES_NAME).write_text("")
+        elif replay:
+            _mode, _directory = "replay", Path(replay)
+            _recorded = _load(_directory)
+        else:
+            _mode, _directory = None, None
+
+
+def recording() -> bool:
+    return _mode == "record"
+
+
+def replaying() -> bool:
+    return _mode == "replay"
+
+
+def enabled() -> bool:
+    return _mode is not None
+
+
+def _load(directory: Path) -> dict[str, list[dict]]:
+    recorded: dict[str, list[dict]] = {}
+    try:
+        lines = (directory / EXCHANGES_NAME).read_text().splitlines()
+    except OSError as e:
+        raise CassetteMiss(f"No cassette in {directory}: {e}") from e
+    for line in lines:
+        if line.strip():
+            item = json.loads(line)
+            recorded.setdefault(_key(item["kind"], item["request"]), []).append(item)
+    for items in recorded.values():
+        items.sort(key=lambda item: item["seq"])
+    return recorded
+
+
+def _key(kind: str, request) -> str:
+    return f"{kind} {json.dumps(request, sort_keys=True, ensure_ascii=False)}"
+
+
+def _encode(value):
+    """JSON-ready copy of value: bytes go to bodies/, cwd paths become $CWD."""
+    if isinstance(value, bytes):
+        digest = hashlib.sha256(value).hexdigest()
+        path = _directory / "bodies" / digest
+        if not path.exists():
+            tmp = path.with_name(f"{digest}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(value)
+            os.replace(tmp, path)
+        return {"$body": digest}
+    if isinstance(value, str):
+        cwd = os.getcwd()
+        if value == cwd or value.startswith(cwd + os.sep):
+            return CWD_MARK + value[len(cwd) :]
+        return value
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if set(value) == {"$body"}:
+            return (_directory / "bodies" / value["$body"]).read_bytes()
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, str) and value.startswith(CWD_MARK):
+        return os.getcwd() + value[len(CWD_MARK) :]
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _error_class(names: list[str], errors: tuple[type[Exception], ...]) -> type[Exception]:
+    """The recorded error's class, or its closest known base class.
+
+    `names` is the recorded class followed by its bases (most derived
+    first), so e.g. urllib's URLError replays as OSError and is caught by
+    the same handlers as during the recording.
+    """
+    for name in names:
+        for cls in errors:
+            if cls.__name__ == name:
+                return cls
+        cls = getattr(builtins, name, None)
+        if isinstance(cls, type) and issubclass(cls, Exception) and cls is not Exception:
+            return cls
+    return errors[0]
+
+
+def exchange(
+    kind: str,
+    request,
+    perform: Callable,
+    errors: tuple[type[Exception], ...] = (OSError,),
+):
+    """Return perform()'s result, recording or replaying it as configured.
+
+    `request` (JSON-serialisable, no bytes) identifies the exchange;
+    perform() must return JSON-serialisable data (bytes allowed).
+    Exceptions of the types in `errors` are recorded and raised again on
+    replay.
+
+    Raises:
+        CassetteMiss: when replaying a request that was never recorded.
+    """
+    if _mode is None:
+        return perform()
+
+    request = _encode(request)
+    key = _key(kind, request)
+    with _lock:
+        seq = _counts.get(key, 0)
+        _counts[key] = seq + 1
+
+    if replaying():
+        items = _recorded.get(key)
+        if not items:
+            raise CassetteMiss(f"Not in cassette: {key[:200]}")
+        item = items[min(seq, len(items) - 1)]
+        latency = float(os.environ.get("ONEPACE_REPLAY_LATENCY", "0") or 0)
+        if latency:
+            time.sleep(item["elapsed"] * latency)
+        if "error" in item:
+            error = item["error"]
+            names = [error["type"], *error.get("bases", [])]
+            raise _error_class(names, errors)(error["message"])
+        return _decode(item["response"])
+
+    item = {"kind": kind, "request": request, "seq": seq}
+    start = time.monotonic()
+    try:
+        result = perform()
+        item["response"] = _encode(result)
+        return result
+    except errors as e:
+        item["error"] = {
+            "type": type(e).__name__,
+            # Exception itself is too generic to hit the same handlers
+            "bases": [
+                cls.__name__
+                for cls in type(e).__mro__[1:]
+                if issubclass(cls, Exception) and cls is not Exception
+            ],
+            "message": str(e),
+        }
+        raise
+    finally:
+        item["elapsed"] = round(time.monotonic() - start, 6)
+        if "response" in item or "error" in item:
+            with _lock, open(_directory / EXCHANGES_NAME, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+
+def consume_flags(argv: list[str]) -> None:
+    """Strip --record/--replay from argv (in place) and apply them."""
+    record = os.environ.get("ONEPACE_RECORD") or None
+    replay = os.environ.get("ONEPACE_REPLAY") or None
+    remaining = [argv[0]] if argv else []
+    args = iter(argv[1:])
+    for arg in args:
+        if arg in ("--record", "--replay"):
+            value = next(args, None)
+            record, replay = (value, None) if arg == "--record" else (None, value)
+        elif arg.startswith(("--record=", "--replay=")):
+            flag, value = arg.split("=", 1)
+            record, replay = (value, None) if flag == "--record" else (None, value)
+        else:
+            remaining.append(arg)
+    argv[:] = remaining
+    if record or replay:
+        configure(record=record, replay=replay)
+    if record:
+        # What was run, so benchmarks/bench_pipeline.py can replay it
+        # argv[0] is "main.py", or "onepace.py run" when started through onepace.py
+        command = {
+            "script": Path(remaining[0]).name if remaining else None,
+            "args": remaining[1:],
+            "env": {
+                key: value
+                for key, value in os.environ.items()
+                if key.startswith("ONEPACE_") and key not in ("ONEPACE_RECORD", "ONEPACE_REPLAY")
+            },
+        }
+        (Path(record) / COMMAND_NAME).write_text(json.dumps(command, indent=2))
@@ -0,0 +1,160 @@
+"""Local catalog of One Pace sagas and arcs.
+
+Crawls the onepaceptbr home page and every saga page (concurrently), and
+stores sagas, arcs, Drive/nyaa URLs, ZIP passwords and folder names in a
+JSON file so browse.py can show its menus instantly, even offline:
+
+    {
+      "updated_at": 1700000000.0,
+      "sagas": [
+        {"name", "url", "hash", "password",
+         "arcs": [{"name", "nyaa_url", "gdrive_url", "folder"}]}
+      ]
+    }
+
+Refreshing revalidates pages through the HTTP cache and only re-parses saga
+pages whose content hash changed.
+
+Usage:
+    uv run catalog.py            # refresh and print a summary
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from http_cache import FetchError, default_cache_dir, fetch_text
+from onepace_site import (
+    SITE_BASE,
+    extract_password,
+    generate_folder_name,
+    parse_arcs,
+    parse_sagas,
+)
+
+CATALOG_PATH = default_cache_dir() / "catalog.json"
+
+
+def load_catalog(path: Path = CATALOG_PATH) -> dict | None:
+    """Return the stored catalog, or None if missing or unreadable."""
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def save_catalog(catalog: dict, path: Path = CATALOG_PATH) -> None:
+    """Write the catalog atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(catalog, ensure_ascii=False, indent=2))
+    os.replace(tmp, path)
+
+
+def _page_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def _build_saga(saga: dict, html: str, previous: dict | None) -> dict:
+    page_hash = _page_hash(html)
+    if previous and previous.get("hash") == page_hash:
+        return {**previous, "name": saga["name"], "url": saga["url"]}
+
+    arcs = [
+        {**arc, "folder": generate_folder_name(arc["name"])}
+        for arc in parse_arcs(html)
+    ]
+    return {
+        "name": saga["name"],
+        "url": saga["url"],
+        "hash": page_hash,
+        "password": extract_password(html),
+        "arcs": arcs,
+    }
+
+
+def crawl(
+    previous: dict | None = None,
+    ttl: float | None = None,
+    max_workers: int = 6,
+) -> dict:
+    """Fetch the home page and all saga pages and build a catalog.
+
+    Saga pages whose content did not change since `previous` keep their
+    previously parsed arcs. A saga page that cannot be fetched keeps its
+    previous entry, or is left out with a warning if it has none. Pass
+    ttl=0 to force revalidation of every page.
+
+    Raises:
+        FetchError: if the home page cannot be fetched
+    """
+    sagas = parse_sagas(fetch_text(SITE_BASE, ttl=ttl))
+    known = {s["url"]: s for s in (previous or {}).get("sagas", [])}
+
+    def build(saga: dict) -> dict | None:
+        try:
+            html = fetch_text(saga["url"], ttl=ttl)
+        except FetchError as e:
+            # Keep what we had for this saga rather than dropping it
+            if saga["url"] in known:
+                return known[saga["url"]]
+            print(f"⚠ Skipping saga {saga['name']}: {e}", file=sys.stderr)
+            return None
+        return _build_saga(saga, html, known.get(saga["url"]))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        built = [saga for saga in pool.map(build, sagas) if saga is not None]
+
+    return {"updated_at": time.time(), "sagas": built}
+
+
+def refresh(path: Path = CATALOG_PATH, ttl: float | None = None) -> dict:
+    """Crawl (reusing the stored catalog) and save the result."""
+    catalog = crawl(load_catalog(path), ttl=ttl)
+    save_catalog(catalog, path)
+    return catalog
+
+
+def refresh_in_background(path: Path = CATALOG_PATH) -> threading.Thread:
+    """Revalidate every page in a daemon thread; failures are ignored.
+
+    The refreshed catalog is picked up on the next launch.
+    """
+
+    def run() -> None:
+        try:
+            refresh(path, ttl=0)
+        except (FetchError, OSError):
+            pass
+
+    thread = threading.Thread(target=run, name="catalog-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_catalog(path: Path = CATALOG_PATH, force: bool = False) -> dict:
+    """Return the stored catalog, crawling synchronously if there is none.
+
+    Raises:
+        FetchError: if there is no catalog yet and the site is unreachable
+    """
+    catalog = None if force else load_catalog(path)
+    if catalog is None:
+        catalog = refresh(path, ttl=0 if force else None)
+    return catalog
+
+
+if __name__ == "__main__":
+    start = time.monotonic()
+    catalog = refresh(ttl=0)
+    arcs = sum(len(s["arcs"]) for s in catalog["sagas"])
+    print(
+        f"✓ {len(catalog['sagas'])} sagas, {arcs} arcs "
+        f"in {time.monotonic() - start:.1f}s → {CATALOG_PATH}"
+    )
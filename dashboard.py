@@ -0,0 +1,183 @@
+"""Live download dashboard for one arc.
+
+Shows per-episode progress, aggregate throughput and ETA for the arc's
+torrents in transmission-daemon. Each refresh is a single torrent-get with
+only the fields shown; when the arc's journal knows the torrent hashes the
+daemon is asked for just those, so it stays cheap next to hundreds of
+other torrents. The refresh interval doubles (up to --max-interval) while
+nothing changes and drops back as soon as something does.
+
+Usage:
+    uv run dashboard.py <folder_name> [--once] [--sequential]
+                        [--interval 1] [--max-interval 30]
+
+Exits when every torrent of the arc is complete (or on Ctrl+C).
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from arc_torrents import arc_torrents
+from episode_priority import episode_order, prioritize
+from transmission_rpc import TransmissionClient, TransmissionError
+
+FIELDS = [
+    "id",
+    "name",
+    "downloadDir",
+    "status",
+    "percentDone",
+    "rateDownload",
+    "rateUpload",
+    "eta",
+    "sizeWhenDone",
+    "leftUntilDone",
+    "errorString",
+]
+
+STATUS = {
+    0: "stopped",
+    1: "queued to check",
+    2: "checking",
+    3: "queued",
+    4: "downloading",
+    5: "queued to seed",
+    6: "seeding",
+}
+
+BAR_WIDTH = 20
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
+
+
+def format_eta(seconds: float) -> str:
+    if seconds < 0:
+        return "--"
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    return f"{minutes}m{secs:02d}s"
+
+
+def fetch_arc_torrents(client: TransmissionClient, folder: Path) -> list[dict]:
+    """One torrent-get for the arc's torrents, with only the fields shown."""
+    return arc_torrents(client, folder, FIELDS)
+
+
+def render(torrents: list[dict]) -> str:
+    """Render the dashboard as text, episodes in order."""
+    lines = []
+    for t in episode_order(torrents):
+        filled = int(t["percentDone"] * BAR_WIDTH)
+        bar = "#" * filled + "-" * (BAR_WIDTH - filled)
+        state = t["errorString"] or STATUS.get(t["status"], "?")
+        rate = f"{format_size(t['rateDownload'])}/s" if t["rateDownload"] else ""
+        eta = format_eta(t["eta"]) if t["percentDone"] < 1 else "done"
+        lines.append(
+            f"{t['name'][:44]:<44} [{bar}] {t['percentDone']:6.1%} "
+            f"{rate:>10} {eta:>7}  {state}"
+        )
+
+    total = sum(t["sizeWhenDone"] for t in torrents)
+    left = sum(t["leftUntilDone"] for t in torrents)
+    down = sum(t["rateDownload"] for t in torrents)
+    up = sum(t["rateUpload"] for t in torrents)
+    done = sum(1 for t in torrents if t["percentDone"] >= 1)
+    progress = (total - left) / total if total else 0
+    eta = format_eta(left / down) if down else "--"
+    lines.append("=" * 70)
+    lines.append(
+        f"{done}/{len(torrents)} complete  {progress:.1%} of {format_size(total)}  "
+        f"↓ {format_size(down)}/s  ↑ {format_size(up)}/s  ETA {eta}"
+    )
+    return "\n".join(lines)
+
+
+def _signature(torrents: list[dict]) -> tuple:
+    return tuple(
+        (t["id"], t["status"], round(t["percentDone"], 3), t["errorString"])
+        for t in torrents
+    )
+
+
+def watch(
+    folder: Path,
+    interval: float = 1,
+    max_interval: float = 30,
+    once: bool = False,
+    client: TransmissionClient | None = None,
+    sequential: bool | None = None,
+) -> None:
+    """Redraw the dashboard until every torrent is complete.
+
+    Whenever an episode finishes, the next one is given priority (see
+    episode_priority.py).
+    """
+    client = client or TransmissionClient.from_env()
+    clear = "\033[H\033[J" if sys.stdout.isatty() else ""
+    delay = interval
+    previous = None
+    upcoming = None
+    with client:
+        while True:
+            torrents = fetch_arc_torrents(client, folder)
+            if not torrents:
+                print(f"ℹ No torrents for {folder} in transmission")
+                return
+
+            pending = [t for t in episode_order(torrents) if t["percentDone"] < 1]
+            if not once and pending and pending[0]["id"] != upcoming:
+                upcoming = pending[0]["id"]
+                prioritize(client, [t["id"] for t in torrents], sequential)
+
+            signature = _signature(torrents)
+            # Back off while nothing moves, snap back on any change
+            delay = interval if signature != previous else min(delay * 2, max_interval)
+            previous = signature
+
+            print(clear + f"📡 {folder}  (refresh {delay:g}s)\n" + render(torrents), flush=True)
+            if once or all(t["percentDone"] >= 1 for t in torrents):
+                return
+            time.sleep(delay)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("folder", type=Path)
+    parser.add_argument("--once", action="store_true", help="print once and exit")
+    parser.add_argument("--interval", type=float, default=1)
+    parser.add_argument("--max-interval", type=float, default=30)
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        default=None,
+        help="download the next episode in piece order (watch while downloading)",
+    )
+    args = parser.parse_args()
+
+    try:
+        watch(
+            args.folder,
+            args.interval,
+            args.max_interval,
+            args.once,
+            sequential=args.sequential,
+        )
+    except TransmissionError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,12 @@
 
 Usage:
     uv run --with gdown download_subtitles.py <google_drive_url> <arc_name_or_folder>
+        [--force | --refresh]
+
+Re-runs check the files recorded in subtitles/.manifest.json locally and only
+fetch missing or changed ones. Once every file has been fetched the folder
+is not listed again; --refresh lists it anyway to find new releases, and
+--force downloads everything again.
 
 Examples:
     # Auto-detect arc number from name
@@ -21,17 +27,94 @@ Examples:
 
 """
 
+import hashlib
+import os
 import re
 import subprocess
 import sys
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
 from pathlib import Path
 
-try:
-    import requests
-except ImportError:
-    requests = None
-
+import cassette
+import rate_limit
+import telemetry
+from drive_folder import (
+    DRIVE_BASE,
+    LISTING_TTL,
+    confirm_download,
+    crawl,
+    download_url,
+    folder_id,
+    is_quota_page,
+)
+from http_cache import FetchError
+from rate_limit import RetryableError
+from scheduler import stage_slot
+from subtitle_manifest import (
+    entry_path,
+    load_manifest,
+    make_entry,
+    mark_extracted,
+    parse_http_date,
+    save_manifest,
+    verify_entry,
+    verify_folder,
+)
+from zip_extract import extract_archives
+
+
+def _requests():
+    """Import requests on first use (it is slow to import); None if missing."""
+    try:
+        import requests
+    except ImportError:
+        return None
+    return requests
+
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Parallel Drive downloads; kept low to stay under Drive's throttling
+DEFAULT_CONCURRENCY = 4
+
+# Drive files worth fetching: subtitles, and ZIPs of subtitles (extracted later)
+DRIVE_SUFFIXES = (".ass", ".zip")
+
+
+def _get(session, url: str):
+    """One streaming GET, raising RetryableError when Drive is throttling."""
+    requests = _requests()
+    try:
+        response = session.get(url, stream=True, timeout=30)
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+        raise RetryableError(str(e)) from e
+    if response.status_code == 429 or response.status_code >= 500:
+        response.close()
+        raise RetryableError(
+            f"HTTP {response.status_code}", response.headers.get("Retry-After")
+        )
+    response.raise_for_status()
+    if "text/html" in response.headers.get("Content-Type", "") and is_quota_page(
+        response.text
+    ):
+        response.close()
+        raise RetryableError("Drive download quota exceeded")
+    return response
+
+
+def _newer_on_drive(listed: float | None, recorded: float | None) -> bool:
+    """True if the listing dates a file after its recorded modification.
+
+    Drive's folder view only shows the day, so both are compared as dates.
+    """
+    if listed is None or recorded is None:
+        return False
+    return date.fromtimestamp(listed) > date.fromtimestamp(recorded)
 
 
 def convert_gdrive_url(url: str) -> str:
@@ -54,9 +137,18 @@ def convert_gdrive_url(url: str) -> str:
 class SubtitleDownloader:
     """Download One Pace subtitles from Google Drive."""
 
-    def __init__(self, gdrive_url: str, arc_folder: str) -> None:
+    def __init__(
+        self,
+        gdrive_url: str,
+        arc_folder: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        scheduler=None,
+    ) -> None:
         self.gdrive_url = gdrive_url
         self.arc_folder = arc_folder
+        self.concurrency = max(1, concurrency)
+        # Optional PipelineScheduler limiting Drive downloads in batch mode
+        self.scheduler = scheduler
         self.zip_password = None
 
     def set_password(self, password: str) -> None:
@@ -75,91 +167,218 @@ class SubtitleDownloader:
         subtitles_folder.mkdir(exist_ok=True, parents=True)
         return subtitles_folder
 
-    def _extract_file_ids_from_folder(self, folder_url: str):
-        """Extract file IDs from Google Drive folder page using regex."""
-        if not requests:
-            return None
+    def _list_folder(self, folder_url: str, refresh: bool = False):
+        """Yield (file_id, filename, modified) for the subtitles and ZIPs under a Drive folder.
+
+        Subfolders are walked concurrently (see drive_folder.py) and files
+        are yielded while the crawl goes on. Everything lands flat in
+        subtitles/, so a name seen twice keeps its first file. With
+        `refresh` cached listings are revalidated.
+        """
+        print("📂 Listing files from Google Drive folder...")
+        names = set()
+        ttl = 0 if refresh else LISTING_TTL
+        for entry in crawl(folder_id(folder_url), max_workers=self.concurrency, ttl=ttl):
+            if not entry["name"].lower().endswith(DRIVE_SUFFIXES):
+                continue
+            if entry["name"] in names:
+                print(f"   ⚠ Skipping {entry['path']} (same name as another file)")
+                continue
+            names.add(entry["name"])
+            yield entry["id"], entry["name"], entry["modified"]
+
+    def _new_session(self):
+        """Create a keep-alive session whose pool fits every worker."""
+        requests = _requests()
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.concurrency
+        )
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = USER_AGENT
+        return session
+
+    def _open_download(self, session, file_id: str):
+        """Open a streaming response with the file's bytes, or None.
+
+        Requests go through the Drive rate limit; 429/5xx answers and quota
+        pages are retried with backoff (see rate_limit.py), and the
+        large-file confirm page is followed to the file. None means Drive
+        answered with some other HTML page.
+        """
+        url = download_url(file_id)
+        # The file itself, or once more past the confirm page
+        for _ in range(2):
+            response = rate_limit.run(url, partial(_get, session, url))
+            if "text/html" not in response.headers.get("Content-Type", ""):
+                return response
+            url = confirm_download(response.text, url)
+            response.close()
+            if url is None:
+                return None
+        return None
+
+    def _fetch_file(self, session, file_id: str, output_file: Path) -> dict:
+        """Download one Drive file and return its manifest entry.
+
+        When a cassette is active the whole download (file contents and
+        Drive's modification time) is recorded or replayed as one exchange.
+        """
+        if not cassette.enabled():
+            return self._download_file(session, file_id, output_file)
+
+        def perform() -> dict:
+            entry = self._download_file(session, file_id, output_file)
+            return {"body": output_file.read_bytes(), "modified": entry["modified"]}
+
+        reply = cassette.exchange("drive", {"id": file_id}, perform, errors=(Exception,))
+        if cassette.replaying():
+            tmp_file = output_file.with_name(output_file.name + ".part")
+            tmp_file.write_bytes(reply["body"])
+            os.replace(tmp_file, output_file)
+        return make_entry(output_file, file_id, reply["modified"])
+
+    def _download_file(self, session, file_id: str, output_file: Path) -> dict:
+        """Stream one Drive file to a temp path and atomically rename it.
+
+        Returns its manifest entry (see subtitle_manifest.py). Falls back to
+        gdown when Drive answers with an HTML page that is neither the
+        large-file confirm page nor a quota page.
+        """
+        tmp_file = output_file.with_name(output_file.name + ".part")
+
+        response = self._open_download(session, file_id) if session is not None else None
+        if response is not None:
+            with response:
+                digest = hashlib.sha256()
+                with open(tmp_file, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                        digest.update(chunk)
+            os.replace(tmp_file, output_file)
+            return make_entry(
+                output_file,
+                file_id,
+                parse_http_date(response.headers.get("Last-Modified")),
+                digest.hexdigest(),
+            )
 
-        try:
-            print("📂 Listing files from Google Drive folder...")
-
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            }
-
-            response = requests.get(folder_url, headers=headers, timeout=10)
-            response.raise_for_status()
-
-            # Extract file IDs and names using regex patterns from Google Drive's page
-            files = []
-
-            # Pattern: "id":"FILE_ID","name":"filename.ass"
-            for match in re.finditer(
-                r'"id":"([a-zA-Z0-9_-]{28,})","[^"]*"name":"([^"]+\.ass)"',
-                response.text,
-            ):
-                file_id = match.group(1)
-                filename = match.group(2)
-                files.append((file_id, filename))
-
-            # Remove duplicates while preserving order
-            seen = set()
-            unique_files = []
-            for f_id, f_name in files:
-                if f_id not in seen:
-                    seen.add(f_id)
-                    unique_files.append((f_id, f_name))
-
-            if unique_files:
-                print(f"✓ Found {len(unique_files)} file(s) in folder")
-                return unique_files
-
-            return None
-        except Exception as e:
-            print(f"⚠ Could not extract file IDs: {e}")
-            return None
-
-    def _download_files_individually(self, subtitles_folder, files):
-        """Download files individually by file ID."""
+        telemetry.add("subprocesses")
+        result = subprocess.run(
+            ["gdown", f"{DRIVE_BASE}/uc?id={file_id}", "-O", str(tmp_file), "-q"],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0 or not tmp_file.exists():
+            tmp_file.unlink(missing_ok=True)
+            raise RuntimeError(result.stderr.strip() or "gdown failed")
+        os.replace(tmp_file, output_file)
+        return make_entry(output_file, file_id)
+
+    def _download_files_individually(self, subtitles_folder, files, manifest):
+        """Download files by file ID with a bounded pool sharing one session.
+
+        `files` may be a generator (e.g. a folder crawl still in progress);
+        each file is queued as soon as it is yielded. Files whose manifest
+        entry has the same Drive ID, is not older than the listing's date and
+        still verifies locally are skipped; fetched files are recorded in the
+        manifest.
+
+        Returns (files present afterwards, files listed).
+        """
         success_count = 0
+        verified = 0
         failed = []
+        entries = manifest["files"]
+        pending = []
+
+        session = None
+        total_bytes = 0
+        done = 0
+        lock = threading.Lock()
+        start = time.monotonic()
+        parent_span = telemetry.current()
+
+        def worker(file_id: str, filename: str, listed: float | None) -> None:
+            nonlocal success_count, total_bytes, done
+            try:
+                with telemetry.attach(parent_span):
+                    entry = self._fetch_file(session, file_id, subtitles_folder / filename)
+                if entry["modified"] is None or _newer_on_drive(listed, entry["modified"]):
+                    # Keep the listing's date so the next run does not fetch it again
+                    entry["modified"] = listed
+                size, error = entry["size"], None
+            except Exception as e:
+                (subtitles_folder / (filename + ".part")).unlink(missing_ok=True)
+                size, error = 0, e
+
+            with lock:
+                done += 1
+                prefix = f"[{done:2d}]"
+                if error is None:
+                    entries[filename] = entry
+                    success_count += 1
+                    total_bytes += size
+                    print(f"{prefix} ✓ {filename} ({size / 1024:.1f}KB)")
+                else:
+                    failed.append(filename)
+                    print(f"{prefix} ✗ {filename}: {error}")
 
-        print(f"\n📥 Downloading {len(files)} file(s)...\n")
-
-        for i, (file_id, filename) in enumerate(files, 1):
-            output_file = subtitles_folder / filename
-
-            # Skip if exists
-            if output_file.exists():
-                print(f"{i:2d}. ✓ {filename} (already exists)")
-                success_count += 1
-                continue
-
-            print(f"{i:2d}. Downloading {filename}...", end=" ", flush=True)
-
-            url = f"https://drive.google.com/uc?id={file_id}"
-            result = subprocess.run(
-                ["gdown", url, "-O", str(output_file), "-q"],
-                capture_output=True,
-                text=True,
-            )
-
-            if result.returncode == 0 and output_file.exists():
-                size_mb = output_file.stat().st_size / 1024 / 1024
-                print(f"✓ ({size_mb:.1f}MB)")
-                success_count += 1
-            else:
-                print(f"✗")
-                failed.append(filename)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for file_id, filename, listed in files:
+                    entry = entries.get(filename)
+                    if (
+                        entry
+                        and entry.get("id") == file_id
+                        and not _newer_on_drive(listed, entry.get("modified"))
+                        and (
+                            entry.get("extracted")
+                            or verify_entry(entry_path(subtitles_folder, filename, entry), entry)
+                        )
+                    ):
+                        with lock:
+                            success_count += 1
+                        verified += 1
+                        continue
+
+                    if not pending:
+                        print(f"\n📥 Downloading ({self.concurrency} at a time)...\n")
+                        session = self._new_session() if _requests() else None
+                    pending.append(filename)
+                    pool.submit(worker, file_id, filename, listed)
+        finally:
+            if session is not None:
+                session.close()
+
+        if verified:
+            print(f"   ✓ {verified} file(s) verified locally")
+        if not pending:
+            return success_count, verified
+
+        elapsed = time.monotonic() - start
+        telemetry.add("bytes", total_bytes)
+        telemetry.add("files", len(pending) - len(failed))
+        print(
+            f"\n✓ Fetched {len(pending) - len(failed)} file(s), "
+            f"{total_bytes / 1024:.1f}KB in {elapsed:.1f}s"
+        )
 
         if failed:
             print(f"\n⚠ Failed to download: {len(failed)} file(s)")
             for name in failed:
                 print(f"   - {name}")
 
-        return success_count
+        return success_count, verified + len(pending)
 
-    def _download_from_gdrive(self, subtitles_folder, force: bool = True):
+    def _download_from_gdrive(self, subtitles_folder, force: bool = False, refresh: bool = False):
+        """Fetch missing or changed subtitles, verifying the rest locally.
+
+        With force=True every file is downloaded again regardless of the
+        folder's manifest. With refresh=True a complete folder is listed
+        again anyway, so files added or replaced on Drive are fetched;
+        the others are still only verified locally.
+        """
         # Convert URL to gdown-compatible format
         gdrive_url = convert_gdrive_url(self.gdrive_url)
 
@@ -169,11 +388,17 @@ class SubtitleDownloader:
         # Count existing files before download
         existing_files = set(f.name for f in subtitles_folder.glob("*.ass"))
 
-        if existing_files and is_folder and not force:
-            # Folder already has files - assume download complete, skip download
-            print(f"ℹ Found {len(existing_files)} existing subtitle(s)")
-            for name in sorted(existing_files):
-                print(f"   ✓ {name}")
+        manifest = load_manifest(subtitles_folder)
+        if force or manifest["source"] != gdrive_url:
+            manifest = {"source": gdrive_url, "complete": False, "files": {}}
+
+        if (
+            not refresh
+            and manifest.get("complete")
+            and not verify_folder(subtitles_folder, manifest)
+        ):
+            # Everything recorded last time is still intact: no network needed
+            print(f"ℹ Verified {len(manifest['files'])} subtitle(s) against the manifest")
             print("✓ Skipping download (already present)")
             return
 
@@ -182,15 +407,25 @@ class SubtitleDownloader:
             if force and existing_files:
                 print(f"🔄 Force re-downloading (will replace existing {len(existing_files)} file(s))...")
 
-            # Try to extract file IDs and download individually
-            files = self._extract_file_ids_from_folder(gdrive_url)
-
-            if files:
-                # Successfully extracted file IDs - download individually
-                self._download_files_individually(subtitles_folder, files)
-            else:
+            # Crawl the folder and download each file as soon as it is listed
+            manifest["complete"] = False
+            ok_count = listed = 0
+            try:
+                ok_count, listed = self._download_files_individually(
+                    subtitles_folder, self._list_folder(gdrive_url, refresh), manifest
+                )
+                manifest["complete"] = listed > 0 and ok_count == listed
+            except FetchError as e:
+                print(f"⚠ Could not list the whole folder: {e}")
+            finally:
+                save_manifest(subtitles_folder, manifest)
+
+            if not listed and not manifest["files"] and cassette.replaying():
+                print("⚠ Skipping the gdown fallback (not recorded in cassettes)")
+            elif not listed and not manifest["files"]:
                 # Fallback to gdown --folder if extraction fails
                 print("📥 Downloading subtitles (fallback method)...")
+                telemetry.add("subprocesses")
                 result = subprocess.run(
                     [
                         "gdown",
@@ -204,8 +439,13 @@ class SubtitleDownloader:
                 )
                 if result.returncode != 0:
                     print("⚠ Warning: Some files could not be downloaded (may be inaccessible)")
+                manifest["complete"] = result.returncode == 0
+                self._record_untracked(subtitles_folder, manifest)
+        elif cassette.replaying():
+            print("⚠ Skipping the gdown download (not recorded in cassettes)")
         else:
             # Download individual file - fail if unavailable
+            telemetry.add("subprocesses")
             subprocess.run(
                 [
                     "gdown",
@@ -215,6 +455,8 @@ class SubtitleDownloader:
                 ],
                 check=True,
             )
+            manifest["complete"] = True
+            self._record_untracked(subtitles_folder, manifest)
 
         # Count files after download
         all_files = set(f.name for f in subtitles_folder.glob("*.ass"))
@@ -230,44 +472,48 @@ class SubtitleDownloader:
         print("✓ Download complete!")
         print(f"✓ Total subtitles: {len(all_files)} in {subtitles_folder}")
 
+    def _record_untracked(self, subtitles_folder: Path, manifest: dict) -> None:
+        """Add subtitles fetched by gdown (no Drive ID known) to the manifest."""
+        for path in subtitles_folder.glob("*.ass"):
+            entry = manifest["files"].get(path.name)
+            if entry is None or not verify_entry(path, entry):
+                manifest["files"][path.name] = make_entry(path, None)
+        save_manifest(subtitles_folder, manifest)
+
     def _extract_zips(self, folder: Path) -> int:
-        """Extract any ZIP files found in folder and return count of extracted files."""
-        zip_files = list(folder.glob("*.zip"))
+        """Extract subtitles from any ZIP files in folder; return count extracted."""
+        zip_files = sorted(folder.glob("*.zip"))
         if not zip_files:
             return 0
 
         print(f"\n📦 Found {len(zip_files)} ZIP file(s), extracting...")
+        pwd = self.zip_password.encode("utf-8") if self.zip_password else None
         extracted_count = 0
-
-        for zip_file in zip_files:
-            try:
-                # Convert password to bytes if provided
-                pwd = None
-                if self.zip_password:
-                    pwd = self.zip_password.encode("utf-8")
-
-                with zipfile.ZipFile(zip_file, "r") as z:
-                    z.extractall(folder, pwd=pwd)
-                    print(f"   ✓ Extracted: {zip_file.name}")
-                    # Count extracted files
-                    extracted_count += len(z.namelist())
-
+        removed = []
+
+        for result in extract_archives(zip_files, folder, pwd=pwd):
+            zip_file = result["archive"]
+            error = result["error"]
+            if result["ok"]:
+                extracted_count += len(result["files"])
+                telemetry.add("bytes", result["bytes"])
+                print(f"   ✓ Extracted: {zip_file.name} ({len(result['files'])} subtitle(s))")
                 # Remove the zip after extraction
                 zip_file.unlink()
+                removed.append(zip_file.name)
                 print(f"   ✓ Removed: {zip_file.name}")
-            except zipfile.BadZipFile:
-                print(f"   ✗ Bad ZIP file: {zip_file.name}")
-            except RuntimeError as e:
-                if "Bad password" in str(e):
-                    print(f"   ✗ Wrong password for {zip_file.name}")
-                else:
-                    print(f"   ✗ Error extracting {zip_file.name}: {e}")
-            except Exception as e:
-                print(f"   ✗ Error extracting {zip_file.name}: {e}")
+            elif isinstance(error, RuntimeError) and "password" in str(error):
+                print(f"   ✗ Wrong password for {zip_file.name}")
+            elif isinstance(error, zipfile.BadZipFile):
+                print(f"   ✗ Bad ZIP file: {zip_file.name} ({error})")
+            else:
+                print(f"   ✗ Error extracting {zip_file.name}: {error}")
 
+        # ZIPs fetched from Drive stay in the manifest so re-runs skip them
+        mark_extracted(folder, removed)
         return extracted_count
 
-    def download(self, force: bool = True) -> int:
+    def download(self, force: bool = False, refresh: bool = False) -> int:
         arc_path = self._setup_path()
 
         subtitles_folder = self._setup_subtitle_folder(arc_path)
@@ -275,17 +521,31 @@ class SubtitleDownloader:
         print(f"Downloading subtitles to: {subtitles_folder}")
         print(f"From: {self.gdrive_url}")
 
-        self._download_from_gdrive(subtitles_folder, force=force)
+        with stage_slot(self.scheduler, "drive"), telemetry.span("drive_download"):
+            self._download_from_gdrive(subtitles_folder, force=force, refresh=refresh)
 
         # Extract any ZIP files
-        self._extract_zips(subtitles_folder)
+        with telemetry.span("zip_extract"):
+            extracted = self._extract_zips(subtitles_folder)
+            telemetry.add("files", extracted)
+        if extracted:
+            # Extracted subtitles have no Drive ID; record them so re-runs verify them
+            self._record_untracked(subtitles_folder, load_manifest(subtitles_folder))
 
         return len(list(subtitles_folder.glob("*.ass")))
 
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
+def main():
+    cassette.consume_flags(sys.argv)
+    force = "--force" in sys.argv[1:]
+    refresh = "--refresh" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg not in ("--force", "--refresh")]
+    if len(args) != 2:
         print(__doc__)
         sys.exit(1)
 
-    SubtitleDownloader(sys.argv[1], sys.argv[2]).download()
+    SubtitleDownloader(args[0], args[1]).download(force=force, refresh=refresh)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""List Google Drive folders recursively, without an API key.
+
+Each folder is read from Drive's static `embeddedfolderview` page, which
+lists every entry of the folder (files and subfolders) in plain HTML.
+Subfolders are fetched concurrently and files are yielded as soon as their
+folder has been parsed, so downloads can start before the crawl finishes.
+
+    crawl("1XYZ...")
+    -> {"id", "name", "size", "mime", "modified", "path"} for every file
+
+`path` is relative to the crawled folder ("Extras/Jaya 01.ass"), `mime`
+comes from the entry's type icon, `modified` is a timestamp (None when the
+page only shows a time of day) and `size` is None (the page does not show
+it). confirm_download and is_quota_page read the HTML pages Drive may
+answer a file download with. ONEPACE_DRIVE_BASE points every Drive URL at
+another host, e.g. a local server replaying recorded pages.
+
+Usage:
+    for entry in crawl(folder_id(url), max_workers=4):
+        print(entry["path"])
+"""
+
+import os
+import re
+import sys
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from html import unescape
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urlencode, urljoin, urlsplit
+
+import telemetry
+from http_cache import FetchError, fetch_text
+
+DRIVE_BASE = os.environ.get("ONEPACE_DRIVE_BASE", "https://drive.google.com").rstrip("/")
+FOLDER_MIME = "application/vnd.google-apps.folder"
+
+# Listings change when files are added; don't reuse them for long
+LISTING_TTL = 10 * 60
+
+QUOTA_MARKERS = (
+    "Too many users have viewed or downloaded this file recently",
+    "Download quota exceeded",
+)
+
+
+def folder_id(url: str) -> str | None:
+    """Folder ID from a /drive/folders/ID or ?id=ID URL (None if neither)."""
+    match = re.search(r"/folders/([a-zA-Z0-9_-]+)", url)
+    if match:
+        return match.group(1)
+    ids = parse_qs(urlsplit(url).query).get("id")
+    return ids[0] if ids else None
+
+
+def listing_url(folder: str) -> str:
+    return f"{DRIVE_BASE}/embeddedfolderview?id={folder}"
+
+
+def download_url(file_id: str) -> str:
+    return f"{DRIVE_BASE}/uc?id={file_id}&export=download"
+
+
+def confirm_download(html: str, page_url: str) -> str | None:
+    """URL past Drive's "can't scan this file for viruses" page, or None.
+
+    Large files answer the download URL with that page; its download form
+    (or, on older pages, a confirm link) leads to the actual file.
+    """
+    form = re.search(r'<form\b[^>]*\bid="download-form"[^>]*>(.*?)</form>', html, re.S)
+    if form:
+        action = re.search(r'\baction="([^"]+)"', form.group(0))
+        params = {}
+        for tag in re.findall(r"<input\b[^>]*>", form.group(1)):
+            name = re.search(r'\bname="([^"]*)"', tag)
+            value = re.search(r'\bvalue="([^"]*)"', tag)
+            if 'type="hidden"' in tag and name:
+                params[name.group(1)] = unescape(value.group(1)) if value else ""
+        if action:
+            return f"{urljoin(page_url, unescape(action.group(1)))}?{urlencode(params)}"
+    link = re.search(r'href="([^"]*export=download[^"]*confirm=[^"]*)"', html)
+    if link:
+        return urljoin(page_url, unescape(link.group(1)))
+    return None
+
+
+def is_quota_page(html: str) -> bool:
+    """True for Drive's "download quota exceeded" page (retry later)."""
+    return any(marker in html for marker in QUOTA_MARKERS)
+
+
+def _parse_modified(text: str) -> float | None:
+    try:
+        return datetime.strptime(text.strip(), "%b %d, %Y").timestamp()
+    except ValueError:
+        return None
+
+
+class FolderPageParser(HTMLParser):
+    """Collect the entries of one embeddedfolderview page into `entries`."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.entries: list[dict] = []
+        self._entry: dict | None = None
+        self._field: str | None = None
+        self._text: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "div" and "flip-entry" in classes:
+            entry_id = (attrs.get("id") or "").removeprefix("entry-")
+            self._entry = {
+                "id": entry_id,
+                "name": None,
+                "size": None,
+                "mime": None,
+                "modified": None,
+            }
+            self.entries.append(self._entry)
+        elif self._entry is None:
+            return
+        elif tag == "a" and "/folders/" in (attrs.get("href") or ""):
+            self._entry["mime"] = FOLDER_MIME
+        elif tag == "img" and "/type/" in (attrs.get("src") or ""):
+            if self._entry["mime"] is None:
+                self._entry["mime"] = attrs["src"].split("/type/", 1)[1]
+        elif tag == "div" and "flip-entry-title" in classes:
+            self._field, self._text = "name", []
+        elif tag == "div" and "flip-entry-last-modified" in classes:
+            self._field, self._text = "modified", []
+
+    def handle_data(self, data: str) -> None:
+        if self._field:
+            self._text.append(data)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag != "div" or not self._field or not "".join(self._text).strip():
+            return
+        text = "".join(self._text).strip()
+        if self._field == "name":
+            self._entry["name"] = text
+        else:
+            self._entry["modified"] = _parse_modified(text)
+        self._field = None
+
+
+def parse_folder(html: str) -> list[dict]:
+    """Entries of one folder page, subfolders included (mime FOLDER_MIME)."""
+    parser = FolderPageParser()
+    parser.feed(html)
+    parser.close()
+    return [e for e in parser.entries if e["id"] and e["name"]]
+
+
+def _list(folder: str, path: str, ttl: float) -> list[dict]:
+    entries = parse_folder(fetch_text(listing_url(folder), ttl=ttl))
+    for entry in entries:
+        entry["path"] = f"{path}/{entry['name']}" if path else entry["name"]
+    return entries
+
+
+def crawl(root: str, max_workers: int = 4, ttl: float = LISTING_TTL) -> Iterator[dict]:
+    """Yield every file under the root folder, walking subfolders concurrently.
+
+    Listings younger than `ttl` seconds come from the HTTP cache; pass
+    ttl=0 to revalidate every folder.
+
+    Raises:
+        FetchError: when the root folder cannot be listed, or (after the
+            rest has been yielded) when some subfolders could not be.
+    """
+    parent_span = telemetry.current()
+
+    def list_folder(folder: str, path: str) -> list[dict]:
+        with telemetry.attach(parent_span):
+            return _list(folder, path, ttl)
+
+    seen = {root}
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        pending = {pool.submit(list_folder, root, ""): ""}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    entries = future.result()
+                except FetchError as e:
+                    if not path:
+                        raise
+                    print(f"⚠ Could not list Drive folder {path}: {e}", file=sys.stderr)
+                    failed.append(path)
+                    continue
+                for entry in entries:
+                    if entry["mime"] != FOLDER_MIME:
+                        yield entry
+                    elif entry["id"] not in seen:
+                        # Shortcuts can make folders appear twice (or loop)
+                        seen.add(entry["id"])
+                        pending[pool.submit(list_folder, entry["id"], entry["path"])] = (
+                            entry["path"]
+                        )
+    telemetry.add("folders", len(seen))
+    if failed:
+        raise FetchError(f"Could not list {len(failed)} Drive folder(s): {', '.join(failed)}")
@@ -0,0 +1,189 @@
+"""Shared engine for pairing subtitles with videos by episode number.
+
+Usage:
+    matcher = EpisodeMatcher(arc_name)
+    plan = matcher.plan(videos, subtitles)
+    apply_plan(plan)                  # or apply_plan(plan, dry_run=True)
+
+Patterns are compiled once per arc and both sides are indexed in a single
+pass, so folders with thousands of files match in milliseconds. Unlike a
+plain dict, the index keeps every file per episode so duplicate keys are
+reported instead of silently overwritten.
+"""
+
+import os
+import re
+from pathlib import Path
+
+VIDEO_SUFFIX = ".mkv"
+SUBTITLE_SUFFIX = ".ass"
+
+_FALLBACK_PATTERN = re.compile(r"(\d{2})")
+_ARC_NAME_PATTERN = re.compile(r"\[One Pace\]\[\d+-\d+\]\s+(.+?)\s+\d+\s+\[")
+
+
+class EpisodeMatcher:
+    """Extracts episode numbers for one arc using precompiled patterns."""
+
+    def __init__(self, arc_name: str | None = None) -> None:
+        self.arc_name = arc_name or ""
+        self._arc_pattern = re.compile(
+            rf"{re.escape(self.arc_name)}\s+(\d+)", re.IGNORECASE
+        )
+
+    def episode(self, filename: str) -> str | None:
+        """Extract episode number from filename.
+
+        Handles various patterns:
+        - "Arc Name 01.ass" -> "01"
+        - "46 - Arc Name 04.ass" -> "04"
+        - "[One Pace][123-126] Arc Name 04 [480p][HASH].mkv" -> "04"
+        """
+        match = self._arc_pattern.search(filename) or _FALLBACK_PATTERN.search(
+            filename
+        )
+        return match.group(1) if match else None
+
+    def index(self, files: list[Path]) -> tuple[dict[str, list[Path]], list[Path]]:
+        """Group files by episode number in one pass.
+
+        Returns:
+            (index, unparsed) where index maps episode -> files in input order
+            and unparsed lists files without a recognisable episode number.
+        """
+        index: dict[str, list[Path]] = {}
+        unparsed = []
+        for path in files:
+            ep_num = self.episode(path.name)
+            if ep_num:
+                index.setdefault(ep_num, []).append(path)
+            else:
+                unparsed.append(path)
+        return index, unparsed
+
+    def plan(self, videos: list[Path], subtitles: list[Path]) -> dict:
+        """Build a match plan renaming each subtitle next to its video.
+
+        Returns a dict with:
+            matches:             [{"episode", "video", "subtitle", "target"}]
+            unmatched_videos:    videos with no subtitle for their episode
+            unmatched_subtitles: subtitles with no video for their episode
+            unparsed:            files without an episode number
+            duplicates:          {"videos": {ep: [...]}, "subtitles": {ep: [...]}}
+
+        When an episode has several subtitles the last one (in input order)
+        is used; when it has several videos the first one gets the subtitle.
+        Both cases are listed under duplicates.
+        """
+        video_index, unparsed_videos = self.index(videos)
+        subtitle_index, unparsed_subtitles = self.index(subtitles)
+
+        plan = {
+            "arc_name": self.arc_name,
+            "matches": [],
+            "unmatched_videos": list(unparsed_videos),
+            "unmatched_subtitles": [],
+            "unparsed": unparsed_videos + unparsed_subtitles,
+            "duplicates": {
+                "videos": {ep: v for ep, v in video_index.items() if len(v) > 1},
+                "subtitles": {ep: s for ep, s in subtitle_index.items() if len(s) > 1},
+            },
+        }
+
+        for ep_num, ep_videos in video_index.items():
+            ep_subtitles = subtitle_index.get(ep_num)
+            if not ep_subtitles:
+                plan["unmatched_videos"].extend(ep_videos)
+                continue
+            video = ep_videos[0]
+            plan["matches"].append(
+                {
+                    "episode": ep_num,
+                    "video": video,
+                    "subtitle": ep_subtitles[-1],
+                    "target": video.with_suffix(SUBTITLE_SUFFIX),
+                }
+            )
+
+        plan["unmatched_subtitles"] = [
+            sub
+            for ep_num, subs in subtitle_index.items()
+            if ep_num not in video_index
+            for sub in subs
+        ]
+        plan["matches"].sort(key=lambda m: m["video"].name)
+        return plan
+
+
+def guess_arc_name(video_files: list[Path]) -> str | None:
+    """Guess the arc name from video filenames.
+
+    Expects pattern like: [One Pace][XXX-XXX] Arc Name XX [480p][HASH].mkv
+    """
+    if not video_files:
+        return None
+
+    match = _ARC_NAME_PATTERN.search(video_files[0].name)
+    if match:
+        return match.group(1).strip()
+
+    return None
+
+
+def scan(directory: Path, suffix: str, recursive: bool = False) -> list[Path]:
+    """List files with `suffix` using os.scandir (sorted, optionally recursive)."""
+    found: list[Path] = []
+    stack = [str(directory)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.endswith(suffix) and entry.is_file():
+                    found.append(Path(entry.path))
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return sorted(found)
+
+
+def build_plan(
+    video_dir: Path,
+    subtitle_dir: Path,
+    recursive: bool = False,
+    expected: list[Path] | None = None,
+) -> dict:
+    """Scan both folders and build a match plan for them.
+
+    `expected` lists videos that are not on disk yet (e.g. from torrent
+    metadata); they take precedence over scanned files of the same name.
+    """
+    videos = scan(video_dir, VIDEO_SUFFIX, recursive=recursive)
+    if expected:
+        names = {path.name for path in expected}
+        videos = list(expected) + [v for v in videos if v.name not in names]
+    subtitles = scan(subtitle_dir, SUBTITLE_SUFFIX)
+    matcher = EpisodeMatcher(guess_arc_name(videos))
+    plan = matcher.plan(videos, subtitles)
+    plan["videos"] = videos
+    plan["subtitles"] = subtitles
+    return plan
+
+
+def apply_plan(plan: dict, dry_run: bool = False) -> list[dict]:
+    """Rename subtitles according to plan.
+
+    Returns one result per match: {**match, "ok": bool, "error": str | None}.
+    With dry_run nothing is renamed and every match is reported as ok.
+    """
+    results = []
+    for match in plan["matches"]:
+        result = {**match, "ok": True, "error": None}
+        if not dry_run:
+            try:
+                match["subtitle"].rename(match["target"])
+            except OSError as e:
+                result["ok"], result["error"] = False, str(e)
+        results.append(result)
+    return results
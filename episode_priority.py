@@ -0,0 +1,97 @@
+"""Make an arc's episodes finish in episode order.
+
+Torrents are queued by episode number (queuePosition), so with
+transmission's download queue the first episodes are the ones downloading.
+The arc's torrents are numbered from the lowest queue slot they hold, so
+torrents queued ahead of the arc stay ahead of it.
+The next unfinished episode also gets high bandwidth priority, and in
+multi-file torrents its video file is set to high priority. With
+`sequential` (or ONEPACE_SEQUENTIAL=1) that episode is also downloaded in
+piece order so it can be watched while it downloads; this needs a daemon
+that supports sequentialDownload (Transmission 4.1+), older ones ignore it.
+
+Everything is sent as one pipelined batch of torrent-set calls.
+
+Usage:
+    prioritize(client, [hash1, hash2, ...])
+"""
+
+import os
+from pathlib import Path
+
+from episode_matcher import VIDEO_SUFFIX, EpisodeMatcher, guess_arc_name
+from transmission_rpc import TransmissionClient
+
+FIELDS = ["id", "name", "percentDone", "queuePosition", "files", "fileStats"]
+
+
+def sequential_default() -> bool:
+    return os.environ.get("ONEPACE_SEQUENTIAL", "") not in ("", "0")
+
+
+def episode_order(torrents: list[dict]) -> list[dict]:
+    """Sort torrents by episode number; unrecognised names go last."""
+    matcher = EpisodeMatcher(guess_arc_name([Path(t["name"]) for t in torrents]))
+
+    def key(torrent: dict) -> tuple:
+        episode = matcher.episode(torrent["name"])
+        return (episode is None, int(episode or 0), torrent["name"])
+
+    return sorted(torrents, key=key)
+
+
+def _next_file(torrent: dict) -> int | None:
+    """Index of the first unfinished video file, in episode order."""
+    files = torrent.get("files") or []
+    stats = torrent.get("fileStats") or []
+    videos = [
+        (Path(f["name"]).name, i)
+        for i, f in enumerate(files)
+        if f["name"].endswith(VIDEO_SUFFIX) and stats[i]["bytesCompleted"] < f["length"]
+    ]
+    if not videos:
+        return None
+    ordered = episode_order([{"name": name, "index": i} for name, i in videos])
+    return ordered[0]["index"]
+
+
+def prioritize(
+    client: TransmissionClient, ids: list, sequential: bool | None = None
+) -> dict | None:
+    """Queue the given torrents in episode order and boost the next episode.
+
+    Queue positions are offset from the lowest one the torrents currently
+    hold, not reset to 0, so the arc does not jump ahead of earlier arcs.
+    The arc ends up as one contiguous block there: other torrents queued
+    between its torrents move behind it, keeping their relative order.
+
+    Returns the torrent of the next unfinished episode, or None when all
+    are complete.
+    """
+    if sequential is None:
+        sequential = sequential_default()
+    torrents = episode_order(client.get_torrents(FIELDS, ids=ids))
+    upcoming = next((t for t in torrents if t["percentDone"] < 1), None)
+    first = min((t.get("queuePosition", 0) for t in torrents), default=0)
+
+    requests = []
+    for position, torrent in enumerate(torrents, start=first):
+        is_next = torrent is upcoming
+        arguments = {
+            "ids": [torrent["id"]],
+            "queuePosition": position,
+            "bandwidthPriority": 1 if is_next else 0,
+        }
+        if sequential:
+            arguments["sequentialDownload"] = is_next
+        if is_next and len(torrent.get("files") or []) > 1:
+            index = _next_file(torrent)
+            if index is not None:
+                arguments["priority-high"] = [index]
+                others = [i for i in range(len(torrent["files"])) if i != index]
+                if others:
+                    arguments["priority-normal"] = others
+        requests.append(("torrent-set", arguments))
+
+    client.call_batch(requests)
+    return upcoming
@@ -0,0 +1,223 @@
+"""Wait for files to finish appearing in a folder tree.
+
+On Linux an inotify watcher (via ctypes, no extra dependency) reports files
+as soon as they are closed after writing or renamed into place, so waiting
+costs no CPU while idle. Elsewhere, or if inotify is unavailable, a scandir
+poller reports files whose size has stopped changing between two polls.
+
+Files the watcher has seen but not handed out yet stay queued inside it,
+so stopping an events() loop early (or calling batch() repeatedly) never
+loses an event.
+
+Usage:
+    with open_watcher(Path("arc15-jaya")) as watcher:
+        for path in watcher.batch(timeout=30):
+            ...
+"""
+
+import functools
+import os
+import select
+import struct
+import sys
+import time
+from collections import deque
+from collections.abc import Iterator
+from pathlib import Path
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+
+@functools.cache
+def _load_libc():
+    """libc with inotify, or None; loaded on first watcher (ctypes is slow)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+    import ctypes.util
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None
+
+
+def _walk_dirs(root: Path) -> Iterator[str]:
+    stack = [str(root)]
+    while stack:
+        path = stack.pop()
+        yield path
+        try:
+            with os.scandir(path) as entries:
+                stack.extend(e.path for e in entries if e.is_dir(follow_symlinks=False))
+        except OSError:
+            continue
+
+
+def scan_files(root: Path, suffix: str) -> dict[str, int]:
+    """Return {path: size} for every file under root ending with suffix."""
+    found = {}
+    for directory in _walk_dirs(root):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(suffix) and entry.is_file():
+                        found[entry.path] = entry.stat().st_size
+        except OSError:
+            continue
+    return found
+
+
+class InotifyWatcher:
+    """Recursive inotify watch yielding files closed-after-write or moved in."""
+
+    def __init__(self, root: Path) -> None:
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError("inotify is not available")
+        self.root = Path(root)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            import ctypes
+
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, str] = {}
+        self._pending: deque[Path] = deque()
+        for directory in _walk_dirs(self.root):
+            self._add_watch(directory)
+
+    def _add_watch(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _read(self, timeout: float) -> bool:
+        """Queue the events that arrive within timeout; False if none did."""
+        ready, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not ready:
+            return False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return True
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            parent = self._dirs.get(wd)
+            if parent is None or not name:
+                continue
+            path = os.path.join(parent, name)
+            if mask & IN_ISDIR:
+                # New subfolder (torrent with a top-level directory):
+                # watch it and report anything already written inside
+                self._add_watch(path)
+                for sub in _walk_dirs(Path(path)):
+                    if sub != path:
+                        self._add_watch(sub)
+                self._pending.extend(Path(p) for p in scan_files(Path(path), ""))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._pending.append(Path(path))
+        return True
+
+    def events(self, timeout: float) -> Iterator[Path]:
+        """Yield completed file paths until timeout seconds pass."""
+        deadline = time.monotonic() + timeout
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self._read(remaining):
+                return
+
+    def batch(self, timeout: float) -> list[Path]:
+        """Wait up to timeout for a completed file; return it with every
+        other one already reported (empty list on timeout)."""
+        first = next(self.events(timeout), None)
+        if first is None:
+            return []
+        while self._read(0):
+            pass
+        paths = [first, *self._pending]
+        self._pending.clear()
+        return paths
+
+
+class PollingWatcher:
+    """Portable fallback: scandir snapshots, reporting files once stable."""
+
+    def __init__(self, root: Path, interval: float = 0.5) -> None:
+        self.root = Path(root)
+        self.interval = interval
+        # Files present when watching starts are not events
+        self._previous = scan_files(self.root, "")
+        self._reported: set[str] = set(self._previous)
+        self._pending: deque[Path] = deque()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "PollingWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def _poll(self, deadline: float) -> None:
+        """Sleep one interval, then queue files whose size did not change."""
+        time.sleep(min(self.interval, max(0.0, deadline - time.monotonic())))
+        current = scan_files(self.root, "")
+        for path, size in current.items():
+            if path not in self._reported and self._previous.get(path) == size:
+                self._reported.add(path)
+                self._pending.append(Path(path))
+        self._previous = current
+
+    def events(self, timeout: float) -> Iterator[Path]:
+        deadline = time.monotonic() + timeout
+        while True:
+            while self._pending:
+                yield self._pending.popleft()
+            if time.monotonic() >= deadline:
+                return
+            self._poll(deadline)
+
+    def batch(self, timeout: float) -> list[Path]:
+        deadline = time.monotonic() + timeout
+        while not self._pending and time.monotonic() < deadline:
+            self._poll(deadline)
+        paths = list(self._pending)
+        self._pending.clear()
+        return paths
+
+
+def open_watcher(root: Path) -> InotifyWatcher | PollingWatcher:
+    """Return an inotify watcher when possible, else the polling fallback."""
+    try:
+        return InotifyWatcher(root)
+    except OSError:
+        return PollingWatcher(root)
+
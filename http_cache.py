@@ -0,0 +1,259 @@
+"""Shared HTTP fetch layer with an on-disk cache.
+
+Every scraper (onepaceptbr pages, nyaa searches, Drive folder listings) goes
+through `fetch`/`fetch_text`. Responses are stored on disk keyed by URL:
+
+  - within the TTL a cached body is returned without touching the network
+  - after the TTL the entry is revalidated with If-None-Match /
+    If-Modified-Since, so an unchanged page costs a single 304
+  - if the network fails, a stale cached copy is served instead of erroring
+  - the cache is bounded in size and evicts least recently used entries
+
+Settings (environment variables):
+    ONEPACE_CACHE_DIR      - cache root (default: $XDG_CACHE_HOME/onepace)
+    ONEPACE_CACHE_TTL      - seconds a response is fresh (default: 600)
+    ONEPACE_CACHE_MAX_MB   - size bound for cached bodies (default: 64)
+
+Network requests go through rate_limit.py: per-host rate limits, and
+retries with backoff on 429/5xx and timeouts when no cached copy exists.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from functools import partial
+from pathlib import Path
+
+import cassette
+import rate_limit
+import telemetry
+from rate_limit import RetryableError
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+
+class FetchError(RuntimeError):
+    """Raised when a URL cannot be fetched and no cached copy exists."""
+
+
+def default_cache_dir() -> Path:
+    if os.environ.get("ONEPACE_CACHE_DIR"):
+        return Path(os.environ["ONEPACE_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "onepace"
+
+
+def _decode_body(data: bytes, encoding: str | None) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "deflate":
+        return zlib.decompress(data)
+    return data
+
+
+def _urlopen(url: str, headers: dict, timeout: float) -> tuple[int, dict, bytes]:
+    """One GET: (status, lowercased headers, decoded body); errors are statuses.
+
+    Timeouts and resets are raised as TimeoutError/ConnectionResetError.
+    """
+    # Fresh cache hits never touch the network stack, so load it only here
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = _decode_body(response.read(), response.headers.get("Content-Encoding"))
+            return response.status, _lower(response.headers), body
+    except urllib.error.HTTPError as e:
+        return e.code, _lower(e.headers), b""
+    except urllib.error.URLError as e:
+        if isinstance(e.reason, (TimeoutError, ConnectionResetError)):
+            raise e.reason from e
+        raise
+
+
+def _lower(headers) -> dict[str, str]:
+    return {key.lower(): value for key, value in headers.items()}
+
+
+class HTTPCache:
+    """On-disk, size-bounded LRU cache of HTTP GET responses.
+
+    Each entry is two files named after the SHA-256 of the URL: `<key>.body`
+    with the decoded payload and `<key>.json` with validators and timestamps.
+    The body's mtime doubles as the LRU access time.
+    """
+
+    def __init__(
+        self,
+        directory: Path | None = None,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+        timeout: float = 30,
+    ) -> None:
+        self.directory = Path(directory or default_cache_dir() / "http")
+        self.ttl = ttl if ttl is not None else float(
+            os.environ.get("ONEPACE_CACHE_TTL", "600")
+        )
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.environ.get("ONEPACE_CACHE_MAX_MB", "64")) * 1024 * 1024
+        )
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.body", self.directory / f"{key}.json"
+
+    def _load(self, url: str) -> tuple[dict, Path] | None:
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not body_path.exists():
+            return None
+        return meta, body_path
+
+    def _store(self, url: str, body: bytes, headers) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        body_path, meta_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "content_type": headers.get("content-type"),
+            "fetched_at": time.time(),
+            "size": len(body),
+        }
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp_body = body_path.with_name(body_path.name + suffix)
+        tmp_meta = meta_path.with_name(meta_path.name + suffix)
+        tmp_body.write_bytes(body)
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_body, body_path)
+        os.replace(tmp_meta, meta_path)
+        self.evict()
+
+    def _touch(self, meta: dict, body_path: Path, revalidated: bool = False) -> None:
+        """Mark an entry as recently used (and fresh again after a 304)."""
+        try:
+            os.utime(body_path)
+            if revalidated:
+                meta["fetched_at"] = time.time()
+                body_path.with_suffix(".json").write_text(json.dumps(meta))
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits max_bytes."""
+        with self._lock:
+            try:
+                bodies = [
+                    (entry.stat().st_mtime, entry.stat().st_size, Path(entry.path))
+                    for entry in os.scandir(self.directory)
+                    if entry.name.endswith(".body")
+                ]
+            except OSError:
+                return
+            total = sum(size for _, size, _ in bodies)
+            for _, size, path in sorted(bodies):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                path.with_suffix(".json").unlink(missing_ok=True)
+                total -= size
+
+    def fetch(self, url: str, ttl: float | None = None) -> bytes:
+        """Return the body for `url`, using the cache when possible.
+
+        Raises:
+            FetchError: if the request fails and nothing is cached
+        """
+        ttl = self.ttl if ttl is None else ttl
+        # Recorded runs must hit the network (or cassette) for every page
+        cached = None if cassette.enabled() else self._load(url)
+
+        if cached:
+            meta, body_path = cached
+            if time.time() - meta.get("fetched_at", 0) < ttl:
+                telemetry.add("cache_hits")
+                self._touch(meta, body_path)
+                return body_path.read_bytes()
+
+        headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+        if cached:
+            if cached[0].get("etag"):
+                headers["If-None-Match"] = cached[0]["etag"]
+            if cached[0].get("last_modified"):
+                headers["If-Modified-Since"] = cached[0]["last_modified"]
+
+        def send():
+            telemetry.add("http_requests")
+            try:
+                status, response_headers, body = cassette.exchange(
+                    "http", {"url": url}, partial(_urlopen, url, headers, self.timeout)
+                )
+            except (TimeoutError, ConnectionResetError) as e:
+                if not cached:
+                    raise RetryableError(str(e) or type(e).__name__) from e
+                raise
+            # Throttled or failing server: retry, unless a stale copy will do
+            if (status == 429 or status >= 500) and not cached:
+                raise RetryableError(f"HTTP {status}", response_headers.get("retry-after"))
+            return status, response_headers, body
+
+        try:
+            status, response_headers, body = rate_limit.run(url, send)
+        except RetryableError as e:
+            raise FetchError(f"Could not fetch {url}: {e} (gave up after retries)") from e
+        except (OSError, ValueError) as e:
+            if cached:
+                # Offline or flaky network: a stale copy beats failing
+                return cached[1].read_bytes()
+            raise FetchError(f"Could not fetch {url}: {e}") from e
+
+        if status == 304 and cached:
+            self._touch(cached[0], cached[1], revalidated=True)
+            return cached[1].read_bytes()
+        if status >= 300:
+            if cached and (status >= 500 or status == 429):
+                return cached[1].read_bytes()
+            raise FetchError(f"HTTP {status} fetching {url}")
+
+        if not body:
+            raise FetchError(f"Empty response from {url}")
+
+        telemetry.add("bytes", len(body))
+        if not cassette.enabled():
+            self._store(url, body, response_headers)
+        return body
+
+    def fetch_text(self, url: str, ttl: float | None = None) -> str:
+        return self.fetch(url, ttl=ttl).decode("utf-8", errors="replace")
+
+
+_default_cache: HTTPCache | None = None
+
+
+def default_cache() -> HTTPCache:
+    """Return the process-wide cache shared by all scrapers."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HTTPCache()
+    return _default_cache
+
+
+def fetch(url: str, ttl: float | None = None) -> bytes:
+    """Fetch `url` through the shared on-disk cache."""
+    return default_cache().fetch(url, ttl=ttl)
+
+
+def fetch_text(url: str, ttl: float | None = None) -> str:
+    """Fetch `url` through the shared on-disk cache and decode it as UTF-8."""
+    return default_cache().fetch_text(url, ttl=ttl)
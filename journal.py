@@ -0,0 +1,107 @@
+"""Per-arc journal of finished pipeline steps.
+
+Each arc folder keeps a `.journal.json` recording, for every step that
+completed, a hash of the step's inputs and what it produced:
+
+    {
+      "steps": {
+        "episodes":  {"inputs": "3b1f...", "finished_at": 1700000000.0,
+                      "output": {"magnets": [...], "torrents": [...]}},
+        "subtitles": {"inputs": "...", "output": {"files": [...]}},
+        "match":     {"inputs": "...", "output": {"matches": [...]}}
+      }
+    }
+
+On a re-run a step is skipped when its inputs hash is unchanged and its
+validity check (e.g. "the matched files still exist") passes; otherwise it
+runs again and its entry is replaced; invalidate() forgets steps whose
+results change under the same inputs (new releases). Only hashes of the inputs are stored,
+so ZIP passwords never end up on disk.
+
+Usage:
+    journal = PipelineJournal(folder_name, fresh="--fresh" in sys.argv)
+    output = journal.run("episodes", [nyaa_url], download_episodes)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+JOURNAL_NAME = ".journal.json"
+
+
+def input_hash(inputs) -> str:
+    """Stable hash of any JSON-serialisable step inputs."""
+    blob = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class PipelineJournal:
+    """Records finished steps of one arc's pipeline so re-runs can skip them.
+
+    Safe to share between the concurrently running stages of a pipeline.
+    """
+
+    def __init__(self, folder: str | Path, fresh: bool = False) -> None:
+        self.path = Path(folder) / JOURNAL_NAME
+        self.steps: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if not fresh:
+            try:
+                self.steps = json.loads(self.path.read_text()).get("steps", {})
+            except (OSError, ValueError):
+                self.steps = {}
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"steps": self.steps}, ensure_ascii=False, indent=2))
+        os.replace(tmp, self.path)
+
+    def completed(self, step: str, inputs) -> dict | None:
+        """Return the step's recorded output if it finished with these inputs."""
+        entry = self.steps.get(step)
+        if entry and entry["inputs"] == input_hash(inputs):
+            return entry["output"]
+        return None
+
+    def record(self, step: str, inputs, output: dict) -> None:
+        with self._lock:
+            self.steps[step] = {
+                "inputs": input_hash(inputs),
+                "finished_at": time.time(),
+                "output": output,
+            }
+            self._save()
+
+    def invalidate(self, *steps: str) -> None:
+        """Forget steps so they run again, e.g. to pick up new releases."""
+        with self._lock:
+            removed = [self.steps.pop(step) for step in steps if step in self.steps]
+            if removed:
+                self._save()
+
+    def run(
+        self,
+        step: str,
+        inputs,
+        func: Callable[[], dict],
+        is_valid: Callable[[dict], bool] | None = None,
+    ) -> tuple[dict, bool]:
+        """Run func unless the step already finished with the same inputs.
+
+        Returns (output, skipped). A recorded output that fails is_valid is
+        discarded and the step runs again. If func raises, nothing is
+        recorded and the step runs again next time.
+        """
+        output = self.completed(step, inputs)
+        if output is not None and (is_valid is None or is_valid(output)):
+            return output, True
+
+        output = func()
+        self.record(step, inputs, output)
+        return output, False
@@ -31,16 +31,23 @@ The script:
   1. Fetches the nyaa.si page
   2. Extracts all magnet links
   3. Creates the folder
-  4. Starts all downloads asynchronously with transmission-cli
+  4. Adds the torrents transmission-daemon does not have yet in one RPC batch
+     and queues them in episode order (see episode_priority.py)
   5. Returns immediately (downloads continue in background)
 """
 
-import subprocess
-import re
 import sys
-import time
+from functools import partial
 from pathlib import Path
-from html import unescape
+
+import cassette
+import nyaa_parser
+import telemetry
+from http_cache import FetchError, fetch_text
+from magnet_links import dedupe, parse_magnet
+from scheduler import stage_slot
+from episode_priority import prioritize
+from transmission_rpc import TransmissionClient, TransmissionError
 
 
 class MagnetDownloader:
@@ -49,23 +56,37 @@ class MagnetDownloader:
     Attributes:
         - torrent_url: Nyaa.si torrent page URL
         - arc_folder: Arc folder name
+        - scheduler: Optional PipelineScheduler limiting the scrape and
+          torrent stages when several arcs run at once
+        - magnets: Magnet records found by the last download()
+          ({uri, info_hash, name, trackers}, see magnet_links.py)
+        - torrents: Per-magnet add results of the last download()
+          ({magnet, ok, status, id, name, hash, error})
 
     Methods:
         download() -> None: Download all magnet links
     """
 
-    def __init__(self, torrent_url: str, arc_folder: str):
+    def __init__(self, torrent_url: str, arc_folder: str, scheduler=None):
         self.torrent_url = torrent_url
         self.arc_folder = arc_folder
+        self.scheduler = scheduler
+        self.magnets: list[dict] = []
+        self.torrents: list[dict] = []
 
-    def _download_magnets(self, magnets: list[str], arc_folder: str) -> None:
+    def _download_magnets(self, magnets: list[dict], arc_folder: str) -> list[dict]:
         """
-        Download magnets using transmission-remote (RPC to running daemon).
+        Download magnets through the transmission-daemon JSON-RPC interface.
+
+        Torrents the daemon already has (by infohash, from one bulk
+        torrent-get) are reported as duplicates without being re-added.
 
         Args:
-            magnets: List of magnet links
+            magnets: List of magnet records
             arc_folder: Arc folder name
 
+        Returns:
+            One add result per magnet (see TransmissionClient.add_torrents)
         """
 
         print(f"Found {len(magnets)} magnet links")
@@ -75,120 +96,113 @@ class MagnetDownloader:
         save_path = Path(arc_folder).absolute()
         save_path.mkdir(parents=True, exist_ok=True)
 
-        # Check if transmission daemon is running, if not start it
-        daemon_running = subprocess.run(
-            ["transmission-remote", "-l"],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        ).returncode == 0
+        client = TransmissionClient.from_env()
+        try:
+            # Start the daemon if it is not answering RPC yet
+            client.ensure_daemon()
+        except FileNotFoundError:
+            print("✗ transmission-daemon not found")
+            print("  Install with: sudo pacman -S transmission-cli")
+            raise
+
+        with client:
+            known = {
+                torrent["hashString"]: torrent
+                for torrent in client.get_torrents(["id", "name", "hashString"])
+            }
+            new = [m for m in magnets if m["info_hash"] not in known]
+            # Add only the new magnets, in one pipelined RPC batch
+            added = iter(client.add_torrents([m["uri"] for m in new], str(save_path)))
+
+        telemetry.add("rpc_calls", 1 + len(new))
+        results = []
+        for magnet in magnets:
+            torrent = known.get(magnet["info_hash"])
+            if torrent is None:
+                results.append(next(added))
+                continue
+            results.append(
+                {
+                    "magnet": magnet["uri"],
+                    "ok": True,
+                    "status": "duplicate",
+                    "id": torrent["id"],
+                    "name": torrent["name"],
+                    "hash": torrent["hashString"],
+                    "error": None,
+                }
+            )
+        if len(new) < len(magnets):
+            print(f"ℹ {len(magnets) - len(new)} torrent(s) already in transmission")
 
-        if not daemon_running:
-            print("📡 Starting transmission daemon...")
+        hashes = [r["hash"] for r in results if r["ok"] and r["hash"]]
+        if hashes:
             try:
-                subprocess.Popen(
-                    ["transmission-daemon"],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                )
-                time.sleep(2)  # Wait for daemon to start
-            except FileNotFoundError:
-                print("✗ transmission-daemon not found")
-                print("  Install with: sudo pacman -S transmission-cli")
-                raise
-
-        # Add all magnets to running transmission daemon via RPC
+                # Episodes should finish in order: queue and boost accordingly
+                with client:
+                    prioritize(client, hashes)
+                telemetry.add("rpc_calls", 1 + len(hashes))
+            except TransmissionError as e:
+                print(f"⚠ Could not set episode priorities: {e}")
         started = 0
-        for i, magnet in enumerate(magnets, 1):
-            try:
-                # Use transmission-remote to add torrent
-                result = subprocess.run(
-                    ["transmission-remote", "-a", magnet, "-w", str(save_path)],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                )
-                if result.returncode == 0:
-                    print(f"[{i:2d}/{len(magnets)}] ✓ Added to queue", end="\r")
-                    started += 1
-                else:
-                    print(f"[{i:2d}/{len(magnets)}] ✗ {result.stderr}")
-            except FileNotFoundError:
-                print(f"[{i:2d}/{len(magnets)}] ✗ transmission-remote not found")
-                print("  Install with: sudo pacman -S transmission-cli")
-                raise
-            except Exception as e:
-                print(f"[{i:2d}/{len(magnets)}] ✗ Error: {e}")
-                continue
+        for i, result in enumerate(results, 1):
+            if result["ok"]:
+                status = "already in queue" if result["status"] == "duplicate" else "Added to queue"
+                print(f"[{i:2d}/{len(magnets)}] ✓ {status}", end="\r")
+                started += 1
+            else:
+                print(f"[{i:2d}/{len(magnets)}] ✗ {result['error']}")
 
         print(f"✓ Added {started}/{len(magnets)} torrents to queue!")
         print(f"✓ Download folder: {save_path}")
         print(f"📡 Transmission daemon running - downloads continue in background")
+        print(f"📊 Follow progress with: uv run dashboard.py {arc_folder}")
+        return results
 
-    def _extract_magnets(self, url: str) -> list[str]:
+    def _extract_magnets(self, url: str, refresh: bool = False) -> list[dict]:
         """
-        Extract magnet links from nyaa.si URL.
+        Extract magnet links from nyaa.si URL (bypassing the HTTP cache's
+        freshness window when `refresh` is set).
 
         Returns:
-            List of magnet links, empty list if none found
+            Magnet records deduplicated by infohash in page order, empty
+            list if none found
         """
         EXCLUDED_PATTERNS = [
             "Alternate",  # skip alternate
             "G-8",  # skip fillers
         ]
+        magnets: list[dict] = []
         try:
-            result = subprocess.run(
-                ["curl", "-s", url, "--compressed"],
-                capture_output=True,
-                text=True,
-                timeout=30,
-            )
-
-            if result.returncode != 0:
-                return []
-
-            html = result.stdout
-            if not html:
-                return []
-
-        except Exception:
+            # Rows from every result page, or the direct links of a view page
+            fetch = partial(fetch_text, ttl=0) if refresh else fetch_text
+            for row in nyaa_parser.search(url, fetch=fetch):
+                text = f"{row['title']} {row['magnet']}"
+                if row["title"] is None or not any(
+                    pat in text for pat in EXCLUDED_PATTERNS
+                ):
+                    magnets.append(parse_magnet(row["magnet"]))
+        except FetchError as e:
+            # Already retried with backoff (see rate_limit.py)
+            print(f"❌ {e}", file=sys.stderr)
             return []
 
-        magnets: list[str] = []
-
-        # Pattern 1: Search results page (table rows)
-        entries = re.findall(
-            r'<tr[^>]*>.*?(<a[^>]*href=["\']magnet:[^"\']*["\'][^>]*>.*?</a>).*?</tr>',
-            html,
-            re.DOTALL,
-        )
-
-        for entry in entries:
-            magnet_match = re.search(r'href=["\']([^"\']*magnet:[^"\']*)["\']', entry)
-            if magnet_match:
-                magnet = unescape(magnet_match.group(1))
-                # if "Alternate" not in entry and "G-8" not in entry:
-                if not any(pat in entry for pat in EXCLUDED_PATTERNS):
-                    magnets.append(magnet)
-
-        # Pattern 2: Single torrent view page (direct magnet links)
-        if not magnets:
-            direct_magnets = re.findall(r'href=["\']([^"\']*magnet:[^"\']*)["\']', html)
-            for magnet in direct_magnets:
-                magnet = unescape(magnet)
-                magnets.append(magnet)
-
-        # Remove duplicates
-        return list(set(magnets))
+        # Remove duplicates (same torrent with other trackers/names included)
+        return dedupe(magnets)
 
-    def download(self) -> int:
-        """Download all magnet links
+    def download(self, refresh: bool = False) -> int:
+        """Download all magnet links (refresh: search nyaa again, see
+        _extract_magnets)
 
         Returns:
            Number of magnet links
 
         """
         print(f"📥 Fetching: {self.torrent_url}")
-        magnets = self._extract_magnets(self.torrent_url)
+        with stage_slot(self.scheduler, "scrape"), telemetry.span("scrape"):
+            magnets = self._extract_magnets(self.torrent_url, refresh)
+            telemetry.annotate(magnets=len(magnets))
+        self.magnets = magnets
 
         if not magnets:
             print("❌ No magnet links found on the page", file=sys.stderr)
@@ -196,13 +210,19 @@ class MagnetDownloader:
 
         print(f"🔍 Extracted {len(magnets)} magnet link(s)")
 
-        self._download_magnets(magnets, self.arc_folder)
+        with stage_slot(self.scheduler, "torrent"), telemetry.span("torrent_add"):
+            self.torrents = self._download_magnets(magnets, self.arc_folder)
         return len(magnets)
 
 
-if __name__ == "__main__":
+def main():
+    cassette.consume_flags(sys.argv)
     if len(sys.argv) != 3:
         print(__doc__)
         sys.exit(0)
 
     MagnetDownloader(sys.argv[1], sys.argv[2]).download()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Parse magnet links into records and dedupe them by infohash.
+
+    parse_magnet("magnet:?xt=urn:btih:...&dn=Jaya+01&tr=udp://...")
+    -> {"uri", "info_hash", "name", "trackers"}
+
+`info_hash` is the lowercase 40-character hex form (base32 hashes are
+converted), so it compares equal to Transmission's `hashString`.
+"""
+
+import base64
+import binascii
+from urllib.parse import parse_qs, urlsplit
+
+BTIH_PREFIX = "urn:btih:"
+
+
+def _normalize_hash(value: str) -> str | None:
+    if len(value) == 40:
+        try:
+            bytes.fromhex(value)
+        except ValueError:
+            return None
+        return value.lower()
+    if len(value) == 32:
+        try:
+            return base64.b32decode(value.upper()).hex()
+        except binascii.Error:
+            return None
+    return None
+
+
+def parse_magnet(uri: str) -> dict:
+    """Split a magnet URI into its infohash, display name and trackers.
+
+    info_hash is None when the link has no valid BitTorrent v1 hash.
+    """
+    params = parse_qs(urlsplit(uri).query)
+    info_hash = None
+    for xt in params.get("xt", []):
+        if xt.lower().startswith(BTIH_PREFIX):
+            info_hash = _normalize_hash(xt[len(BTIH_PREFIX) :])
+            if info_hash:
+                break
+    names = params.get("dn", [])
+    return {
+        "uri": uri,
+        "info_hash": info_hash,
+        "name": names[0] if names else None,
+        "trackers": params.get("tr", []),
+    }
+
+
+def dedupe(records: list[dict]) -> list[dict]:
+    """Drop repeated torrents, keeping the first occurrence of each.
+
+    Records are keyed by infohash (so links differing only in trackers or
+    name collapse), or by the full URI when no hash could be parsed.
+    """
+    seen = set()
+    unique = []
+    for record in records:
+        key = record["info_hash"] or record["uri"]
+        if key not in seen:
+            seen.add(key)
+            unique.append(record)
+    return unique
@@ -3,7 +3,20 @@ One Pace Download Pipeline
 Executes the complete workflow: download episodes, download subtitles, match, and verify.
 
 Usage:
-    uv run main.py <nyaa_url> <gdrive_url> <folder_name>
+    uv run main.py <nyaa_url> <gdrive_url> <folder_name> [--fresh | --refresh]
+                   [--trace FILE] [--profile[=FILE]] [--record DIR | --replay DIR]
+
+Finished steps are recorded in <folder_name>/.journal.json; re-running the
+same command skips them unless their inputs changed.
+
+Options:
+    --fresh             ignore the journal and run every step again
+    --refresh           search nyaa and Drive again for new releases (the
+                        URLs stay the same, so the journal cannot tell)
+    --trace FILE        append per-step timing spans to FILE as JSON lines
+    --profile[=FILE]    profile the run with cProfile (default: onepace.prof)
+    --record DIR        save every HTTP request, RPC call and Drive download to DIR
+    --replay DIR        run offline from a recording (see cassette.py)
 
 Example:
     uv run main.py \
@@ -13,9 +26,27 @@ Example:
 """
 
 import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from magnet_downloader import MagnetDownloader
-from download_subtitles import SubtitleDownloader
+from arc_torrents import arc_torrents, expected_videos, is_single_file
+from episode_matcher import SUBTITLE_SUFFIX, VIDEO_SUFFIX, apply_plan, build_plan, scan
+from fs_watch import open_watcher
+from journal import PipelineJournal
+from mkv_verify import print_problems, verify_videos
+from subtitle_manifest import is_intact, load_manifest, record_moves
+from transmission_rpc import TransmissionClient, TransmissionError
+import cassette
+import telemetry
+
+# Steps whose results change over time under the same URLs (new releases)
+SEARCH_STEPS = ("episodes", "subtitles")
+
+TORRENT_FIELDS = ["id", "downloadDir", "files"]
+METADATA_POLL = 2  # seconds between daemon queries while metadata is pending
+DOWNLOADS_POLL = 0.25  # seconds between checks for the download stages finishing
 
 
 def print_separator(n: int = 70) -> None:
@@ -29,10 +60,32 @@ def print_step(step_num: int, description: str) -> None:
     print_separator()
 
 
-def flatten_video_folders(folder_name: str) -> int:
+def _torrent_owners(client: TransmissionClient) -> dict[Path, dict]:
+    """Map each torrent file's absolute path to its torrent.
+
+    Torrents still fetching metadata have no file list yet and own nothing.
+    """
+    owners = {}
+    for torrent in client.get_torrents(["id", "name", "downloadDir", "files"]):
+        base = Path(torrent["downloadDir"]).resolve()
+        for f in torrent["files"] or []:
+            owners[base / f["name"]] = torrent
+    return owners
+
+
+def flatten_video_folders(folder_name: str, client: TransmissionClient | None = None) -> int:
     """Detect and move .mkv files from subdirectories to the main folder.
     Some torrents download a folder containing the videos instead of the videos directly.
 
+    Files transmission-daemon is seeding are never moved behind its back:
+    single-file torrents sitting in a subfolder are relocated by the daemon
+    (torrent-set-location, no re-verification). Videos of a torrent with a
+    folder of its own stay in that folder: the RPC can only rename a path
+    in place (torrent-rename-path), not lift it out, and subtitles are
+    matched next to them instead. Only videos no torrent owns are moved.
+    If the daemon is unreachable nothing is moved, since it is unknown
+    which files it owns.
+
     Returns:
         Number of files moved
     """
@@ -40,22 +93,44 @@ def flatten_video_folders(folder_name: str) -> int:
     if not folder_path.exists():
         return 0
 
+    client = client or TransmissionClient.from_env()
+    try:
+        with client:
+            owners = _torrent_owners(client) if client.ping() else None
+    except TransmissionError:
+        owners = None
+    if owners is None:
+        print("⚠ transmission-daemon not reachable, leaving videos in their subfolders")
+        return 0
+
     moved_count = 0
+    relocate: dict[int, str] = {}
+    video_dirs = []
 
     # Find all subdirectories (excluding 'subtitles' folder)
     subdirs = [d for d in folder_path.iterdir() if d.is_dir() and d.name != "subtitles"]
 
     for subdir in subdirs:
-        # Find all .mkv files in this subdirectory
-        mkv_files = list(subdir.glob("*.mkv"))
+        # Videos a multi-file torrent keeps in its own folder stay there
+        mkv_files = []
+        for f in sorted(subdir.glob("*.mkv")):
+            torrent = owners.get(f.resolve())
+            if torrent is None or is_single_file(torrent):
+                mkv_files.append((f, torrent))
 
         if len(mkv_files) > 0:
+            video_dirs.append(subdir)
             print(f"\n📁 Found {len(mkv_files)} video(s) in subfolder: {subdir.name}")
 
-            for mkv_file in mkv_files:
+            for mkv_file, torrent in mkv_files:
                 target = folder_path / mkv_file.name
-
-                # Move the file
+                if target.exists():
+                    print(f"   ⚠ {mkv_file.name} already exists in main folder, skipping")
+                    continue
+                if torrent is not None:
+                    # Single-file torrent: let the daemon move it
+                    relocate[torrent["id"]] = mkv_file.name
+                    continue
                 try:
                     mkv_file.rename(target)
                     print(f"   ✓ Moved: {mkv_file.name}")
@@ -63,19 +138,347 @@ def flatten_video_folders(folder_name: str) -> int:
                 except Exception as e:
                     print(f"   ✗ Error moving {mkv_file.name}: {e}")
 
-            # Try to remove the empty directory
-            try:
-                if not list(subdir.iterdir()):  # Only if empty
-                    subdir.rmdir()
-                    print(f"   ✓ Removed empty folder: {subdir.name}")
-                else:
-                    print(f"   ⚠ Folder not empty, keeping: {subdir.name}")
-            except Exception as e:
-                print(f"   ⚠ Could not remove folder: {e}")
+    if relocate:
+        try:
+            with client:
+                client.set_location(
+                    list(relocate), str(folder_path.resolve()), move=True
+                )
+            for name in relocate.values():
+                print(f"   ✓ Relocated by transmission: {name}")
+            moved_count += len(relocate)
+        except TransmissionError as e:
+            print(f"   ✗ Could not relocate {len(relocate)} torrent(s): {e}")
+
+    for subdir in video_dirs:
+        # Try to remove the empty directory
+        try:
+            if not list(subdir.iterdir()):  # Only if empty
+                subdir.rmdir()
+                print(f"   ✓ Removed empty folder: {subdir.name}")
+        except Exception as e:
+            print(f"   ⚠ Could not remove folder: {e}")
 
     return moved_count
 
 
+def open_journal(folder_name: str, fresh: bool = False, refresh: bool = False) -> PipelineJournal:
+    """Load the arc's journal; `refresh` forgets the search steps (SEARCH_STEPS)."""
+    journal = PipelineJournal(folder_name, fresh=fresh)
+    if refresh:
+        journal.invalidate(*SEARCH_STEPS)
+    return journal
+
+
+def print_resumed(step: str) -> None:
+    print(f"⏭ {step} already finished in a previous run (use --refresh or --fresh to redo)")
+
+
+def run_episodes_step(
+    journal: PipelineJournal,
+    nyaa_url: str,
+    folder_name: str,
+    scheduler=None,
+    refresh: bool = False,
+) -> int:
+    """Scrape nyaa and queue the torrents, unless the journal says it's done.
+
+    With `refresh` the search pages are fetched again rather than from the
+    HTTP cache. Returns the number of magnet links.
+    """
+
+    def step() -> dict:
+        from magnet_downloader import MagnetDownloader
+
+        downloader = MagnetDownloader(nyaa_url, folder_name, scheduler)
+        downloader.download(refresh=refresh)
+        return {"magnets": downloader.magnets, "torrents": downloader.torrents}
+
+    output, skipped = journal.run(
+        "episodes",
+        [nyaa_url],
+        step,
+        is_valid=lambda out: all(t["ok"] for t in out["torrents"]),
+    )
+    if skipped:
+        print_resumed(f"Episodes ({len(output['magnets'])} torrents)")
+    return len(output["magnets"])
+
+
+def run_subtitles_step(
+    journal: PipelineJournal,
+    gdrive_url: str,
+    folder_name: str,
+    zip_password: str | None = None,
+    scheduler=None,
+    refresh: bool = False,
+) -> int:
+    """Download subtitles, unless the journal says they're done and intact.
+
+    With `refresh` the Drive folder is listed again even when every file
+    is already present, to pick up new or replaced ones. Returns the
+    number of subtitles.
+    """
+    subtitles_folder = Path(folder_name) / "subtitles"
+
+    def step() -> dict:
+        from download_subtitles import SubtitleDownloader
+
+        downloader = SubtitleDownloader(gdrive_url, folder_name, scheduler=scheduler)
+        if zip_password:
+            downloader.set_password(zip_password)
+        downloader.download(refresh=refresh)
+        return {"files": sorted(load_manifest(subtitles_folder)["files"])}
+
+    output, skipped = journal.run(
+        "subtitles",
+        [gdrive_url, zip_password],
+        step,
+        is_valid=lambda out: is_intact(subtitles_folder),
+    )
+    if skipped:
+        print_resumed(f"Subtitles ({len(output['files'])} files)")
+    return len(output["files"])
+
+
+def _torrent_videos(client: TransmissionClient | None, folder: Path) -> tuple[list[Path], bool]:
+    """Final video paths from the daemon's file lists, and whether some
+    torrents are still waiting for metadata. ([], False) without a daemon."""
+    if client is None:
+        return [], False
+    try:
+        torrents = arc_torrents(client, folder, TORRENT_FIELDS)
+    except TransmissionError:
+        return [], False
+    return expected_videos(torrents, folder), any(not t["files"] for t in torrents)
+
+
+def match_subtitles(
+    folder_name: str,
+    timeout: float = 30,
+    client: TransmissionClient | None = None,
+    downloads_done: threading.Event | None = None,
+    settled: Callable[[], bool] | None = None,
+) -> list[dict]:
+    """Match and rename subtitles to video filenames as both become known.
+
+    Meant to run alongside the download stages: every time a subtitle lands
+    in subtitles/ or a video name becomes known, the episodes that now have
+    both sides are renamed. Video names come from the arc's torrents in
+    transmission as soon as their metadata arrives, so subtitles get their
+    final names long before the videos finish downloading; videos that only
+    show up on disk are picked up too.
+
+    While `downloads_done` is unset more files may still come, so matching
+    keeps waiting. Afterwards it returns once no subtitle is left
+    unmatched, once no torrent is waiting for metadata (finished videos
+    are named by then), after `timeout` seconds with no new video or
+    metadata, or when `settled()` says the arc is unchanged since an
+    earlier match.
+    Renames are written to the subtitle manifest only once the downloads
+    are done, since the subtitle stage saves its own copy until then.
+
+    Returns the successful matches ({"episode", "video", "subtitle", "target"}).
+    """
+    folder_path = Path(folder_name)
+    subtitle_dir = folder_path / "subtitles"
+    if downloads_done is None:
+        downloads_done = threading.Event()
+        downloads_done.set()
+
+    if downloads_done.is_set() and not subtitle_dir.exists():
+        return []
+    # The download stages create it too, but it has to exist to be watched
+    folder_path.mkdir(parents=True, exist_ok=True)
+
+    client = client or TransmissionClient.from_env()
+    matched = []
+    recorded = 0
+    known: set[Path] = set()
+    produced: set[Path] = set()
+    deadline = time.monotonic() + timeout
+    rematch = flatten = True
+    # Watch before the first scan so nothing lands unseen in between
+    with client, open_watcher(folder_path) as watcher:
+        while True:
+            downloading = not downloads_done.is_set()
+            if rematch:
+                expected, waiting = _torrent_videos(client, folder_path)
+                if not known.issuperset(expected):
+                    known.update(expected)
+                    deadline = time.monotonic() + timeout
+                if flatten:
+                    # Bring stray videos up first, or their subtitles would stay behind
+                    videos = scan(folder_path, VIDEO_SUFFIX, recursive=True)
+                    if any(v.parent != folder_path and v not in known for v in videos):
+                        flatten_video_folders(folder_name)
+                    flatten = False
+
+                # Index videos (recursively, in case they're in subfolders) and subtitles
+                plan = build_plan(folder_path, subtitle_dir, recursive=True, expected=expected)
+                ok = [result for result in apply_plan(plan) if result["ok"]]
+                for result in ok:
+                    print(f"   ✓ Episode {result['episode']}: {result['target'].name}")
+                    produced.add(result["target"])
+                matched.extend(ok)
+
+            if not downloading and recorded < len(matched):
+                # Keep the subtitle manifest pointing at the renamed files
+                moves = [(m["subtitle"], m["target"]) for m in matched[recorded:]]
+                record_moves(subtitle_dir, moves)
+                recorded = len(matched)
+
+            if downloading:
+                deadline = time.monotonic() + timeout
+            elif (
+                not plan["unmatched_subtitles"]
+                or not waiting
+                or time.monotonic() >= deadline
+                or (settled is not None and settled())
+            ):
+                return matched
+
+            # Re-ask the daemon every few seconds while metadata is pending
+            wait_for = deadline - time.monotonic()
+            if waiting:
+                wait_for = min(wait_for, METADATA_POLL)
+            if downloading:
+                wait_for = min(wait_for, DOWNLOADS_POLL)
+            # Everything that landed since the last pass, minus our own renames
+            landed = [
+                path
+                for path in watcher.batch(wait_for)
+                if path.name.endswith((VIDEO_SUFFIX, SUBTITLE_SUFFIX)) and path not in produced
+            ]
+            new_videos = [path for path in landed if path.name.endswith(VIDEO_SUFFIX)]
+            if new_videos:
+                deadline = time.monotonic() + timeout
+            # A video outside the main folder that no torrent keeps there
+            if any(p.parent != folder_path and p not in known for p in new_videos):
+                flatten = True
+            # Match again on new files, while metadata is pending and once
+            # more when the downloads end
+            rematch = bool(landed) or waiting or (downloading and downloads_done.is_set())
+
+
+def _match_inputs(folder_path: Path) -> list:
+    videos = scan(folder_path, VIDEO_SUFFIX, recursive=True)
+    return [
+        sorted(str(v.relative_to(folder_path)) for v in videos),
+        sorted(load_manifest(folder_path / "subtitles")["files"]),
+    ]
+
+
+def run_match_step(
+    journal: PipelineJournal,
+    folder_name: str,
+    downloads_done: threading.Event | None = None,
+) -> int:
+    """Match subtitles as they land and record the matches in the journal.
+
+    Once the downloads are done, an arc with the same videos and subtitles
+    as when it was last matched is not waited on: whatever is still
+    unmatched stayed unmatched then too.
+
+    Returns the number of matched subtitles.
+    """
+    folder_path = Path(folder_name)
+
+    def previous() -> dict | None:
+        output = journal.completed("match", _match_inputs(folder_path))
+        if output and all(Path(m["target"]).exists() for m in output["matches"]):
+            return output
+        return None
+
+    matches = match_subtitles(
+        folder_name,
+        downloads_done=downloads_done,
+        settled=lambda: previous() is not None,
+    )
+    if not matches and (output := previous()) is not None:
+        print_resumed(f"Matching ({len(output['matches'])} subtitles)")
+        return len(output["matches"])
+
+    # Earlier matches still on disk stay recorded next to this run's
+    by_target = {
+        m["target"]: m
+        for m in (journal.steps.get("match") or {}).get("output", {}).get("matches", [])
+        if Path(m["target"]).exists()
+    }
+    for m in matches:
+        by_target[str(m["target"])] = {"episode": m["episode"], "target": str(m["target"])}
+    journal.record("match", _match_inputs(folder_path), {"matches": list(by_target.values())})
+    return len(matches)
+
+
+def run_download_stages(
+    journal: PipelineJournal,
+    folder_name: str,
+    nyaa_url: str | None,
+    gdrive_url: str | None,
+    zip_password: str | None = None,
+    scheduler=None,
+    refresh: bool = False,
+) -> tuple[int | None, int | None, int | None]:
+    """Run the episode, subtitle and matching stages at the same time.
+
+    Scraping nyaa/adding torrents and listing/downloading/extracting
+    subtitles do not depend on each other, so the pair takes as long as the
+    slower one. Matching runs next to them and renames each subtitle as
+    soon as it and its video's name are known (see match_subtitles), then
+    finishes shortly after the downloads. A stage whose URL is missing is
+    skipped (its count is None; matching needs the Drive URL). `refresh`
+    makes both searches look for new releases (see open_journal). Errors
+    from any stage are raised once all have finished.
+
+    Returns (episode count, subtitle count, matched subtitle count).
+    """
+    parent = telemetry.current()
+    downloads_done = threading.Event()
+
+    def stage(name: str, func, *args) -> int:
+        with telemetry.attach(parent), telemetry.span(name):
+            return func(*args)
+
+    with ThreadPoolExecutor(max_workers=3, thread_name_prefix=folder_name) as pool:
+        episodes = subtitles = matches = None
+        if nyaa_url:
+            episodes = pool.submit(
+                stage,
+                "episodes",
+                run_episodes_step,
+                journal,
+                nyaa_url,
+                folder_name,
+                scheduler,
+                refresh,
+            )
+        if gdrive_url:
+            subtitles = pool.submit(
+                stage,
+                "subtitles",
+                run_subtitles_step,
+                journal,
+                gdrive_url,
+                folder_name,
+                zip_password,
+                scheduler,
+                refresh,
+            )
+            matches = pool.submit(
+                stage, "match", run_match_step, journal, folder_name, downloads_done
+            )
+        try:
+            wait([future for future in (episodes, subtitles) if future])
+        finally:
+            downloads_done.set()
+        return (
+            episodes.result() if episodes else None,
+            subtitles.result() if subtitles else None,
+            matches.result() if matches else None,
+        )
+
+
 def get_parameters() -> tuple[str, str, str]:
     if len(sys.argv) != 4:
         print(__doc__)
@@ -89,50 +492,85 @@ def get_parameters() -> tuple[str, str, str]:
 
 def get_summary(folder_name: str) -> tuple[list[Path], list[Path]]:
     folder_path = Path(folder_name)
-    mkv_files = list(folder_path.glob("*.mkv"))
+    # Videos of multi-file torrents stay in their torrent's folder
+    subtitle_dir = folder_path / "subtitles"
+    mkv_files = [
+        path
+        for path in scan(folder_path, VIDEO_SUFFIX, recursive=True)
+        if subtitle_dir not in path.parents
+    ]
     ass_files = list(folder_path.rglob("*.ass"))
 
     return ass_files, mkv_files
 
 
 def main():
+    profile_path = telemetry.consume_flags(sys.argv)
+    cassette.consume_flags(sys.argv)
+    fresh = "--fresh" in sys.argv
+    if fresh:
+        sys.argv.remove("--fresh")
+    refresh = "--refresh" in sys.argv
+    if refresh:
+        sys.argv.remove("--refresh")
     folder_name, gdrive_url, nyaa_url = get_parameters()
 
+    with telemetry.profile(profile_path), telemetry.span("pipeline", folder=folder_name):
+        run(folder_name, gdrive_url, nyaa_url, fresh=fresh, refresh=refresh)
+
+
+def run(
+    folder_name: str,
+    gdrive_url: str,
+    nyaa_url: str,
+    fresh: bool = False,
+    refresh: bool = False,
+) -> None:
+    journal = open_journal(folder_name, fresh=fresh, refresh=refresh)
+
     print("\n🎬 One Pace Download Pipeline")
     print(f"\nNyaa URL: {nyaa_url}")
     print(f"GDrive URL: {gdrive_url}")
     print(f"Folder: {folder_name}")
 
-    # Step 1: Download episodes
-    print_step(1, "Downloading episodes from nyaa.si")
-    count_episodes = MagnetDownloader(nyaa_url, folder_name).download()
-    if count_episodes > 0:
+    # Episodes from nyaa.si and subtitles from Drive side by side, matched as they land
+    print_step(1, "Downloading episodes and subtitles, matching as they land")
+    count_episodes, count_subtitles, count_matched = run_download_stages(
+        journal, folder_name, nyaa_url, gdrive_url, refresh=refresh
+    )
+    print_separator()
+    if count_episodes:
         print(f"{count_episodes} episodes downloaded!")
-
-    # Step 2: Download subtitles
-    print_step(2, "Downloading subtitles from Google Drive")
-    count_subtitles = SubtitleDownloader(gdrive_url, folder_name).download()
-    if count_subtitles > 0:
+    if count_subtitles:
         print(f"{count_subtitles} subtitles downloaded!")
+    if count_matched:
+        print(f"✓ Matched {count_matched} subtitle(s) to video(s)")
+    elif gdrive_url:
+        print("ℹ Could not match subtitles automatically")
 
     # Step 2.5: Flatten video folders (move videos from subdirectories)
     print_separator()
     print("🔍 Checking for videos in subdirectories...")
     print_separator()
 
-    moved_count = flatten_video_folders(folder_name)
+    with telemetry.span("flatten"):
+        moved_count = flatten_video_folders(folder_name)
+        telemetry.add("files", moved_count)
 
     if moved_count > 0:
         print(f"\n✓ Moved {moved_count} video(s) to main folder")
     else:
         print("\n✓ All videos are already in the main folder")
 
-    # Step 3: Show summary
-    print_step(3, "Download Summary")
-    ass_files, mkv_files = get_summary(folder_name)
+    # Step 2: Show summary
+    print_step(2, "Download Summary")
+    with telemetry.span("summary"):
+        ass_files, mkv_files = get_summary(folder_name)
 
     print(f"✓ Videos downloaded: {len(mkv_files)}")
     print(f"✓ Subtitles downloaded: {len(ass_files)}")
+    with telemetry.span("verify"):
+        print_problems(verify_videos(mkv_files))
 
     print_separator()
     print("✓ PIPELINE COMPLETED SUCCESSFULLY!")
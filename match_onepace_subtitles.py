@@ -1,7 +1,7 @@
 r"""Match and rename One Pace subtitle files to match video filenames.
 
 Usage:
-    python3 match_onepace_subtitles.py <video_dir> <subtitle_dir>
+    python3 match_onepace_subtitles.py <video_dir> <subtitle_dir> [--dry-run]
 
 Example:
     uv run  match_onepace_subtitles.py \
@@ -14,12 +14,23 @@ The script will:
 3. Match them by episode number
 4. Rename subtitles to match video filenames (keeping .ass extension)
 
+With --dry-run the match plan is printed without renaming anything.
+
 """
 
-import re
 import sys
+from functools import lru_cache
 from pathlib import Path
 
+from episode_matcher import EpisodeMatcher, apply_plan, build_plan, guess_arc_name
+
+__all__ = ["extract_episode_number", "guess_arc_name", "main"]
+
+
+@lru_cache(maxsize=32)
+def _matcher(arc_name: str) -> EpisodeMatcher:
+    return EpisodeMatcher(arc_name)
+
 
 def extract_episode_number(filename: str, arc_name: str) -> str | None:
     """Extract episode number from filename.
@@ -29,45 +40,18 @@ def extract_episode_number(filename: str, arc_name: str) -> str | None:
     - "46 - Arc Name 04.ass" -> "04"
     - "[One Pace][123-126] Arc Name 04 [480p][HASH].mkv" -> "04"
     """
-    # Try to extract from "Arc Name XX" pattern
-    pattern = rf"{re.escape(arc_name)}\s+(\d+)"
-    match = re.search(pattern, filename, re.IGNORECASE)
-    if match:
-        return match.group(1)
-
-    # Fallback: just look for any number pattern
-    match = re.search(r"(\d{2})", filename)
-    if match:
-        return match.group(1)
-
-    return None
-
-
-def guess_arc_name(video_files: list[Path]) -> str:
-    """Guess the arc name from video filenames.
-
-    Expects pattern like: [One Pace][XXX-XXX] Arc Name XX [480p][HASH].mkv
-    """
-    if not video_files:
-        return None
-
-    # Try to extract arc name from first video
-    first_video = video_files[0].name
-    # Pattern: [One Pace][XXX-XXX] Arc Name XX [480p]
-    match = re.search(r"\[One Pace\]\[\d+-\d+\]\s+(.+?)\s+\d+\s+\[", first_video)
-    if match:
-        return match.group(1).strip()
-
-    return None
+    return _matcher(arc_name).episode(filename)
 
 
 def main():
-    if len(sys.argv) != 3:
+    args = [a for a in sys.argv[1:] if a != "--dry-run"]
+    dry_run = "--dry-run" in sys.argv[1:]
+    if len(args) != 2:
         print(__doc__)
         sys.exit(1)
 
-    video_dir = Path(sys.argv[1])
-    subtitle_dir = Path(sys.argv[2])
+    video_dir = Path(args[0])
+    subtitle_dir = Path(args[1])
 
     # Validate directories
     if not video_dir.exists():
@@ -78,9 +62,9 @@ def main():
         print(f"Error: Subtitle directory not found: {subtitle_dir}")
         sys.exit(1)
 
-    # Get all video and subtitle files
-    videos = sorted([f for f in video_dir.glob("*.mkv")])
-    subtitles = sorted([f for f in subtitle_dir.glob("*.ass")])
+    # Index videos and subtitles and build the match plan in one pass
+    plan = build_plan(video_dir, subtitle_dir)
+    videos, subtitles = plan["videos"], plan["subtitles"]
 
     if not videos:
         print(f"Error: No .mkv files found in {video_dir}")
@@ -98,58 +82,44 @@ def main():
     for s in subtitles:
         print(f"  - {s.name}")
 
-    # Guess arc name from videos
-    arc_name = guess_arc_name(videos)
-    if arc_name:
-        print(f"\nDetected arc name: '{arc_name}'")
+    if plan["arc_name"]:
+        print(f"\nDetected arc name: '{plan['arc_name']}'")
     else:
         print("\nWarning: Could not detect arc name, using generic matching")
 
-    # Build subtitle map by episode number
-    subtitle_map: dict[str, Path] = {}
-    for sub in subtitles:
-        ep_num = extract_episode_number(sub.name, arc_name or "")
-        if ep_num:
-            subtitle_map[ep_num] = sub
-        else:
-            print(f"Warning: Could not extract episode number from: {sub.name}")
+    for path in plan["unparsed"]:
+        print(f"Warning: Could not extract episode number from: {path.name}")
+    for kind, duplicates in plan["duplicates"].items():
+        for ep_num, paths in duplicates.items():
+            names = ", ".join(p.name for p in paths)
+            print(f"Warning: Episode {ep_num} has {len(paths)} {kind}: {names}")
 
     print("\n" + "=" * 70)
-    print("Matching and renaming subtitles:")
+    print("Matching and renaming subtitles:" + (" (dry run)" if dry_run else ""))
     print("=" * 70)
 
     matched_count = 0
-    for video in videos:
-        ep_num = extract_episode_number(video.name, arc_name or "")
-        if ep_num and ep_num in subtitle_map:
-            old_sub = subtitle_map[ep_num]
-            # Create new subtitle name by replacing .mkv with .ass
-            new_sub_name = video.name.replace(".mkv", ".ass")
-            new_sub_path = video_dir / new_sub_name
-
-            print(f"\nEpisode {ep_num}:")
-            print(f"  Video:    {video.name}")
-            print(f"  Old sub:  {old_sub.name}")
-            print(f"  New sub:  {new_sub_name}")
-            print("Renaming...", end=" ")
-
-            # Rename the file
-            try:
-                old_sub.rename(new_sub_path)
-                print("  ✓ Renamed successfully")
-                matched_count += 1
-            except Exception as e:
-                print(f"  ✗ Error: {e}")
+    for result in apply_plan(plan, dry_run=dry_run):
+        print(f"\nEpisode {result['episode']}:")
+        print(f"  Video:    {result['video'].name}")
+        print(f"  Old sub:  {result['subtitle'].name}")
+        print(f"  New sub:  {result['target'].name}")
+        if dry_run:
+            matched_count += 1
+        elif result["ok"]:
+            print("  ✓ Renamed successfully")
+            matched_count += 1
         else:
-            print(f"\nWarning: No subtitle found for video: {video.name}")
+            print(f"  ✗ Error: {result['error']}")
+
+    for video in plan["unmatched_videos"]:
+        print(f"\nWarning: No subtitle found for video: {video.name}")
 
     print("\n" + "=" * 70)
     if matched_count == len(videos):
         print("✓ All videos matched with subtitles!")
     print(
-        f"Done! Successfully matched {matched_count}/{
-            len(videos)
-        } videos with subtitles"
+        f"Done! Successfully matched {matched_count}/{len(videos)} videos with subtitles"
     )
     print("=" * 70)
 
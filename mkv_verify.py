@@ -0,0 +1,361 @@
+"""Check downloaded Matroska videos for truncation or corruption, fast.
+
+A .mkv starts with an EBML header and a Segment whose size says how long
+the file must be. The Segment's SeekHead points at its Info, Tracks and
+Cues, and the Cues point at clusters spread over the whole video. Checking
+that each of those is where it claims to be reads a few KB per file
+through mmap instead of the whole video, and files are checked in
+parallel, so a full arc verifies in well under a second.
+
+Caught: files cut short (download stopped, disk full), files whose tail is
+still zeros (space preallocated by the torrent client but never written),
+files that are not Matroska at all and, through a spot-check of
+CUE_SAMPLES clusters, most files with unwritten stretches in the middle.
+Damage inside a cluster's frames is not: that needs every byte (see
+torrent_verify.py).
+
+    verify_file("arc15-jaya/Jaya 01.mkv")
+    -> {"path", "ok", "problem", "size", "expected_size", "clusters_checked"}
+
+Usage:
+    uv run mkv_verify.py <folder or .mkv>... [--workers N]
+"""
+
+import mmap
+import os
+import sys
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import telemetry
+from episode_matcher import VIDEO_SUFFIX
+
+EBML_ID = 0x1A45DFA3
+DOCTYPE_ID = 0x4282
+SEGMENT_ID = 0x18538067
+SEEKHEAD_ID = 0x114D9B74
+SEEK_ID = 0x4DBB
+SEEK_ID_ID = 0x53AB
+SEEK_POSITION_ID = 0x53AC
+INFO_ID = 0x1549A966
+TRACKS_ID = 0x1654AE6B
+CUES_ID = 0x1C53BB6B
+CUE_POINT_ID = 0xBB
+CUE_TRACK_POSITIONS_ID = 0xB7
+CUE_CLUSTER_POSITION_ID = 0xF1
+CLUSTER_ID = 0x1F43B675
+VOID_ID = 0xEC
+CRC32_ID = 0xBF
+
+# Elements that may appear directly inside a Segment
+SEGMENT_CHILDREN = {
+    SEEKHEAD_ID: "SeekHead",
+    INFO_ID: "Info",
+    TRACKS_ID: "Tracks",
+    CUES_ID: "Cues",
+    CLUSTER_ID: "Cluster",
+    0x1043A770: "Chapters",
+    0x1941A469: "Attachments",
+    0x1254C367: "Tags",
+    VOID_ID: "Void",
+    CRC32_ID: "CRC-32",
+}
+REQUIRED = (INFO_ID, TRACKS_ID)
+DOCTYPES = ("matroska", "webm")
+
+# Clusters checked per file, spread evenly over the Cues (first and last included)
+CUE_SAMPLES = 8
+
+
+class MatroskaError(ValueError):
+    """Raised when a file is not a complete, well-formed Matroska file."""
+
+
+def _vint(data, pos: int, keep_marker: bool) -> tuple[int | None, int]:
+    """Read an EBML variable-length integer; return (value, next position).
+
+    Sizes (keep_marker False) with every value bit set mean "unknown" (None).
+    """
+    if pos >= len(data):
+        raise MatroskaError(f"truncated at byte {pos}")
+    first = data[pos]
+    if not first:
+        raise MatroskaError(f"zeros where an element should start (byte {pos})")
+    length = 9 - first.bit_length()
+    if pos + length > len(data):
+        raise MatroskaError(f"truncated at byte {pos}")
+    value = int.from_bytes(data[pos : pos + length], "big")
+    if keep_marker:
+        return value, pos + length
+    mask = (1 << (7 * length)) - 1
+    value &= mask
+    return (None if value == mask else value), pos + length
+
+
+def _element(data, pos: int) -> tuple[int, int, int | None]:
+    """Return (ID, data start, data size or None) of the element at pos."""
+    element_id, pos = _vint(data, pos, keep_marker=True)
+    if element_id.bit_length() > 32:
+        raise MatroskaError(f"invalid element ID at byte {pos}")
+    size, pos = _vint(data, pos, keep_marker=False)
+    return element_id, pos, size
+
+
+def _children(data, start: int, end: int):
+    """Yield (ID, data start, size) of each element in [start, end)."""
+    pos = start
+    while pos < end:
+        element_id, data_start, size = _element(data, pos)
+        if size is None or data_start + size > end:
+            raise MatroskaError(f"element at byte {pos} runs past its parent")
+        yield element_id, data_start, size
+        pos = data_start + size
+
+
+def _uint(data, start: int, size: int) -> int:
+    return int.from_bytes(data[start : start + size], "big")
+
+
+def _seek_entries(data, start: int, end: int, segment_start: int) -> dict[int, int]:
+    """Absolute position of every element listed in a SeekHead."""
+    positions = {}
+    for element_id, seek_start, seek_size in _children(data, start, end):
+        if element_id != SEEK_ID:
+            continue
+        target = position = None
+        for child_id, child_start, child_size in _children(
+            data, seek_start, seek_start + seek_size
+        ):
+            if child_id == SEEK_ID_ID:
+                target = _uint(data, child_start, child_size)
+            elif child_id == SEEK_POSITION_ID:
+                position = segment_start + _uint(data, child_start, child_size)
+        if target is not None and position is not None:
+            positions.setdefault(target, position)
+    return positions
+
+
+def _locate(data, segment_start: int, segment_end: int) -> dict[int, int]:
+    """Find the Segment's top-level elements: the ones before the first
+    Cluster by walking them, the rest (Cues, Tags...) through the SeekHead."""
+    found = {}
+    seekheads = []
+    pos = segment_start
+    while pos < segment_end:
+        element_id, data_start, size = _element(data, pos)
+        if element_id not in SEGMENT_CHILDREN:
+            raise MatroskaError(f"unknown element {element_id:#x} at byte {pos}")
+        found.setdefault(element_id, pos)
+        if element_id == SEEKHEAD_ID and size is not None:
+            seekheads.append((data_start, data_start + size))
+        if element_id == CLUSTER_ID or size is None:
+            break
+        pos = data_start + size
+
+    checked_seekheads = set()
+    while seekheads:
+        start, end = seekheads.pop()
+        if start in checked_seekheads or end > segment_end:
+            continue
+        checked_seekheads.add(start)
+        for element_id, position in _seek_entries(data, start, end, segment_start).items():
+            if element_id == SEEKHEAD_ID and position not in found.values():
+                # A second SeekHead (usually at the end) lists what the first left out
+                _expect(data, position, SEEKHEAD_ID, segment_end)
+                _, data_start, size = _element(data, position)
+                seekheads.append((data_start, data_start + size))
+            found.setdefault(element_id, position)
+    return found
+
+
+def _expect(data, pos: int, element_id: int, segment_end: int) -> int | None:
+    """Check that the element at pos is element_id and fits; return its end."""
+    name = SEGMENT_CHILDREN.get(element_id, f"{element_id:#x}")
+    if pos >= segment_end:
+        raise MatroskaError(f"{name} points past the end of the file (byte {pos})")
+    try:
+        found_id, data_start, size = _element(data, pos)
+    except MatroskaError as e:
+        raise MatroskaError(f"{name} missing at byte {pos}: {e}") from e
+    if found_id != element_id:
+        raise MatroskaError(f"{name} missing at byte {pos} (found {found_id:#x})")
+    if size is None:
+        return None
+    if data_start + size > segment_end:
+        raise MatroskaError(f"{name} at byte {pos} is cut off")
+    return data_start + size
+
+
+def _cue_clusters(data, start: int, end: int, segment_start: int) -> list[int]:
+    """Absolute cluster positions referenced by the Cues, in order."""
+    positions = set()
+    for point_id, point_start, point_size in _children(data, start, end):
+        if point_id != CUE_POINT_ID:
+            continue
+        for child_id, child_start, child_size in _children(
+            data, point_start, point_start + point_size
+        ):
+            if child_id != CUE_TRACK_POSITIONS_ID:
+                continue
+            for track_id, track_start, track_size in _children(
+                data, child_start, child_start + child_size
+            ):
+                if track_id == CUE_CLUSTER_POSITION_ID:
+                    positions.add(segment_start + _uint(data, track_start, track_size))
+    return sorted(positions)
+
+
+def _sample(items: list, count: int) -> list:
+    if len(items) <= count:
+        return items
+    step = (len(items) - 1) / (count - 1)
+    return [items[round(i * step)] for i in range(count)]
+
+
+def _check_cluster(data, pos: int, segment_end: int) -> None:
+    end = _expect(data, pos, CLUSTER_ID, segment_end)
+    if end is not None and end < segment_end:
+        # Whatever follows must be another element, not never-written zeros
+        next_id, _, _ = _element(data, end)
+        if next_id not in SEGMENT_CHILDREN:
+            raise MatroskaError(f"damaged data after the cluster at byte {pos}")
+
+
+def _check(data, result: dict) -> None:
+    element_id, start, size = _element(data, 0)
+    if element_id != EBML_ID or size is None:
+        raise MatroskaError("not a Matroska file (no EBML header)")
+    doctype = None
+    for child_id, child_start, child_size in _children(data, start, start + size):
+        if child_id == DOCTYPE_ID:
+            doctype = bytes(data[child_start : child_start + child_size]).rstrip(b"\0")
+    if doctype is None or doctype.decode("ascii", "replace") not in DOCTYPES:
+        raise MatroskaError(f"not a Matroska file (DocType {doctype!r})")
+
+    pos = start + size
+    while True:
+        element_id, segment_start, segment_size = _element(data, pos)
+        if element_id == SEGMENT_ID:
+            break
+        if element_id != VOID_ID or segment_size is None:
+            raise MatroskaError(f"no Segment after the EBML header (byte {pos})")
+        pos = segment_start + segment_size
+
+    # Unknown size: the muxer never went back to write it (live recording)
+    if segment_size is None:
+        segment_end = len(data)
+    else:
+        segment_end = segment_start + segment_size
+        result["expected_size"] = segment_end
+        if len(data) < segment_end:
+            raise MatroskaError(f"truncated: {len(data)} of {segment_end} bytes")
+
+    found = _locate(data, segment_start, segment_end)
+    for element_id in REQUIRED:
+        if element_id not in found:
+            raise MatroskaError(f"no {SEGMENT_CHILDREN[element_id]} element")
+    for element_id, position in found.items():
+        if element_id != CLUSTER_ID:
+            _expect(data, position, element_id, segment_end)
+
+    clusters = []
+    if CUES_ID in found:
+        _, cues_start, cues_size = _element(data, found[CUES_ID])
+        if cues_size is not None:
+            clusters = _cue_clusters(data, cues_start, cues_start + cues_size, segment_start)
+    if not clusters and CLUSTER_ID in found:
+        clusters = [found[CLUSTER_ID]]
+    for position in _sample(clusters, CUE_SAMPLES):
+        _check_cluster(data, position, segment_end)
+        result["clusters_checked"] += 1
+
+
+def verify_file(path: str | Path) -> dict:
+    """Check one video's structure without reading its frames.
+
+    Returns {"path", "ok", "problem", "size", "expected_size",
+    "clusters_checked"}; problem says what is wrong when ok is False.
+    """
+    path = Path(path)
+    result = {
+        "path": path,
+        "ok": False,
+        "problem": None,
+        "size": 0,
+        "expected_size": None,
+        "clusters_checked": 0,
+    }
+    try:
+        with open(path, "rb") as f:
+            result["size"] = os.fstat(f.fileno()).st_size
+            if not result["size"]:
+                raise MatroskaError("empty file")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if hasattr(mmap, "MADV_RANDOM"):
+                    # Only the touched pages, no readahead around each one
+                    data.madvise(mmap.MADV_RANDOM)
+                _check(data, result)
+        result["ok"] = True
+    except MatroskaError as e:
+        result["problem"] = str(e)
+    except OSError as e:
+        result["problem"] = f"unreadable: {e}"
+    return result
+
+
+def verify_videos(paths: Iterable[str | Path], max_workers: int | None = None) -> list[dict]:
+    """verify_file() every path in parallel; results keep the input order."""
+    paths = list(paths)
+    workers = max_workers or min(8, os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(verify_file, paths))
+    telemetry.add("files", len(results))
+    return results
+
+
+def verify_folder(folder: str | Path, max_workers: int | None = None) -> list[dict]:
+    """Check every video directly inside folder."""
+    return verify_videos(sorted(Path(folder).glob(f"*{VIDEO_SUFFIX}")), max_workers)
+
+
+def print_problems(results: list[dict]) -> None:
+    """Print one line per damaged video (nothing when all are fine)."""
+    bad = [r for r in results if not r["ok"]]
+    if not bad:
+        return
+    print(f"⚠ {len(bad)} video(s) look incomplete or damaged:")
+    for result in bad:
+        print(f"   ✗ {result['path'].name}: {result['problem']}")
+    print("   Re-check them in transmission (torrent-verify) or download them again.")
+
+
+def main() -> None:
+    args = sys.argv[1:]
+    workers = None
+    if "--workers" in args:
+        index = args.index("--workers")
+        workers = int(args[index + 1])
+        del args[index : index + 2]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    paths = []
+    for arg in map(Path, args):
+        paths.extend(sorted(arg.glob(f"*{VIDEO_SUFFIX}")) if arg.is_dir() else [arg])
+    if not paths:
+        print(f"Error: No {VIDEO_SUFFIX} files found in {', '.join(args)}")
+        sys.exit(1)
+
+    results = verify_videos(paths, workers)
+    for result in results:
+        if result["ok"]:
+            print(f"✓ {result['path'].name} ({result['clusters_checked']} clusters checked)")
+    print_problems(results)
+    print(f"\n{sum(r['ok'] for r in results)}/{len(results)} video(s) OK")
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
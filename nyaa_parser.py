@@ -0,0 +1,170 @@
+"""Single-pass parser for nyaa.si search result pages.
+
+Uses the stdlib HTML tokenizer instead of backtracking regexes, so parsing is
+linear in page size. Rows are yielded as soon as their closing </tr> is seen:
+
+    {"title", "magnet", "size", "date", "seeders", "leechers", "downloads"}
+
+`search()` also follows nyaa's pagination, fetching the remaining pages
+concurrently through the shared HTTP cache.
+"""
+
+import re
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+import telemetry
+from http_cache import fetch_text
+
+CHUNK_SIZE = 64 * 1024
+
+# Column order of nyaa's torrent-list table after the name/links columns
+_STAT_COLUMNS = {3: "size", 4: "date", 5: "seeders", 6: "leechers", 7: "downloads"}
+_INT_COLUMNS = ("seeders", "leechers", "downloads")
+_VIEW_HREF = re.compile(r"^/view/\d+$")
+
+
+class NyaaPageParser(HTMLParser):
+    """Incremental tokenizer for one nyaa page.
+
+    Completed rows accumulate in `rows` and are drained by `pop_rows()`.
+    Magnet links outside result rows (single torrent view pages) are kept
+    in `loose_magnets`, and page numbers from the pagination bar in `pages`.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.rows: list[dict] = []
+        self.loose_magnets: list[str] = []
+        self.pages: set[int] = set()
+        self._row: dict | None = None
+        self._cell = -1
+        self._text: list[str] = []
+        self._in_pagination = False
+
+    def pop_rows(self) -> list[dict]:
+        rows, self.rows = self.rows, []
+        return rows
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attrs = dict(attrs)
+        if tag == "tr":
+            self._row = {"title": None, "magnet": None}
+            self._cell = -1
+        elif tag == "td" and self._row is not None:
+            self._cell += 1
+            self._text = []
+            if "data-timestamp" in attrs:
+                self._row["timestamp"] = int(attrs["data-timestamp"])
+        elif tag == "ul" and "pagination" in (attrs.get("class") or ""):
+            self._in_pagination = True
+        elif tag == "a":
+            self._handle_link(attrs)
+
+    def _handle_link(self, attrs: dict) -> None:
+        href = attrs.get("href") or ""
+        if self._in_pagination:
+            page = parse_qs(urlsplit(href).query).get("p")
+            if page and page[0].isdigit():
+                self.pages.add(int(page[0]))
+            return
+        if href.startswith("magnet:"):
+            if self._row is not None:
+                self._row["magnet"] = href
+            else:
+                self.loose_magnets.append(href)
+        elif (
+            self._row is not None
+            and _VIEW_HREF.match(href)
+            and "comments" not in (attrs.get("class") or "")
+        ):
+            self._row["title"] = attrs.get("title")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "td" and self._row is not None:
+            column = _STAT_COLUMNS.get(self._cell)
+            if column:
+                value = "".join(self._text).strip()
+                if column in _INT_COLUMNS:
+                    self._row[column] = int(value) if value.isdigit() else 0
+                else:
+                    self._row[column] = value
+        elif tag == "tr" and self._row is not None:
+            if self._row["magnet"]:
+                self.rows.append(self._row)
+            self._row = None
+        elif tag == "ul":
+            self._in_pagination = False
+
+    def handle_data(self, data: str) -> None:
+        if self._row is not None and self._cell >= 0:
+            self._text.append(data)
+
+
+def iter_rows(
+    chunks: Iterable[str], parser: NyaaPageParser | None = None
+) -> Iterator[dict]:
+    """Yield result rows while feeding HTML chunks through one parser."""
+    parser = parser or NyaaPageParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_rows()
+    parser.close()
+    yield from parser.pop_rows()
+
+
+def parse_rows(html: str, parser: NyaaPageParser | None = None) -> Iterator[dict]:
+    """Yield result rows from a complete page."""
+    chunks = (html[i : i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE))
+    return iter_rows(chunks, parser)
+
+
+def page_url(url: str, page: int) -> str:
+    """Return `url` with nyaa's `p` query parameter set to `page`."""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query, keep_blank_values=True)
+    query["p"] = [str(page)]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def search(url: str, max_workers: int = 4, fetch=fetch_text) -> Iterator[dict]:
+    """Yield every row of a nyaa search, following pagination.
+
+    The first page is parsed as it streams in; the following pages listed
+    in its pagination bar are fetched concurrently and yielded in page
+    order. Magnet links
+    from a single torrent view page are yielded as rows with no title.
+    """
+    first = NyaaPageParser()
+    found = False
+    for row in parse_rows(fetch(url), first):
+        found = True
+        yield row
+
+    if not found:
+        for magnet in first.loose_magnets:
+            yield {"title": None, "magnet": magnet}
+        return
+
+    parent_span = telemetry.current()
+
+    def fetch_page(page: int) -> tuple[list[dict], set[int]]:
+        parser = NyaaPageParser()
+        with telemetry.attach(parent_span):
+            html = fetch(page_url(url, page))
+        rows = list(parse_rows(html, parser))
+        return rows, parser.pages
+
+    # The pagination bar only shows a window of pages around the current
+    # one, so keep going while fetched pages reveal higher page numbers.
+    current = int(parse_qs(urlsplit(url).query).get("p", ["1"])[0])
+    last = max(first.pages, default=current)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while last > current:
+            batch = list(range(current + 1, last + 1))
+            for rows, pages in pool.map(fetch_page, batch):
+                last = max(last, *pages) if pages else last
+                yield from rows
+            current = batch[-1]
@@ -0,0 +1,53 @@
+"""One entry point for every One Pace tool.
+
+Usage:
+    uv run onepace.py <command> [args...]
+
+Commands:
+    browse      interactive saga/arc picker that runs the whole pipeline
+    run         full pipeline for one arc (nyaa URL, Drive URL, folder)
+    match       rename subtitles to match the videos of a folder
+    subs        download an arc's subtitles from Google Drive
+    magnets     queue an arc's episodes in transmission-daemon
+    dashboard   live download progress of an arc
+    verify      check an arc's videos for truncated or damaged files
+
+Each command takes the same arguments as its script (e.g. `onepace.py run`
+is `main.py`). Only the chosen command's modules are imported, so starting
+a command never pays for the others (or for requests/pyfzf when they are
+not needed); benchmarks/bench_startup.py keeps this under a time budget.
+"""
+
+import importlib
+import sys
+
+# command -> module whose main() implements it
+COMMANDS = {
+    "browse": "browse",
+    "run": "main",
+    "match": "match_onepace_subtitles",
+    "subs": "download_subtitles",
+    "magnets": "magnet_downloader",
+    "dashboard": "dashboard",
+    "verify": "mkv_verify",
+}
+
+
+def load(command: str):
+    """Import the module implementing command."""
+    return importlib.import_module(COMMANDS[command])
+
+
+def main() -> None:
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__)
+        sys.exit(0 if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help") else 1)
+
+    command = sys.argv[1]
+    # The scripts read sys.argv themselves; show them their usual arguments
+    sys.argv = [f"{sys.argv[0]} {command}", *sys.argv[2:]]
+    load(command).main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Parsers for the onepaceptbr.github.io download pages.
+
+Pure functions over HTML strings: the saga list on the home page, the arcs
+(nyaa/Drive links) and ZIP password on each saga page, and the folder name
+used for an arc.
+"""
+
+import re
+
+SITE_BASE = "https://onepaceptbr.github.io"
+
+
+def parse_sagas(html: str) -> list[dict]:
+    """Extract sagas from main page."""
+    pattern = r'href="(https://onepaceptbr\.github\.io/[^"]+)"[^>]*>.*?<h[23][^>]*>([^<]+)</h[23]>'
+    matches = re.findall(pattern, html, re.DOTALL)
+
+    sagas = []
+    for url, name in matches:
+        name = name.strip()
+        if "saga" in name.lower() or "especiais" in name.lower():
+            sagas.append({"name": name, "url": url})
+
+    return sagas
+
+
+def extract_arc_number(arc_name: str) -> float:
+    """Extract arc number for sorting. Returns 999 if no number found."""
+    match = re.search(r"Arco\s+([\d.]+)", arc_name)
+    if match:
+        return float(match.group(1))
+    return 999.0
+
+
+def extract_password(html: str) -> str | None:
+    """Extract ZIP password from page if available."""
+    match = re.search(r"<strong>Senha[^:]*:</strong>\s*([^<]+)", html, re.IGNORECASE)
+    if match:
+        return match.group(1).strip()
+    return None
+
+
+def parse_arcs(html: str) -> list[dict]:
+    """Extract arcs from saga page. Handles two formats: popup and direct link."""
+    arcs = []
+
+    # Format 1: Popup with both nyaa and gdrive links
+    popup_pattern = r'onclick="abrirPopup\(this,\s*\'([^\']+)\',\s*\'([^\']+)\'\)".*?<h3>([^<]+)</h3>'
+    popup_matches = re.findall(popup_pattern, html, re.DOTALL)
+    for nyaa_url, gdrive_url, name in popup_matches:
+        arcs.append(
+            {
+                "name": name.strip(),
+                "nyaa_url": nyaa_url.strip(),
+                "gdrive_url": gdrive_url.strip(),
+            }
+        )
+
+    # Format 2: Direct link (nyaa or gdrive, no popup)
+    direct_pattern = r'<a\s+href="([^"]+)"\s+class="arc"[^>]*>.*?<h3>([^<]+)</h3>'
+    direct_matches = re.findall(direct_pattern, html, re.DOTALL)
+    for url, name in direct_matches:
+        # Classify the URL
+        if "nyaa.si" in url:
+            arcs.append(
+                {
+                    "name": name.strip(),
+                    "nyaa_url": url.strip(),
+                    "gdrive_url": None,
+                }
+            )
+        elif "drive.google.com" in url:
+            arcs.append(
+                {
+                    "name": name.strip(),
+                    "nyaa_url": None,
+                    "gdrive_url": url.strip(),
+                }
+            )
+
+    # Filter out arcs without any link
+    arcs = [arc for arc in arcs if arc["nyaa_url"] or arc["gdrive_url"]]
+
+    # Sort arcs by number
+    arcs.sort(key=lambda arc: extract_arc_number(arc["name"]))
+
+    return arcs
+
+
+def generate_folder_name(arc_name: str) -> str:
+    """Convert arc name to folder name: 'Arco 8 - Reverse Mountain' → 'arc08-reverse-mountain'."""
+    match = re.match(r"Arco\s+([\d.]+)\s*-\s*(.+)", arc_name.strip())
+    if not match:
+        # Fallback for names without standard pattern
+        slug = arc_name.lower().replace(" ", "-")
+        slug = re.sub(r"[^a-z0-9-]", "", slug)
+        slug = re.sub(r"-+", "-", slug).strip("-")
+        return slug
+
+    num_str, name = match.group(1), match.group(2).strip()
+
+    # Zero-pad only integers < 10
+    if "." not in num_str and int(num_str) < 10:
+        num_padded = num_str.zfill(2)
+    else:
+        num_padded = num_str
+
+    # Normalize name: lowercase, spaces→hyphens, remove special chars
+    name = name.lower().replace(" ", "-").replace("'", "")
+    name = re.sub(r"[^a-z0-9-]", "", name)
+    name = re.sub(r"-+", "-", name).strip("-")
+
+    return f"arc{num_padded}-{name}"
@@ -0,0 +1,151 @@
+"""Per-host rate limits and retries shared by every HTTP request.
+
+Each host gets a token bucket (requests per second plus a burst), shared by
+all threads of the process. `run(url, send)` waits for a token, calls
+`send()`, and when it raises RetryableError (HTTP 429/5xx, a Drive quota
+page, a timeout) tries again after an exponential backoff with full jitter,
+or after the server's Retry-After. The backoff is charged to the host's
+bucket, so every thread talking to a throttled host slows down together
+instead of each one hammering it until it fails.
+
+Settings (environment variables):
+    ONEPACE_RATE_LIMITS   - per-host requests/second, e.g.
+                            "nyaa.si=1,drive.google.com=3" (burst is twice that)
+
+Usage:
+    body = rate_limit.run(url, lambda: fetch_once(url))
+"""
+
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from urllib.parse import urlsplit
+
+import cassette
+import telemetry
+
+# Requests per second per host; other hosts get DEFAULT_RATE
+RATES = {
+    "nyaa.si": 2.0,
+    "drive.google.com": 5.0,
+    "drive.usercontent.google.com": 5.0,
+}
+DEFAULT_RATE = 10.0
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+
+class RetryableError(Exception):
+    """A request failed in a way worth retrying later."""
+
+    def __init__(self, message: str, retry_after: str | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a request may go."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available; return the wait."""
+        with self._lock:
+            self._refill()
+            # Reserve the token now; a negative balance queues later callers
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, seconds: float) -> None:
+        """Hold back every caller for about `seconds` (the host is throttling)."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+
+def _configured_rates() -> dict[str, float]:
+    rates = dict(RATES)
+    for item in os.environ.get("ONEPACE_RATE_LIMITS", "").split(","):
+        host, _, rate = item.partition("=")
+        try:
+            rates[host.strip().lower()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+_rates = _configured_rates()
+_buckets: dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket(host: str) -> TokenBucket:
+    """The shared bucket for host."""
+    host = host.lower()
+    with _buckets_lock:
+        if host not in _buckets:
+            rate = _rates.get(host, DEFAULT_RATE)
+            _buckets[host] = TokenBucket(rate, burst=max(1.0, 2 * rate))
+        return _buckets[host]
+
+
+def retry_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Seconds to wait before retry number `attempt` (0-based).
+
+    Honors a Retry-After header (seconds or HTTP date); otherwise full
+    jitter over an exponentially growing, capped window.
+    """
+    if retry_after:
+        try:
+            return min(BACKOFF_CAP, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+        from email.utils import parsedate_to_datetime
+
+        try:
+            target = parsedate_to_datetime(retry_after).timestamp()
+            return min(BACKOFF_CAP, max(0.0, target - time.time()))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+def run(url: str, send: Callable, attempts: int = MAX_ATTEMPTS):
+    """Call send() under url's host rate limit, retrying RetryableError.
+
+    Returns whatever send() returns; the last RetryableError is raised once
+    `attempts` calls have failed.
+    """
+    limiter = bucket(urlsplit(url).hostname or "")
+    # A replayed run has no server to protect; its timing comes from the cassette
+    throttle = not cassette.replaying()
+    for attempt in range(attempts):
+        if throttle:
+            limiter.acquire()
+        try:
+            return send()
+        except RetryableError as e:
+            if attempt == attempts - 1:
+                raise
+            delay = retry_delay(attempt, e.retry_after)
+            telemetry.add("retries")
+            if throttle:
+                limiter.penalize(delay)
+    raise AssertionError("unreachable")
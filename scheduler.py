@@ -0,0 +1,80 @@
+"""Concurrency limits for running several arc pipelines at once.
+
+Each pipeline runs in its own thread, but the expensive stages share
+per-stage slots so a whole saga can be queued without flooding any one
+service:
+
+    scrape   - nyaa/onepaceptbr page fetches
+    torrent  - adding magnets to transmission-daemon
+    drive    - Google Drive subtitle downloads (each already uses a small
+               worker pool, so this stays low to avoid Drive throttling)
+
+Limits can be overridden with ONEPACE_SCRAPE_JOBS, ONEPACE_TORRENT_JOBS,
+ONEPACE_DRIVE_JOBS and ONEPACE_PIPELINE_JOBS.
+"""
+
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+import telemetry
+
+DEFAULT_LIMITS = {
+    "scrape": 4,
+    "torrent": 1,
+    "drive": 1,
+}
+DEFAULT_PIPELINES = 4
+
+
+class PipelineScheduler:
+    """Runs pipeline jobs concurrently with per-stage concurrency limits."""
+
+    def __init__(
+        self, limits: dict[str, int] | None = None, max_pipelines: int | None = None
+    ) -> None:
+        self.limits = {
+            stage: int(os.environ.get(f"ONEPACE_{stage.upper()}_JOBS", default))
+            for stage, default in DEFAULT_LIMITS.items()
+        }
+        self.limits.update(limits or {})
+        self.max_pipelines = max_pipelines or int(
+            os.environ.get("ONEPACE_PIPELINE_JOBS", DEFAULT_PIPELINES)
+        )
+        self._slots = {
+            stage: threading.BoundedSemaphore(max(1, limit))
+            for stage, limit in self.limits.items()
+        }
+
+    def slot(self, stage: str) -> threading.BoundedSemaphore:
+        """Context manager holding one slot of `stage` for its duration."""
+        return self._slots[stage]
+
+    def run(self, jobs: list[tuple[str, Callable[[], object]]]) -> list[dict]:
+        """Run (name, callable) jobs concurrently.
+
+        A failing job does not stop the others. Returns one result per job,
+        in input order: {"name", "ok", "result", "error"}.
+        """
+
+        def run_job(job: tuple[str, Callable[[], object]]) -> dict:
+            name, func = job
+            try:
+                with telemetry.profiled():
+                    result = func()
+                return {"name": name, "ok": True, "result": result, "error": None}
+            except Exception as e:
+                return {"name": name, "ok": False, "result": None, "error": e}
+
+        workers = max(1, min(self.max_pipelines, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(run_job, jobs))
+
+
+def stage_slot(scheduler: PipelineScheduler | None, stage: str):
+    """Return the scheduler's slot for `stage`, or a no-op outside batch mode."""
+    if scheduler is None:
+        return nullcontext()
+    return scheduler.slot(stage)
@@ -0,0 +1,152 @@
+"""Per-folder manifest of downloaded subtitles.
+
+Each subtitles folder keeps a `.manifest.json` describing what was fetched:
+
+    {
+      "source": "https://drive.google.com/drive/folders/...",
+      "complete": true,
+      "files": {
+        "Jaya 01.ass": {"id": "1AbC...", "size": 48211,
+                        "modified": 1700000000.0, "sha256": "9f86...",
+                        "mtime_ns": 1700000000123456789}
+      }
+    }
+
+`id` is the Drive file ID (None for files fetched by the gdown fallbacks),
+`moved_to` (only once matched) where the subtitle was renamed to, relative
+to the subtitles folder, `extracted` (only ZIPs) that the archive was
+unpacked and deleted, so it is neither verified nor fetched again,
+`modified` the Drive Last-Modified time when known (or the folder
+listing's date, if that is later), and `mtime_ns` the local modification
+time when the entry was recorded. `complete` is only
+true when the last run fetched every listed file. Re-runs of a complete
+folder verify files against it locally without touching the network;
+otherwise only missing or changed files go back to Drive: those whose
+listing is dated after `modified`, or whose local copy no longer verifies.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def load_manifest(folder: Path) -> dict:
+    """Return the folder's manifest, or an empty one if missing or unreadable."""
+    try:
+        manifest = json.loads((Path(folder) / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {"source": None, "complete": False, "files": {}}
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def save_manifest(folder: Path, manifest: dict) -> None:
+    """Write the manifest atomically."""
+    path = Path(folder) / MANIFEST_NAME
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+    os.replace(tmp, path)
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_http_date(value: str | None) -> float | None:
+    """Convert a Last-Modified header to a timestamp (None if absent/invalid)."""
+    if not value:
+        return None
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def make_entry(
+    path: Path,
+    file_id: str | None,
+    modified: float | None = None,
+    sha256: str | None = None,
+) -> dict:
+    """Describe a file that was just written to path."""
+    stat = path.stat()
+    return {
+        "id": file_id,
+        "size": stat.st_size,
+        "modified": modified,
+        "sha256": sha256 or sha256_file(path),
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+def verify_entry(path: Path, entry: dict) -> bool:
+    """Check a local file against its manifest entry.
+
+    A size mismatch fails immediately; an unchanged mtime is trusted;
+    otherwise the SHA-256 is recomputed and compared.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return False
+    if stat.st_size != entry.get("size"):
+        return False
+    if stat.st_mtime_ns == entry.get("mtime_ns"):
+        return True
+    return sha256_file(path) == entry.get("sha256")
+
+
+def entry_path(folder: Path, name: str, entry: dict) -> Path:
+    """Where a recorded subtitle currently lives (it moves once matched)."""
+    return Path(folder) / entry.get("moved_to", name)
+
+
+def verify_folder(folder: Path, manifest: dict) -> list[str]:
+    """Return the manifest's file names that are missing or changed locally."""
+    return [
+        name
+        for name, entry in manifest["files"].items()
+        if not entry.get("extracted")
+        and not verify_entry(entry_path(folder, name, entry), entry)
+    ]
+
+
+def is_intact(folder: Path) -> bool:
+    """True if the last download was complete and every file still verifies."""
+    manifest = load_manifest(folder)
+    return bool(manifest.get("complete")) and not verify_folder(folder, manifest)
+
+
+def record_moves(folder: Path, moves: list[tuple[Path, Path]]) -> None:
+    """Note that subtitles were renamed (src -> target) by the matcher."""
+    manifest = load_manifest(folder)
+    changed = False
+    for src, target in moves:
+        entry = manifest["files"].get(Path(src).name)
+        if entry is not None:
+            entry["moved_to"] = os.path.relpath(target, folder)
+            changed = True
+    if changed:
+        save_manifest(folder, manifest)
+
+
+def mark_extracted(folder: Path, names: list[str]) -> None:
+    """Note that these ZIPs were unpacked and deleted."""
+    manifest = load_manifest(folder)
+    changed = False
+    for name in names:
+        entry = manifest["files"].get(name)
+        if entry is not None:
+            entry["extracted"] = True
+            changed = True
+    if changed:
+        save_manifest(folder, manifest)
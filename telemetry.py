@@ -0,0 +1,220 @@
+"""Per-step timing spans and profiling for the pipeline.
+
+Wrap each step in `span()`; counters added inside it (bytes, files,
+subprocesses, ...) roll up into the enclosing span. When a trace file is
+configured every finished span is appended to it as one JSON line:
+
+    {"run": "5f0c...", "span": "subtitles", "parent": "pipeline",
+     "start": 1700000000.1, "duration": 3.52, "thread": "MainThread",
+     "folder": "arc15-jaya", "counters": {"bytes": 48211, "files": 12}}
+
+Command-line switches (understood by main.py and browse.py):
+    --trace FILE        append spans to FILE (or set ONEPACE_TRACE=FILE)
+    --profile[=FILE]    run under cProfile and save stats (default onepace.prof)
+
+The profile covers worker threads that join the pipeline through attach()
+or the batch scheduler, so per-function times add up across threads and
+can exceed the wall-clock time of the run.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_counter_lock = threading.Lock()
+_trace_path: Path | None = (
+    Path(os.environ["ONEPACE_TRACE"]) if os.environ.get("ONEPACE_TRACE") else None
+)
+RUN_ID = os.urandom(6).hex()
+_profiling = False
+_thread_profiles: list = []
+
+
+def configure(trace_path: str | Path | None) -> None:
+    """Set (or clear) the JSON lines file spans are written to."""
+    global _trace_path
+    _trace_path = Path(trace_path) if trace_path else None
+
+
+def _stack() -> list[dict]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def add(counter: str, amount: int = 1) -> None:
+    """Increment a counter on the innermost open span of this thread."""
+    stack = _stack()
+    if stack:
+        with _counter_lock:
+            counters = stack[-1]["counters"]
+            counters[counter] = counters.get(counter, 0) + amount
+
+
+def current() -> dict | None:
+    """Return the innermost open span of this thread, if any."""
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def attach(record: dict | None):
+    """Make a span opened in another thread current in this one.
+
+    Used by worker pools so their counters land in the caller's span (and
+    their calls in the profile, see profiled()).
+    """
+    stack = _stack()
+    if record is not None:
+        stack.append(record)
+    try:
+        with profiled():
+            yield
+    finally:
+        if record is not None:
+            stack.pop()
+
+
+def annotate(**attrs) -> None:
+    """Attach attributes to the innermost open span of this thread."""
+    stack = _stack()
+    if stack:
+        stack[-1]["attrs"].update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a pipeline step; nested spans record their parent's name."""
+    stack = _stack()
+    record = {
+        "name": name,
+        "parent": stack[-1]["name"] if stack else None,
+        "start": time.time(),
+        "attrs": dict(attrs),
+        "counters": {},
+    }
+    stack.append(record)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield record
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        stack.pop()
+        if stack:
+            with _counter_lock:
+                parent = stack[-1]["counters"]
+                for key, value in record["counters"].items():
+                    parent[key] = parent.get(key, 0) + value
+        _write(record, duration, error)
+
+
+def _write(record: dict, duration: float, error: str | None) -> None:
+    if _trace_path is None:
+        return
+    line = {
+        "run": RUN_ID,
+        "span": record["name"],
+        "parent": record["parent"],
+        "start": round(record["start"], 3),
+        "duration": round(duration, 6),
+        "thread": threading.current_thread().name,
+        **record["attrs"],
+        "counters": record["counters"],
+    }
+    if error:
+        line["error"] = error
+    with _write_lock:
+        with open(_trace_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+@contextmanager
+def profiled():
+    """Profile this thread's share of the work while profile() is active.
+
+    A cProfile profiler may only follow the thread that enabled it, so
+    worker threads run their jobs under their own and profile() merges
+    them. Where one profiler already sees every thread, enabling a second
+    fails and the block simply runs.
+    """
+    if not _profiling or getattr(_local, "profiler", None) is not None:
+        yield
+        return
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        yield
+        return
+    _local.profiler = profiler
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _local.profiler = None
+        with _counter_lock:
+            _thread_profiles.append(profiler)
+
+
+@contextmanager
+def profile(path: str | Path | None):
+    """Run the block under cProfile and save stats to path (no-op if None)."""
+    global _profiling
+    if path is None:
+        yield
+        return
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    _local.profiler = profiler
+    _profiling = True
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _profiling = False
+        _local.profiler = None
+        stats = pstats.Stats(profiler)
+        with _counter_lock:
+            for thread_profile in _thread_profiles:
+                stats.add(thread_profile)
+            _thread_profiles.clear()
+        stats.dump_stats(str(path))
+        print(f"\n⏱ Profile saved to {path} (top functions by cumulative time):")
+        stats.sort_stats("cumulative").print_stats(15)
+
+
+def consume_flags(argv: list[str]) -> str | None:
+    """Strip --trace/--profile from argv (in place) and apply them.
+
+    Returns the profile output path, or None when profiling is off.
+    """
+    profile_path = None
+    remaining = [argv[0]] if argv else []
+    args = iter(argv[1:])
+    for arg in args:
+        if arg == "--trace":
+            configure(next(args, None))
+        elif arg.startswith("--trace="):
+            configure(arg.split("=", 1)[1])
+        elif arg == "--profile":
+            profile_path = "onepace.prof"
+        elif arg.startswith("--profile="):
+            profile_path = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+    argv[:] = remaining
+    return profile_path
@@ -0,0 +1,90 @@
+"""A stand-in for Google Drive, served by http.server for the tests.
+
+Importing it starts the server and points ONEPACE_DRIVE_BASE at it (with a
+throwaway ONEPACE_CACHE_DIR), so it must be imported before drive_folder.
+Tests fill PAGES (folder ID -> embeddedfolderview HTML) and FILES (file
+ID -> (body, Last-Modified header)); every request's ID is appended to
+REQUESTS.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PAGES: dict[str, bytes] = {}
+FILES: dict[str, tuple[bytes, str | None]] = {}
+REQUESTS: list[str] = []
+
+
+def entry(entry_id: str, name: str, folder: bool = False, modified: str = "Dec 20, 2025") -> str:
+    """One file or subfolder, marked up like Drive's folder view."""
+    if folder:
+        href = f"https://drive.google.com/drive/folders/{entry_id}"
+        mime = "application/vnd.google-apps.folder"
+    else:
+        href = f"https://drive.google.com/file/d/{entry_id}/view?usp=drive_web"
+        mime = "application/octet-stream"
+    return (
+        f'<div class="flip-entry" id="entry-{entry_id}"><div class="flip-entry-info">'
+        f'<a href="{href}"><div class="flip-entry-thumb"><div class="flip-entry-list-icon">'
+        f'<img src="https://drive-thirdparty.googleusercontent.com/16/type/{mime}"></div></div>'
+        f'<div class="flip-entry-title">{name}</div></a></div>'
+        '<div class="flip-entry-list-details"><div class="flip-entry-last-modified">'
+        f"<div>{modified}</div></div></div></div>"
+    )
+
+
+def forget_listings() -> None:
+    """Drop cached folder listings, as if they had expired."""
+    shutil.rmtree(Path(_cache_dir) / "http", ignore_errors=True)
+
+
+def page(*entries: str) -> bytes:
+    body = "\n".join(entries)
+    return f'<html><body><div class="flip-entries">\n{body}\n</div></body></html>'.encode()
+
+
+class DriveHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        item = parse_qs(url.query).get("id", [""])[0]
+        REQUESTS.append(item)
+        modified = None
+        if url.path == "/embeddedfolderview":
+            body, content_type = PAGES.get(item), "text/html; charset=utf-8"
+        elif url.path == "/uc" and item in FILES:
+            (body, modified), content_type = FILES[item], "application/octet-stream"
+        else:
+            body = None
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if modified:
+            self.send_header("Last-Modified", modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), DriveHandler)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+_cache_dir = tempfile.mkdtemp(prefix="onepace-test-cache-")
+atexit.register(shutil.rmtree, _cache_dir, ignore_errors=True)
+# Both are read when the modules are first used
+os.environ["ONEPACE_DRIVE_BASE"] = f"http://127.0.0.1:{server.server_address[1]}"
+os.environ["ONEPACE_CACHE_DIR"] = _cache_dir
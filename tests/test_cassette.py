@@ -0,0 +1,81 @@
+"""Recording failures and replaying them as the same kind of error."""
+
+import socket
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cassette  # noqa: E402
+from http_cache import FetchError, HTTPCache  # noqa: E402
+
+
+class SessionExpired(ConnectionError):
+    """An error class replay cannot import, based on a builtin one."""
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ReplayErrorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cassette = Path(self.tmp.name) / "cassette"
+        self.cache = HTTPCache(Path(self.tmp.name) / "cache", timeout=5)
+
+    def tearDown(self) -> None:
+        cassette.configure()
+        self.tmp.cleanup()
+
+    def test_refused_connection_replays_as_fetch_error(self) -> None:
+        url = f"http://127.0.0.1:{_closed_port()}/page"
+        cassette.configure(record=self.cassette)
+        with self.assertRaises(FetchError):
+            self.cache.fetch(url)
+
+        cassette.configure(replay=self.cassette)
+        with self.assertRaises(FetchError) as caught:
+            self.cache.fetch(url)
+        self.assertIn("Connection refused", str(caught.exception))
+
+    def test_unknown_error_replays_as_nearest_builtin_base(self) -> None:
+        def fail():
+            raise SessionExpired("session expired")
+
+        cassette.configure(record=self.cassette)
+        with self.assertRaises(SessionExpired):
+            cassette.exchange("rpc", {"method": "session-get"}, fail)
+
+        cassette.configure(replay=self.cassette)
+        with self.assertRaises(ConnectionError) as caught:
+            cassette.exchange("rpc", {"method": "session-get"}, fail)
+        self.assertIs(type(caught.exception), ConnectionError)
+        self.assertEqual(str(caught.exception), "session expired")
+
+    def test_error_without_known_class_falls_back_to_first_error_type(self) -> None:
+        class DaemonError(Exception):
+            pass
+
+        def fail():
+            raise DaemonError("rejected")
+
+        cassette.configure(record=self.cassette)
+        with self.assertRaises(DaemonError):
+            cassette.exchange("rpc", {"method": "torrent-add"}, fail, errors=(DaemonError,))
+
+        # A different class of the same name, as in a fresh process
+        class Replayed(Exception):
+            pass
+
+        cassette.configure(replay=self.cassette)
+        with self.assertRaises(Replayed):
+            cassette.exchange("rpc", {"method": "torrent-add"}, fail, errors=(Replayed,))
+
+
+if __name__ == "__main__":
+    unittest.main()
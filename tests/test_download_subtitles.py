@@ -0,0 +1,106 @@
+"""SubtitleDownloader re-runs against a stand-in Drive (see drive_stub.py)."""
+
+import contextlib
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import drive_stub  # noqa: E402  (must come before drive_folder)
+from drive_stub import entry, page  # noqa: E402
+
+from download_subtitles import SubtitleDownloader  # noqa: E402
+from subtitle_manifest import load_manifest  # noqa: E402
+
+FOLDER_ID = "subtitles-folder"
+FOLDER_URL = f"https://drive.google.com/drive/folders/{FOLDER_ID}"
+FIRST_RELEASE = "Sat, 20 Dec 2025 10:00:00 GMT"
+
+
+class DriveTestCase(unittest.TestCase):
+    """An arc folder that has been downloaded once from jaya-01..03."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.arc = Path(self.tmp.name) / "arc15-jaya"
+        self.subtitles = self.arc / "subtitles"
+        drive_stub.FILES.clear()
+        drive_stub.FILES.update(
+            {
+                "jaya-01": (b"Dialogue: first cut", FIRST_RELEASE),
+                "jaya-02": (b"Dialogue: episode 2", FIRST_RELEASE),
+            }
+        )
+        self.listing(
+            entry("jaya-01", "Jaya 01.ass"),
+            entry("jaya-02", "Jaya 02.ass"),
+            entry("jaya-03", "Jaya 03.ass"),
+        )
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def listing(self, *entries: str) -> None:
+        drive_stub.PAGES[FOLDER_ID] = page(*entries)
+        drive_stub.forget_listings()
+
+    def download(self, **options) -> list[str]:
+        """Run the downloader quietly; return the file IDs it fetched."""
+        drive_stub.REQUESTS.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            SubtitleDownloader(FOLDER_URL, str(self.arc)).download(**options)
+        return sorted(item for item in drive_stub.REQUESTS if item != FOLDER_ID)
+
+
+class RerunTest(DriveTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        # jaya-03 is listed but not downloadable: the folder stays incomplete
+        self.download()
+
+    def test_unchanged_files_are_verified_locally(self) -> None:
+        self.assertEqual(self.download(), ["jaya-03"])
+        self.assertFalse(load_manifest(self.subtitles)["complete"])
+
+    def test_file_replaced_on_drive_is_fetched_again(self) -> None:
+        drive_stub.FILES["jaya-01"] = (b"Dialogue: fixed timing", "Sun, 28 Dec 2025 09:00:00 GMT")
+        self.listing(
+            entry("jaya-01", "Jaya 01.ass", modified="Dec 28, 2025"),
+            entry("jaya-02", "Jaya 02.ass"),
+            entry("jaya-03", "Jaya 03.ass"),
+        )
+
+        self.assertEqual(self.download(), ["jaya-01", "jaya-03"])
+        self.assertEqual((self.subtitles / "Jaya 01.ass").read_bytes(), b"Dialogue: fixed timing")
+        # Recorded with the new date, so the next run leaves it alone
+        self.assertEqual(self.download(), ["jaya-03"])
+
+
+class RefreshTest(DriveTestCase):
+    """A folder whose every file was fetched, so re-runs skip Drive."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        drive_stub.FILES["jaya-03"] = (b"Dialogue: episode 3", FIRST_RELEASE)
+        self.download()
+        self.assertTrue(load_manifest(self.subtitles)["complete"])
+        # A release added since, while the last listing is still cached
+        drive_stub.FILES["jaya-04"] = (b"Dialogue: episode 4", FIRST_RELEASE)
+        drive_stub.PAGES[FOLDER_ID] += page(entry("jaya-04", "Jaya 04.ass"))
+
+    def test_complete_folder_is_not_listed(self) -> None:
+        self.download()
+        self.assertEqual(drive_stub.REQUESTS, [])
+
+    def test_refresh_lists_again_and_fetches_only_new_files(self) -> None:
+        self.assertEqual(self.download(refresh=True), ["jaya-04"])
+        self.assertIn(FOLDER_ID, drive_stub.REQUESTS)
+        self.assertEqual((self.subtitles / "Jaya 04.ass").read_bytes(), b"Dialogue: episode 4")
+        self.assertTrue(load_manifest(self.subtitles)["complete"])
+
+
+if __name__ == "__main__":
+    unittest.main()
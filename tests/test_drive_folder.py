@@ -0,0 +1,90 @@
+"""crawl() against recorded Drive listings served by a local http.server."""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import drive_stub  # noqa: E402  (must come before drive_folder)
+from drive_stub import entry, page  # noqa: E402
+
+import drive_folder  # noqa: E402
+
+FIXTURE = Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures" / "gdrive_folder.html"
+ROOT_ID = "root-folder"
+# The fixture's only subfolder
+EXTRAS_ID = "1hkWKFLf6xuI5aHUQPFeNBTxaQWk8JzFa"
+
+PAGES = {
+    ROOT_ID: FIXTURE.read_bytes(),
+    EXTRAS_ID: page(
+        # Same name as a file in the root folder
+        entry("extras-jaya-01", "Jaya 01.ass"),
+        entry("nested", "v2", folder=True),
+        entry("broken", "Broken", folder=True),
+        # A shortcut back to the root must not be listed again
+        entry(ROOT_ID, "Back to root", folder=True),
+    ),
+    "nested": page(entry("nested-jaya-13", "Jaya 13.ass")),
+}
+
+
+class CrawlTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # One crawl for all tests: listings are cached after the first one
+        drive_stub.PAGES.update(PAGES)
+        drive_stub.REQUESTS.clear()
+        cls.entries: list[dict] = []
+        cls.error = None
+        try:
+            for item in drive_folder.crawl(ROOT_ID, max_workers=2):
+                cls.entries.append(item)
+        except drive_folder.FetchError as e:
+            cls.error = e
+        cls.requests = list(drive_stub.REQUESTS)
+
+    def test_yields_every_file_with_its_path(self) -> None:
+        paths = sorted(item["path"] for item in self.entries)
+        expected = [f"Jaya {n:02}.ass" for n in range(1, 13)]
+        expected += [
+            "Extras/Jaya 01.ass",
+            "Extras/v2/Jaya 13.ass",
+            "[One Pace] Jaya Legendas.zip",
+        ]
+        self.assertEqual(paths, sorted(expected))
+
+    def test_same_name_in_subfolder_is_a_separate_file(self) -> None:
+        jaya_01 = {e["path"]: e["id"] for e in self.entries if e["name"] == "Jaya 01.ass"}
+        self.assertEqual(
+            jaya_01,
+            {
+                "Jaya 01.ass": "1PtYgjmUhBel31iEl2hpChYgCfrL1spNx",
+                "Extras/Jaya 01.ass": "extras-jaya-01",
+            },
+        )
+
+    def test_files_carry_fixture_metadata(self) -> None:
+        zip_entry = next(e for e in self.entries if e["name"].endswith(".zip"))
+        self.assertEqual(zip_entry["mime"], "application/octet-stream")
+        self.assertIsNone(zip_entry["size"])
+        self.assertIsNotNone(zip_entry["modified"])
+
+    def test_failing_subfolder_is_reported_after_the_rest(self) -> None:
+        self.assertIsNotNone(self.error)
+        self.assertIn("Extras/Broken", str(self.error))
+        self.assertIn("Extras/v2/Jaya 13.ass", [e["path"] for e in self.entries])
+
+    def test_each_folder_is_listed_once(self) -> None:
+        self.assertEqual(
+            sorted(self.requests), sorted([ROOT_ID, EXTRAS_ID, "nested", "broken"])
+        )
+
+    def test_unreachable_root_raises(self) -> None:
+        with self.assertRaises(drive_folder.FetchError):
+            list(drive_folder.crawl("missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
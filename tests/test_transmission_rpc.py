@@ -0,0 +1,150 @@
+"""TransmissionClient against a stand-in daemon built on http.server."""
+
+import json
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from transmission_rpc import SESSION_HEADER, TransmissionClient, TransmissionError  # noqa: E402
+
+
+class FakeDaemon(ThreadingHTTPServer):
+    """Answers every RPC with its method name, enforcing the session id.
+
+    close_after: drop the connection after this many requests on it
+        (without announcing it), like a daemon timing out keep-alives.
+    rotate_after: hand out a new session id after this many requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), RpcHandler)
+        self.session_id = "first"
+        self.close_after: int | None = None
+        self.rotate_after: int | None = None
+        self.methods: list[str] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+
+
+class RpcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeDaemon
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def setup(self) -> None:
+        super().setup()
+        self.handled = 0
+        with self.server.lock:
+            self.server.connections += 1
+
+    def reply(self, status: int, body: bytes, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        self.handled += 1
+        with server.lock:
+            if self.headers.get(SESSION_HEADER) != server.session_id:
+                self.reply(409, b"", {SESSION_HEADER: server.session_id})
+                return
+            server.methods.append(request["method"])
+            if server.rotate_after is not None and len(server.methods) == server.rotate_after:
+                server.session_id = "rotated"
+        if request["method"] == "fail":
+            reply = {"result": "no such method"}
+        else:
+            reply = {"result": "success", "arguments": {"method": request["method"]}}
+        self.reply(200, json.dumps(reply).encode("utf-8"))
+        if server.close_after is not None and self.handled >= server.close_after:
+            self.close_connection = True
+
+
+class TransmissionClientTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.daemon = FakeDaemon()
+        threading.Thread(target=self.daemon.serve_forever, daemon=True).start()
+        host, port = self.daemon.server_address[:2]
+        self.client = TransmissionClient(host=host, port=port, timeout=5)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        if self.daemon.socket.fileno() != -1:
+            self.daemon.shutdown()
+            self.daemon.server_close()
+
+    def test_call_picks_up_session_id(self) -> None:
+        self.assertEqual(self.client.call("session-get"), {"method": "session-get"})
+        self.assertEqual(self.client.session_id, "first")
+
+    def test_call_follows_rotated_session_id(self) -> None:
+        self.client.call("session-get")
+        self.daemon.session_id = "second"
+        self.assertEqual(self.client.call("torrent-get"), {"method": "torrent-get"})
+        self.assertEqual(self.client.session_id, "second")
+        self.assertEqual(self.daemon.methods, ["session-get", "torrent-get"])
+
+    def test_call_reconnects_after_stale_keep_alive(self) -> None:
+        self.daemon.close_after = 1
+        self.client.call("session-get")
+        self.assertEqual(self.client.call("torrent-get"), {"method": "torrent-get"})
+        self.assertEqual(self.daemon.methods, ["session-get", "torrent-get"])
+        self.assertEqual(self.daemon.connections, 2)
+
+    def test_call_raises_on_failed_result(self) -> None:
+        with self.assertRaises(TransmissionError):
+            self.client.call("fail")
+
+    def test_call_batch_pipelines_on_one_connection(self) -> None:
+        requests = [("torrent-add", {"n": i}) for i in range(5)] + [("fail", {})]
+        results = self.client.call_batch(requests)
+
+        self.assertEqual(results[:5], [{"method": "torrent-add"}] * 5)
+        self.assertIsInstance(results[5], TransmissionError)
+        # One keep-alive connection for the session id, one for the whole batch
+        self.assertEqual(self.daemon.connections, 2)
+        self.assertEqual(self.daemon.methods, ["session-get"] + ["torrent-add"] * 5 + ["fail"])
+
+    def test_call_batch_finishes_sequentially_after_rotation(self) -> None:
+        # session-get plus two batched calls, then the id changes mid-batch
+        self.daemon.rotate_after = 3
+        results = self.client.call_batch([("torrent-add", {"n": i}) for i in range(5)])
+
+        self.assertEqual(results, [{"method": "torrent-add"}] * 5)
+        self.assertEqual(self.daemon.methods.count("torrent-add"), 5)
+        self.assertEqual(self.client.session_id, "rotated")
+
+    def test_call_batch_finishes_sequentially_when_connection_drops(self) -> None:
+        self.client.call("session-get")
+        self.daemon.close_after = 2
+        results = self.client.call_batch([("torrent-add", {"n": i}) for i in range(5)])
+
+        self.assertEqual(results, [{"method": "torrent-add"}] * 5)
+        self.assertEqual(self.daemon.methods.count("torrent-add"), 5)
+
+    def test_call_batch_reports_unreachable_daemon_per_call(self) -> None:
+        self.client.session_id = "first"
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        results = self.client.call_batch([("torrent-add", {}), ("torrent-add", {})])
+
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(isinstance(r, TransmissionError) for r in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""extract_archives() on password-protected packs built with the zip CLI."""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import zip_extract  # noqa: E402
+
+SUBTITLES = {f"Jaya {n:02}.ass": f"Dialogue: episode {n}\n".encode() * 500 for n in range(1, 7)}
+
+
+@unittest.skipUnless(shutil.which("zip"), "needs the zip CLI to encrypt archives")
+class EncryptedArchiveTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        sources = root / "pack"
+        sources.mkdir()
+        for name, body in SUBTITLES.items():
+            (sources / name).write_bytes(body)
+        self.pack = root / "pack.zip"
+        subprocess.run(
+            ["zip", "-qP", "secret", str(self.pack), *SUBTITLES], cwd=sources, check=True
+        )
+        self.dest = root / "subtitles"
+        self.dest.mkdir()
+        # Small packs stay serial; force the worker processes
+        patch = mock.patch.object(zip_extract, "ENCRYPTED_PARALLEL_THRESHOLD", 0)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_members_are_extracted_by_worker_processes(self) -> None:
+        [result] = zip_extract.extract_archives(
+            [self.pack], self.dest, pwd=b"secret", max_workers=2
+        )
+
+        self.assertTrue(result["ok"], result["error"])
+        self.assertEqual(sorted(result["files"]), sorted(SUBTITLES))
+        for name, body in SUBTITLES.items():
+            self.assertEqual((self.dest / name).read_bytes(), body)
+
+    def test_wrong_password_fails_the_archive(self) -> None:
+        [result] = zip_extract.extract_archives(
+            [self.pack], self.dest, pwd=b"wrong", max_workers=2
+        )
+
+        self.assertFalse(result["ok"])
+        self.assertIsInstance(result["error"], RuntimeError)
+        self.assertIn("password", str(result["error"]))
+        self.assertEqual(list(self.dest.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
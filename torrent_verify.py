@@ -0,0 +1,241 @@
+"""Hash-check partial torrent downloads and hand them back to Transmission.
+
+Reads each torrent's metainfo (the .torrent file transmission-daemon keeps
+for it), maps pieces onto the files on disk and SHA-1 checks them with a
+thread pool: hashlib and os.pread release the GIL, so pieces are verified
+in parallel with bounded memory (one piece per worker).
+
+The daemon's own resume state is trusted: only a torrent it believes has
+nothing (haveValid == 0) while files for it exist on disk, e.g. after a
+crash that lost its resume file, is hash-checked here. If any piece turns
+out valid it gets a torrent-verify so the daemon re-checks and adopts
+them. Incomplete torrents are then started again, except those that were
+stopped on purpose. Nothing is ever deleted.
+
+Usage:
+    resume_incomplete("arc15-jaya")
+"""
+
+import hashlib
+import os
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import bencode
+import telemetry
+from transmission_rpc import TransmissionClient, TransmissionError
+
+PIECE_HASH_SIZE = 20
+
+# Transmission's suffix for incomplete files ("rename-partial-files")
+PARTIAL_SUFFIX = ".part"
+
+# torrent-get "status" of a torrent paused by the user
+TR_STATUS_STOPPED = 0
+
+
+def _text(info: dict, key: bytes) -> str:
+    value = info.get(key + b".utf-8", info[key])
+    return value.decode("utf-8", "replace")
+
+
+def load_metainfo(path: str | Path) -> dict:
+    """Parse a .torrent file.
+
+    Returns {"name", "info_hash", "piece_length", "pieces": [sha1 bytes],
+    "files": [(relative Path, length)], "total_size"}.
+
+    Raises:
+        OSError: if the file cannot be read
+        bencode.BencodeError: if it is not valid metainfo
+    """
+    meta = bencode.decode(Path(path).read_bytes())
+    try:
+        info = meta[b"info"]
+        name = _text(info, b"name")
+        pieces = info[b"pieces"]
+        if b"files" in info:
+            files = []
+            for f in info[b"files"]:
+                parts = f.get(b"path.utf-8", f[b"path"])
+                files.append(
+                    (Path(name, *(p.decode("utf-8", "replace") for p in parts)), f[b"length"])
+                )
+        else:
+            files = [(Path(name), info[b"length"])]
+        piece_length = info[b"piece length"]
+    except (KeyError, TypeError) as e:
+        raise bencode.BencodeError(f"missing metainfo field {e}") from e
+
+    return {
+        "name": name,
+        "info_hash": hashlib.sha1(bencode.encode(info)).hexdigest(),
+        "piece_length": piece_length,
+        "pieces": [
+            pieces[i : i + PIECE_HASH_SIZE] for i in range(0, len(pieces), PIECE_HASH_SIZE)
+        ],
+        "files": files,
+        "total_size": sum(length for _, length in files),
+    }
+
+
+def _open_files(meta: dict, download_dir: Path) -> list[int | None]:
+    fds = []
+    for relative, _ in meta["files"]:
+        path = download_dir / relative
+        if not path.exists():
+            path = path.with_name(path.name + PARTIAL_SUFFIX)
+        try:
+            fds.append(os.open(path, os.O_RDONLY))
+        except OSError:
+            fds.append(None)
+    return fds
+
+
+def verify_pieces(
+    meta: dict, download_dir: str | Path, max_workers: int | None = None
+) -> dict:
+    """Hash-check every piece of a torrent against the files on disk.
+
+    Returns {"pieces", "valid", "valid_bytes", "have": [bool per piece]}.
+    Missing files simply make their pieces invalid.
+    """
+    piece_length = meta["piece_length"]
+    total = meta["total_size"]
+    starts, offset = [], 0
+    for _, length in meta["files"]:
+        starts.append(offset)
+        offset += length
+
+    fds = _open_files(meta, Path(download_dir))
+
+    def check(index: int) -> bool:
+        start = index * piece_length
+        end = min(start + piece_length, total)
+        digest = hashlib.sha1()
+        position = start
+        f = bisect_right(starts, position) - 1
+        while position < end:
+            file_end = starts[f] + meta["files"][f][1]
+            chunk_end = min(end, file_end)
+            if chunk_end > position:
+                if fds[f] is None:
+                    return False
+                data = os.pread(fds[f], chunk_end - position, position - starts[f])
+                if len(data) != chunk_end - position:
+                    return False
+                digest.update(data)
+                position = chunk_end
+            f += 1
+        return digest.digest() == meta["pieces"][index]
+
+    try:
+        workers = max_workers or min(8, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            have = list(pool.map(check, range(len(meta["pieces"]))))
+    finally:
+        for fd in fds:
+            if fd is not None:
+                os.close(fd)
+
+    last = total - piece_length * (len(have) - 1) if have else 0
+    valid_bytes = sum(piece_length for ok in have[:-1] if ok)
+    if have and have[-1]:
+        valid_bytes += last
+    telemetry.add("bytes", total)
+    return {
+        "pieces": len(have),
+        "valid": sum(have),
+        "valid_bytes": valid_bytes,
+        "have": have,
+    }
+
+
+def _has_data(meta: dict, download_dir: Path) -> bool:
+    for relative, _ in meta["files"]:
+        path = download_dir / relative
+        for candidate in (path, path.with_name(path.name + PARTIAL_SUFFIX)):
+            try:
+                if candidate.stat().st_size > 0:
+                    return True
+            except OSError:
+                pass
+    return False
+
+
+def resume_incomplete(folder: str | Path, client: TransmissionClient | None = None) -> list[dict]:
+    """Restart the daemon's incomplete torrents stored under folder.
+
+    Stopped torrents are left alone. Returns one result per restarted
+    torrent: {"id", "name", "percent_done", "metadata", "pieces", "valid",
+    "reverified"}; pieces/valid are None unless the torrent was
+    hash-checked here (see the module docstring).
+    """
+    root = Path(folder).resolve()
+    client = client or TransmissionClient.from_env()
+    fields = [
+        "id",
+        "name",
+        "status",
+        "downloadDir",
+        "torrentFile",
+        "percentDone",
+        "haveValid",
+        "metadataPercentComplete",
+    ]
+    try:
+        with client:
+            if not client.ping():
+                return []
+            torrents = client.get_torrents(fields)
+    except TransmissionError:
+        return []
+
+    def under_root(torrent: dict) -> bool:
+        directory = Path(torrent["downloadDir"]).resolve()
+        return directory == root or root in directory.parents
+
+    results = []
+    for torrent in torrents:
+        if (
+            torrent["percentDone"] >= 1
+            or torrent["status"] == TR_STATUS_STOPPED
+            or not under_root(torrent)
+        ):
+            continue
+        result = {
+            "id": torrent["id"],
+            "name": torrent["name"],
+            "percent_done": torrent["percentDone"],
+            "metadata": torrent["metadataPercentComplete"] >= 1,
+            "pieces": None,
+            "valid": None,
+            "reverified": False,
+        }
+        results.append(result)
+        if not result["metadata"] or torrent["haveValid"] > 0:
+            continue
+        try:
+            meta = load_metainfo(torrent["torrentFile"])
+        except (OSError, ValueError, KeyError):
+            continue
+        download_dir = Path(torrent["downloadDir"])
+        if not _has_data(meta, download_dir):
+            continue
+
+        report = verify_pieces(meta, download_dir)
+        result["pieces"], result["valid"] = report["pieces"], report["valid"]
+        result["reverified"] = report["valid"] > 0
+
+    if results:
+        ids = [r["id"] for r in results]
+        reverify = [r["id"] for r in results if r["reverified"]]
+        try:
+            with client:
+                if reverify:
+                    client.call("torrent-verify", {"ids": reverify})
+                client.call("torrent-start", {"ids": ids})
+        except TransmissionError as e:
+            print(f"⚠ Could not resume torrents: {e}")
+    return results
@@ -0,0 +1,359 @@
+"""Minimal Transmission JSON-RPC client.
+
+Talks to a running transmission-daemon over one keep-alive HTTP connection,
+handling the X-Transmission-Session-Id handshake and optional basic auth.
+Replaces spawning one `transmission-remote` process per magnet. Every call
+can be recorded and replayed offline (see cassette.py).
+
+Connection settings default to transmission-remote's (localhost:9091) and can
+be overridden with environment variables:
+    TR_HOST, TR_PORT      - daemon address
+    TR_AUTH               - "username:password" (same variable transmission-remote
+                            reads with --authenv)
+"""
+
+import base64
+import http.client
+import json
+import os
+import socket
+import subprocess
+import time
+from functools import partial
+
+import cassette
+
+RPC_PATH = "/transmission/rpc"
+SESSION_HEADER = "X-Transmission-Session-Id"
+
+
+class TransmissionError(Exception):
+    """Raised when the daemon is unreachable or rejects a request."""
+
+
+def _header(headers: dict[str, str], name: str) -> str | None:
+    """Case-insensitive header lookup."""
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+class TransmissionClient:
+    """JSON-RPC client for transmission-daemon.
+
+    A single HTTP/1.1 connection is reused for every call; it is reopened
+    transparently if the daemon closes it.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 9091,
+        username: str | None = None,
+        password: str | None = None,
+        path: str = RPC_PATH,
+        timeout: float = 10,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.session_id: str | None = None
+        self._auth = None
+        if username is not None:
+            token = f"{username}:{password or ''}".encode("utf-8")
+            self._auth = "Basic " + base64.b64encode(token).decode("ascii")
+        self._conn: http.client.HTTPConnection | None = None
+
+    @classmethod
+    def from_env(cls) -> "TransmissionClient":
+        """Build a client from TR_HOST / TR_PORT / TR_AUTH."""
+        username = password = None
+        auth = os.environ.get("TR_AUTH")
+        if auth:
+            username, _, password = auth.partition(":")
+        return cls(
+            host=os.environ.get("TR_HOST", "localhost"),
+            port=int(os.environ.get("TR_PORT", "9091")),
+            username=username,
+            password=password,
+        )
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "TransmissionClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        return self._conn
+
+    def _post(self, body: bytes) -> tuple[int, dict[str, str], bytes]:
+        """Send one POST, retrying once on a stale keep-alive connection."""
+        headers = {"Content-Type": "application/json"}
+        if self.session_id:
+            headers[SESSION_HEADER] = self.session_id
+        if self._auth:
+            headers["Authorization"] = self._auth
+
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("POST", self.path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                return response.status, dict(response.getheaders()), data
+            except (
+                http.client.RemoteDisconnected,
+                BrokenPipeError,
+                ConnectionResetError,
+            ):
+                self.close()
+                if attempt:
+                    raise
+            except OSError:
+                self.close()
+                raise
+        raise AssertionError("unreachable")
+
+    def call(self, method: str, arguments: dict | None = None) -> dict:
+        """Invoke an RPC method and return its `arguments` payload.
+
+        Raises:
+            TransmissionError: on connection failure, auth failure or when
+                the daemon answers with a result other than "success".
+        """
+        try:
+            return cassette.exchange(
+                "rpc",
+                {"method": method, "arguments": arguments or {}},
+                partial(self._call, method, arguments),
+                errors=(TransmissionError,),
+            )
+        except cassette.CassetteMiss as e:
+            raise TransmissionError(str(e)) from e
+
+    def _call(self, method: str, arguments: dict | None = None) -> dict:
+        payload = {"method": method, "arguments": arguments or {}}
+        body = json.dumps(payload).encode("utf-8")
+
+        try:
+            status, headers, data = self._post(body)
+            if status == 409:
+                # Daemon hands out (or rotated) the CSRF session id
+                self.session_id = _header(headers, SESSION_HEADER)
+                status, headers, data = self._post(body)
+        except OSError as e:
+            raise TransmissionError(
+                f"Cannot reach transmission-daemon at {self.host}:{self.port}: {e}"
+            ) from e
+
+        if status == 401:
+            raise TransmissionError("Unauthorized: set TR_AUTH=user:password")
+        if status != 200:
+            raise TransmissionError(f"RPC {method} failed with HTTP {status}")
+
+        reply = json.loads(data)
+        if reply.get("result") != "success":
+            raise TransmissionError(f"RPC {method} failed: {reply.get('result')}")
+        return reply.get("arguments", {})
+
+    def ping(self) -> bool:
+        """Return True if the daemon answers a session-get."""
+        try:
+            self.call("session-get", {"fields": ["version"]})
+            return True
+        except TransmissionError:
+            return False
+
+    def ensure_daemon(self, wait: float = 10) -> None:
+        """Start transmission-daemon if it is not running and wait until it answers.
+
+        Raises:
+            FileNotFoundError: if transmission-daemon is not installed
+            TransmissionError: if the daemon does not come up within `wait` seconds
+        """
+        if self.ping():
+            return
+
+        print("📡 Starting transmission daemon...")
+        if not cassette.replaying():
+            subprocess.Popen(
+                ["transmission-daemon"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(0.2)
+            if self.ping():
+                return
+        raise TransmissionError("transmission-daemon did not start in time")
+
+    def _request_bytes(self, body: bytes) -> bytes:
+        lines = [
+            f"POST {self.path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if self.session_id:
+            lines.append(f"{SESSION_HEADER}: {self.session_id}")
+        if self._auth:
+            lines.append(f"Authorization: {self._auth}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    def call_batch(self, requests: list[tuple[str, dict]]) -> list[dict | Exception]:
+        """Invoke several RPC methods as one pipelined HTTP/1.1 batch.
+
+        All requests are written back-to-back on a dedicated connection and
+        the responses are read in order, so the batch costs roughly one
+        round-trip instead of one per call. If the daemon closes the
+        connection part-way through, the remaining calls are retried one at
+        a time over the regular keep-alive connection.
+
+        Returns one entry per request: the reply `arguments` dict, or the
+        TransmissionError raised for that call.
+        """
+        if not requests:
+            return []
+        if cassette.enabled():
+            # Recorded and replayed call by call, in order
+            return self._call_each(requests)
+        if not self.session_id:
+            # Obtain the session id up front so the batch is not rejected
+            self.call("session-get", {"fields": ["version"]})
+
+        bodies = [
+            json.dumps({"method": m, "arguments": a, "tag": i}).encode("utf-8")
+            for i, (m, a) in enumerate(requests)
+        ]
+        results: list[dict | Exception] = []
+        sock = None
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.sendall(b"".join(self._request_bytes(b) for b in bodies))
+            reader = _SharedReader(sock.makefile("rb"))
+            for method, _ in requests:
+                response = http.client.HTTPResponse(reader)
+                response.begin()
+                data = response.read()
+                if response.status == 409:
+                    # Session id rotated mid-batch: finish the rest sequentially
+                    self.session_id = response.getheader(SESSION_HEADER)
+                    break
+                if response.status != 200:
+                    results.append(
+                        TransmissionError(f"RPC {method} failed with HTTP {response.status}")
+                    )
+                    continue
+                reply = json.loads(data)
+                if reply.get("result") == "success":
+                    results.append(reply.get("arguments", {}))
+                else:
+                    results.append(
+                        TransmissionError(f"RPC {method} failed: {reply.get('result')}")
+                    )
+        except (OSError, http.client.HTTPException, ValueError):
+            pass
+        finally:
+            if sock is not None:
+                sock.close()
+
+        return results + self._call_each(requests[len(results):])
+
+    def _call_each(self, requests: list[tuple[str, dict]]) -> list[dict | Exception]:
+        results: list[dict | Exception] = []
+        for method, arguments in requests:
+            try:
+                results.append(self.call(method, arguments))
+            except TransmissionError as e:
+                results.append(e)
+        return results
+
+    def get_torrents(self, fields: list[str], ids: list | None = None) -> list[dict]:
+        """Return the requested fields of every torrent (or just `ids`)."""
+        arguments: dict = {"fields": fields}
+        if ids is not None:
+            arguments["ids"] = ids
+        return self.call("torrent-get", arguments).get("torrents", [])
+
+    def set_location(self, ids: list, location: str, move: bool = True) -> None:
+        """Point torrents at a new folder, letting the daemon move their data.
+
+        The daemon keeps its piece state, so nothing is re-verified.
+        """
+        self.call(
+            "torrent-set-location", {"ids": ids, "location": location, "move": move}
+        )
+
+    def add_torrents(self, magnets: list[str], download_dir: str) -> list[dict]:
+        """Add every magnet in one pipelined batch.
+
+        Returns one result dict per magnet, in input order:
+            {"magnet", "ok", "status", "id", "name", "hash", "error"}
+        where status is "added", "duplicate" or "error".
+        """
+        replies = self.call_batch(
+            [
+                ("torrent-add", {"filename": magnet, "download-dir": download_dir})
+                for magnet in magnets
+            ]
+        )
+
+        results = []
+        for magnet, reply in zip(magnets, replies):
+            result = {
+                "magnet": magnet,
+                "ok": False,
+                "status": "error",
+                "id": None,
+                "name": None,
+                "hash": None,
+                "error": None,
+            }
+            if isinstance(reply, Exception):
+                result["error"] = str(reply)
+                results.append(result)
+                continue
+
+            if "torrent-added" in reply:
+                torrent, result["status"] = reply["torrent-added"], "added"
+            else:
+                torrent, result["status"] = reply.get("torrent-duplicate", {}), "duplicate"
+            result["ok"] = True
+            result["id"] = torrent.get("id")
+            result["name"] = torrent.get("name")
+            result["hash"] = torrent.get("hashString")
+            results.append(result)
+        return results
+
+
+class _SharedReader:
+    """File wrapper letting consecutive HTTPResponse objects share one buffer.
+
+    HTTPResponse closes its file once a body is consumed; pipelined responses
+    must keep reading from the same buffered stream, so close() is a no-op.
+    """
+
+    def __init__(self, fp) -> None:
+        self._fp = fp
+
+    def makefile(self, *args, **kwargs) -> "_SharedReader":
+        return self
+
+    def close(self) -> None:
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._fp, name)
@@ -0,0 +1,178 @@
+"""Selective, streaming extraction of subtitle archives.
+
+Only members ending in one of the wanted suffixes (`.ass` by default) are
+written; everything else in the archive is skipped without being
+decompressed. Each member is streamed to a `.part` file in fixed-size
+chunks, so memory stays bounded regardless of archive size, and zipfile
+checks its CRC as the stream is read: a corrupt member raises before the
+file is moved into place, replacing any file of the same name left by an
+earlier extraction.
+
+Nested paths are flattened into the destination folder (`Jaya/v2/Jaya 01.ass`
+becomes `Jaya 01.ass`); if two members of the same call flatten to the
+same name the later ones get a ` (2)`, ` (3)`, ... suffix.
+
+Members are extracted in parallel by a thread pool, since zlib releases
+the GIL while inflating. ZipCrypto decryption runs in pure Python and holds
+the GIL, so members of password-protected archives go to a pool of worker
+processes instead (started with "spawn", which works the same on every
+platform and does not fork a process that is running threads).
+
+Usage:
+    results = extract_archives(zip_files, subtitles_folder, pwd=b"secret")
+"""
+
+import multiprocessing
+import os
+import shutil
+import zipfile
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+SUBTITLE_SUFFIXES = (".ass",)
+CHUNK_SIZE = 64 * 1024
+
+# Below this many bytes of unencrypted members, a pool costs more than it saves
+PARALLEL_THRESHOLD = 1024 * 1024
+# Decrypting runs at ~7MB/s, but worker processes take ~0.1s to start:
+# below this many bytes of encrypted members, stay on the calling thread
+ENCRYPTED_PARALLEL_THRESHOLD = 2 * 1024 * 1024
+
+
+def _flat_name(member: str, taken: set[str]) -> str:
+    name = PurePosixPath(member.replace("\\", "/")).name
+    stem, suffix = os.path.splitext(name)
+    candidate, n = name, 1
+    while candidate.lower() in taken:
+        n += 1
+        candidate = f"{stem} ({n}){suffix}"
+    taken.add(candidate.lower())
+    return candidate
+
+
+def plan_archive(
+    zip_path: Path, suffixes: tuple[str, ...], taken: set[str]
+) -> list[tuple[str, str, int, bool]]:
+    """Return (member, flat target name, size, encrypted) for each wanted member.
+
+    Raises:
+        zipfile.BadZipFile: if the archive's central directory is unreadable
+    """
+    with zipfile.ZipFile(zip_path) as z:
+        return [
+            (
+                info.filename,
+                _flat_name(info.filename, taken),
+                info.file_size,
+                bool(info.flag_bits & 0x1),
+            )
+            for info in z.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(suffixes)
+        ]
+
+
+def extract_members(
+    zip_path: Path,
+    dest: Path,
+    members: list[tuple[str, str, int, bool]],
+    pwd: bytes | None = None,
+) -> int:
+    """Stream members of one archive into dest; return bytes written.
+
+    Raises:
+        zipfile.BadZipFile: on a CRC mismatch or corrupt member
+        RuntimeError: if the password is missing or wrong
+    """
+    written = 0
+    with zipfile.ZipFile(zip_path) as z:
+        for member, target_name, *_ in members:
+            target = dest / target_name
+            part = target.with_name(target.name + ".part")
+            try:
+                with z.open(member, pwd=pwd) as src, open(part, "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                    written += dst.tell()
+                os.replace(part, target)
+            except (zlib.error, EOFError) as e:
+                raise zipfile.BadZipFile(f"{member}: {e}") from e
+            finally:
+                part.unlink(missing_ok=True)
+    return written
+
+
+def _batches(members: list, count: int) -> list[list]:
+    size = max(1, -(-len(members) // count))
+    return [members[i : i + size] for i in range(0, len(members), size)]
+
+
+def extract_archives(
+    zip_files: list[Path],
+    dest: Path,
+    pwd: bytes | None = None,
+    suffixes: tuple[str, ...] = SUBTITLE_SUFFIXES,
+    max_workers: int | None = None,
+) -> list[dict]:
+    """Extract the wanted members of several archives into dest.
+
+    Returns one result per archive, in input order:
+    {"archive", "ok", "files": [names], "bytes", "error"}. A failing
+    archive does not stop the others.
+    """
+    dest = Path(dest)
+    # Only this call's members compete for names; files already in dest are
+    # replaced, so re-extracting a pack does not pile up " (2)" copies
+    taken: set[str] = set()
+    results = []
+    for zip_path in zip_files:
+        result = {"archive": zip_path, "ok": True, "files": [], "bytes": 0, "error": None}
+        try:
+            result["members"] = plan_archive(zip_path, suffixes, taken)
+        except (zipfile.BadZipFile, OSError) as e:
+            result.update(ok=False, error=e, members=[])
+        results.append(result)
+
+    workers = max_workers or os.cpu_count() or 1
+    plain = sum(m[2] for r in results for m in r["members"] if not m[3])
+    encrypted = sum(m[2] for r in results for m in r["members"] if m[3])
+    threads: Executor | None = None
+    processes: Executor | None = None
+    if workers > 1 and plain >= PARALLEL_THRESHOLD:
+        threads = ThreadPoolExecutor(max_workers=workers)
+    if workers > 1 and encrypted >= ENCRYPTED_PARALLEL_THRESHOLD:
+        processes = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    try:
+        pending = []
+        for result in results:
+            members = result["members"]
+            pool = processes if any(m[3] for m in members) else threads
+            for batch in [members] if pool is None else _batches(members, workers):
+                future = None
+                if pool is not None:
+                    future = pool.submit(extract_members, result["archive"], dest, batch, pwd)
+                pending.append((result, batch, future))
+
+        for result, batch, future in pending:
+            if not result["ok"]:
+                continue
+            try:
+                if future is None:
+                    written = extract_members(result["archive"], dest, batch, pwd)
+                else:
+                    written = future.result()
+            except (zipfile.BadZipFile, RuntimeError, OSError) as e:
+                result.update(ok=False, error=e)
+                continue
+            result["bytes"] += written
+            result["files"].extend(m[1] for m in batch)
+    finally:
+        for pool in (threads, processes):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    for result in results:
+        del result["members"]
+    return results